@@ -7,13 +7,37 @@ from theatre.models import (
     Performance,
     TheatreHall,
     Reservation,
+    SeatHold,
     Ticket
 )
 
+
+@admin.register(Performance)
+class PerformanceAdmin(admin.ModelAdmin):
+    list_select_related = ("play",)
+
+
+@admin.register(Ticket)
+class TicketAdmin(admin.ModelAdmin):
+    list_select_related = ("performance__play",)
+    raw_id_fields = ("performance", "reservation")
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_select_related = ("performance__play",)
+    raw_id_fields = ("performance", "user")
+
+    def delete_model(self, request, obj):
+        obj.release()
+
+    def delete_queryset(self, request, queryset):
+        for hold in queryset:
+            hold.release()
+
+
 admin.site.register(Actor)
 admin.site.register(Genre)
 admin.site.register(Play)
-admin.site.register(Performance)
 admin.site.register(TheatreHall)
 admin.site.register(Reservation)
-admin.site.register(Ticket)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TheatreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'theatre'
+
+    def ready(self):
+        import theatre.signals  # noqa: F401
+        import theatre.tasks  # noqa: F401
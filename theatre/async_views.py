@@ -0,0 +1,146 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+ASYNC_READ_ACTIONS = ("list", "retrieve")
+
+
+class AsyncReadMixin:
+    """
+    Serve GET list and retrieve natively under ASGI. Querysets,
+    serializers, permissions, throttles and pagination are the viewset's
+    own, only the reads go through the async ORM. Writes, HEAD and
+    non-JSON responses (browsable API) are handed to the sync viewset.
+    """
+
+    # Set to False to serve reads with the sync viewset as well
+    async_reads = True
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+        is_read = actions.get("get") in ASYNC_READ_ACTIONS
+        if not (cls.async_reads and is_read):
+            return sync_view
+        sync_handler = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await sync_handler(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.adispatch(
+                request, sync_handler, *args, **kwargs
+            )
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        return csrf_exempt(view)
+
+    async def adispatch(self, request, sync_handler, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.headers = self.default_response_headers
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+
+        try:
+            self.format_kwarg = self.get_format_suffix(**kwargs)
+            renderer, media_type = self.perform_content_negotiation(request)
+            if not isinstance(renderer, JSONRenderer):
+                return await sync_handler(request._request, *args, **kwargs)
+            request.accepted_renderer = renderer
+            request.accepted_media_type = media_type
+            request.version, request.versioning_scheme = (
+                self.determine_version(request, *args, **kwargs)
+            )
+
+            await self.aperform_authentication(request)
+            self.check_permissions(request)
+            await sync_to_async(self.check_throttles)(request)
+
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        response = self.finalize_response(request, response, *args, **kwargs)
+        # A plain HttpResponse keeps Django from rendering in a thread
+        response.render()
+        rendered = HttpResponse(
+            response.content,
+            status=response.status_code,
+            headers=response.headers,
+        )
+        rendered.data = response.data
+        return rendered
+
+    @staticmethod
+    async def aperform_authentication(request):
+        """Async counterpart of Request._authenticate"""
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth = await authenticator.aauthenticate(request)
+                else:
+                    user_auth = await sync_to_async(
+                        authenticator.authenticate
+                    )(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return
+
+        request._authenticator = None
+        request._not_authenticated()
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            ValidationError
+        ):
+            raise Http404
+
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(
+                queryset, request, view=self
+            )
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(
+            [obj async for obj in queryset], many=True
+        )
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
@@ -0,0 +1,177 @@
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+from theatre.search import update_search_vectors
+from theatre.seat_map import SeatMap
+from theatre.utils import batched
+
+BATCH_SIZE = 5000
+TICKETS_PER_RESERVATION = 4
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list of numbers."""
+    ordered = sorted(values)
+    index = max(0, int(round(percent / 100 * len(ordered))) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def build_dataset(
+        halls=5,
+        genres=20,
+        actors=200,
+        plays=100,
+        performances=1000,
+        tickets=100000,
+        users=100,
+        days=365,
+        seed=0,
+        stdout=None
+):
+    """
+    Generate a reproducible catalog with sold tickets. Seat maps and
+    counters are filled in memory so no per-ticket query is issued.
+    """
+    rng = random.Random(seed)
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    hall_objects = TheatreHall.objects.bulk_create(
+        TheatreHall(
+            name=f"Bench hall {index}",
+            rows=rng.randint(10, 40),
+            seats_in_row=rng.randint(15, 50)
+        )
+        for index in range(halls)
+    )
+    genre_ids = [
+        genre.id for genre in Genre.objects.bulk_create(
+            Genre(name=f"Bench genre {seed}-{index}")
+            for index in range(genres)
+        )
+    ]
+    actor_ids = [
+        actor.id for actor in Actor.objects.bulk_create(
+            Actor(first_name=f"First{index}", last_name=f"Last{index}")
+            for index in range(actors)
+        )
+    ]
+    play_objects = Play.objects.bulk_create(
+        Play(title=f"Bench play {index}", description="Lorem ipsum " * 20)
+        for index in range(plays)
+    )
+    Play.genres.through.objects.bulk_create(
+        Play.genres.through(play_id=play.id, genre_id=genre_id)
+        for play in play_objects
+        for genre_id in rng.sample(genre_ids, min(2, len(genre_ids)))
+    )
+    Play.actors.through.objects.bulk_create(
+        Play.actors.through(play_id=play.id, actor_id=actor_id)
+        for play in play_objects
+        for actor_id in rng.sample(actor_ids, min(5, len(actor_ids)))
+    )
+    # bulk_create skips the signals, without vectors play search would
+    # only measure the trigram fallback
+    update_search_vectors(
+        Play.objects.filter(id__in=[play.id for play in play_objects])
+    )
+    log(f"Created {halls} halls, {plays} plays, {actors} actors")
+
+    start = timezone.now() - datetime.timedelta(days=days // 2)
+    new_performances = (
+        Performance(
+            play=rng.choice(play_objects),
+            theatre_hall=rng.choice(hall_objects),
+            show_time=start + datetime.timedelta(
+                minutes=rng.randrange(days * 24 * 60)
+            )
+        )
+        for _ in range(performances)
+    )
+    performance_objects = []
+    for batch in batched(new_performances, BATCH_SIZE):
+        performance_objects.extend(Performance.objects.bulk_create(batch))
+    log(f"Created {performances} performances")
+
+    user_objects = get_user_model().objects.bulk_create(
+        get_user_model()(email=f"bench{seed}-{index}@bench.local")
+        for index in range(users)
+    )
+
+    capacity = sum(
+        performance.theatre_hall.capacity
+        for performance in performance_objects
+    )
+    tickets = min(tickets, capacity)
+    seat_maps = {}
+    created = 0
+    for performance in performance_objects:
+        if created >= tickets:
+            break
+        hall = performance.theatre_hall
+        share = round(tickets * hall.capacity / capacity)
+        count = min(hall.capacity, share, tickets - created)
+        seat_map = SeatMap(hall.rows, hall.seats_in_row)
+        seats = rng.sample(range(hall.capacity), count)
+
+        for chunk in batched(seats, BATCH_SIZE):
+            reservations = Reservation.objects.bulk_create(
+                Reservation(user=rng.choice(user_objects))
+                for _ in range(
+                    (len(chunk) + TICKETS_PER_RESERVATION - 1)
+                    // TICKETS_PER_RESERVATION
+                )
+            )
+            ticket_objects = []
+            for index, seat_index in enumerate(chunk):
+                row, seat = divmod(seat_index, hall.seats_in_row)
+                seat_map.take(row + 1, seat + 1)
+                ticket_objects.append(
+                    Ticket(
+                        row=row + 1,
+                        seat=seat + 1,
+                        performance=performance,
+                        reservation=reservations[
+                            index // TICKETS_PER_RESERVATION
+                        ]
+                    )
+                )
+            Ticket.objects.bulk_create(ticket_objects)
+
+        performance.seat_map = seat_map.to_bytes()
+        performance.update_free_runs(seat_map)
+        performance.tickets_sold = count
+        seat_maps[performance.id] = performance
+        created += count
+
+    Performance.objects.bulk_update(
+        seat_maps.values(),
+        ["seat_map", "free_runs", "max_free_run", "tickets_sold"],
+        batch_size=BATCH_SIZE
+    )
+    log(f"Created {created} tickets")
+
+    return {
+        "halls": [hall.id for hall in hall_objects],
+        "genres": genre_ids,
+        "actors": actor_ids,
+        "plays": [play.id for play in play_objects],
+        "performances": [
+            performance.id for performance in performance_objects
+        ],
+        "users": [user.id for user in user_objects],
+    }
@@ -0,0 +1,143 @@
+import hashlib
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.dispatch import Signal
+from rest_framework import status
+from rest_framework.response import Response
+
+from theatre_api_service.version_tags import bump_version, get_versions
+
+# Sent with sender=<view class>, view_name and hit on every cache lookup
+catalog_cache_accessed = Signal()
+
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_cache_stats() -> dict:
+    """Return per-view hit/miss counters of this process."""
+    return {view_name: dict(stats) for view_name, stats in _stats.items()}
+
+
+def reset_cache_stats() -> None:
+    _stats.clear()
+
+
+def _version_key(model) -> str:
+    return f"catalog:version:{model._meta.label_lower}"
+
+
+def get_model_versions(models) -> list:
+    return get_versions(
+        get_cache(), [_version_key(model) for model in models]
+    )
+
+
+def bump_model_version(model) -> None:
+    """Invalidate cached responses depending on model."""
+    bump_version(get_cache(), _version_key(model))
+
+
+class CatalogCacheMixin:
+    """
+    Cache list and retrieve responses keyed by model version tags. The
+    async handlers are used when the view also has AsyncReadMixin.
+    """
+
+    cache_models = ()
+    cache_query_params = ()
+    cache_id_list_params = ()
+
+    def _normalized_query_params(self):
+        params = []
+        for name in self.cache_query_params:
+            value = self.request.query_params.get(name)
+            if not value:
+                continue
+            if name in self.cache_id_list_params:
+                try:
+                    value = ",".join(
+                        str(pk) for pk in sorted(
+                            {int(pk) for pk in value.split(",")}
+                        )
+                    )
+                except ValueError:
+                    pass
+            params.append(f"{name}={value}")
+        return params
+
+    def get_cache_key(self) -> str:
+        parts = [
+            self.basename,
+            self.action,
+            self.get_serializer_class().__name__,
+            str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)),
+            self.request.get_host(),
+            *self._normalized_query_params(),
+            *map(str, get_model_versions(self.cache_models)),
+        ]
+        digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+        return f"catalog:response:{digest}"
+
+    def _record_cache_access(self, hit):
+        view_name = f"{self.basename}-{self.action}"
+        _stats[view_name]["hits" if hit else "misses"] += 1
+        catalog_cache_accessed.send(
+            sender=self.__class__, view_name=view_name, hit=hit
+        )
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key()
+
+        data = cache.get(key)
+        self._record_cache_access(data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    async def _acached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = await sync_to_async(self.get_cache_key)()
+
+        data = await cache.aget(key)
+        self._record_cache_access(data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset(
+                key, response.data, settings.CATALOG_CACHE_TIMEOUT
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._acached_response(
+            super().alist, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self._acached_response(
+            super().aretrieve, request, *args, **kwargs
+        )
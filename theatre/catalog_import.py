@@ -0,0 +1,535 @@
+import bisect
+import csv
+import io
+import json
+import os
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from theatre.caching import bump_model_version
+from theatre.models import Actor, Genre, Performance, Play, TheatreHall
+from theatre.search import update_search_vectors
+from theatre.utils import batched
+
+
+def _text(value):
+    value = str(value).strip()
+    if not value:
+        raise ValueError("must not be empty")
+    return value
+
+
+def _optional_text(value):
+    return "" if value is None else str(value)
+
+
+def _positive_int(value):
+    value = int(value)
+    if value < 1:
+        raise ValueError("must be a positive integer")
+    return value
+
+
+def _datetime(value):
+    parsed = parse_datetime(str(value))
+    if parsed is None or parsed.tzinfo is None:
+        raise ValueError("must be an ISO 8601 datetime with a timezone")
+    return parsed
+
+
+def _id_list(value):
+    if isinstance(value, list):
+        return [int(pk) for pk in value]
+    return [int(pk) for pk in str(value).split(",") if pk.strip()]
+
+
+def _refresh_play_search(lookup):
+    """Recompute search vectors of plays related to written ids."""
+    def refresh(ids):
+        update_search_vectors(Play.objects.filter(**{lookup: ids}))
+    return refresh
+
+
+def _resized_halls(records):
+    """Yield (record, new size, performances) of halls records resize."""
+    by_id = {record["id"]: record for record in records}
+    for pk, rows, seats_in_row in TheatreHall.objects.filter(
+            id__in=by_id
+    ).values_list("id", "rows", "seats_in_row"):
+        record = by_id[pk]
+        size = (record["rows"], record["seats_in_row"])
+        if (rows, seats_in_row) != size:
+            yield record, size, Performance.objects.filter(
+                theatre_hall_id=pk
+            )
+
+
+def _moved_performances(records):
+    """Yield (record, new size, performances) of performances moved."""
+    by_id = {record["id"]: record for record in records}
+    moved = [
+        by_id[pk]
+        for pk, hall_id in Performance.objects.filter(
+            id__in=by_id
+        ).values_list("id", "theatre_hall_id")
+        if hall_id != by_id[pk]["theatre_hall_id"]
+    ]
+    sizes = {
+        pk: (rows, seats_in_row)
+        for pk, rows, seats_in_row in TheatreHall.objects.filter(
+            id__in={record["theatre_hall_id"] for record in moved}
+        ).values_list("id", "rows", "seats_in_row")
+    }
+    for record in moved:
+        # A hall imported earlier in a dry run is not in the database
+        yield record, sizes.get(record["theatre_hall_id"]), (
+            Performance.objects.filter(id=record["id"])
+        )
+
+
+class CatalogKind:
+    """Describe how rows of one catalog file map onto a model."""
+
+    def __init__(
+            self,
+            model,
+            fields,
+            references=None,
+            relations=None,
+            insert_defaults=None,
+            after_write=None,
+            seat_map_changes=None
+    ):
+        self.model = model
+        self.fields = fields
+        self.references = references or {}
+        self.relations = relations or {}
+        self.insert_defaults = insert_defaults or {}
+        # Called with the ids of every written batch
+        self.after_write = after_write
+        # Called with the records of a batch, yields (record, new hall
+        # size, performances) for performances whose seat maps they
+        # re-index
+        self.seat_map_changes = seat_map_changes
+        self.unique_fields = [
+            name for name in fields if model._meta.get_field(name).unique
+        ]
+
+    @property
+    def columns(self):
+        return ["id", *self.fields]
+
+
+CATALOG_KINDS = {
+    "halls": CatalogKind(
+        TheatreHall,
+        {
+            "name": _text,
+            "rows": _positive_int,
+            "seats_in_row": _positive_int,
+        },
+        seat_map_changes=_resized_halls,
+    ),
+    "genres": CatalogKind(
+        Genre,
+        {"name": _text},
+        after_write=_refresh_play_search("genres__in"),
+    ),
+    "actors": CatalogKind(
+        Actor,
+        {"first_name": _text, "last_name": _text},
+        after_write=_refresh_play_search("actors__in"),
+    ),
+    "plays": CatalogKind(
+        Play,
+        {"title": _text, "description": _optional_text},
+        relations={"genres": Genre, "actors": Actor},
+        after_write=_refresh_play_search("pk__in"),
+    ),
+    "performances": CatalogKind(
+        Performance,
+        {
+            "play_id": _positive_int,
+            "theatre_hall_id": _positive_int,
+            "show_time": _datetime,
+        },
+        references={"play_id": Play, "theatre_hall_id": TheatreHall},
+        seat_map_changes=_moved_performances,
+        insert_defaults={
+            "seat_map": "''::bytea",
+            "free_runs": "''::bytea",
+            "seat_map_version": "0",
+            "seat_changes": "''::bytea",
+            "tickets_sold": "0",
+            "seats_held": "0",
+        },
+    ),
+}
+
+# Files are imported in this order so that references already exist
+IMPORT_ORDER = ("halls", "genres", "actors", "plays", "performances")
+
+# Models other rows point at, a dry run remembers which ids it has seen
+REFERENCED_MODELS = {
+    model
+    for kind in CATALOG_KINDS.values()
+    for model in (*kind.references.values(), *kind.relations.values())
+}
+
+
+def read_rows(path):
+    """Yield (line number, dict) pairs from a CSV or JSONL file lazily."""
+    _, extension = os.path.splitext(path)
+    with open(path, newline="", encoding="utf-8") as source:
+        if extension.lower() == ".csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(source, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+
+class IdRanges:
+    """
+    Set of ids kept as sorted disjoint [first, last] ranges, the mostly
+    consecutive ids of a catalog take a few ranges whatever their number.
+    """
+
+    def __init__(self):
+        self.firsts = []
+        self.lasts = []
+
+    def __contains__(self, pk):
+        index = bisect.bisect_right(self.firsts, pk)
+        return index > 0 and self.lasts[index - 1] >= pk
+
+    def add(self, pk):
+        index = bisect.bisect_right(self.firsts, pk)
+        if index > 0 and self.lasts[index - 1] >= pk:
+            return
+        extends_left = index > 0 and self.lasts[index - 1] == pk - 1
+        extends_right = (
+            index < len(self.firsts) and self.firsts[index] == pk + 1
+        )
+        if extends_left and extends_right:
+            self.lasts[index - 1] = self.lasts.pop(index)
+            del self.firsts[index]
+        elif extends_left:
+            self.lasts[index - 1] = pk
+        elif extends_right:
+            self.firsts[index] = pk
+        else:
+            self.firsts.insert(index, pk)
+            self.lasts.insert(index, pk)
+
+
+class CatalogImporter:
+    """
+    Validate and upsert catalog rows in fixed-size batches. Rows are keyed
+    by "id"; on PostgreSQL batches are loaded with COPY into a temporary
+    table and merged with INSERT ... ON CONFLICT, elsewhere bulk_create
+    with update_conflicts is used.
+    """
+
+    def __init__(self, batch_size=1000, dry_run=False, use_copy=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        if use_copy is None:
+            use_copy = self.copy_available()
+        self.use_copy = use_copy
+        # Ids imported earlier in a dry run are not in the database, only
+        # those other rows may reference are kept
+        self.seen_ids = {
+            kind_name: IdRanges()
+            for kind_name, kind in CATALOG_KINDS.items()
+            if kind.model in REFERENCED_MODELS
+        }
+        # Unique values imported earlier in a dry run, {value: id} by
+        # kind and field
+        self.seen_values = {
+            kind_name: {name: {} for name in kind.unique_fields}
+            for kind_name, kind in CATALOG_KINDS.items()
+        }
+
+    @staticmethod
+    def copy_available():
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            return hasattr(cursor.cursor, "copy_expert")
+
+    def import_file(self, kind_name, path):
+        """Yield (rows imported, errors) after every batch of the file."""
+        kind = CATALOG_KINDS[kind_name]
+        for batch in batched(read_rows(path), self.batch_size):
+            records, errors = self.validate(kind_name, kind, batch)
+            if records and not self.dry_run:
+                with transaction.atomic():
+                    self.write(kind, records)
+            yield len(records), errors
+
+        if not self.dry_run:
+            self.reset_sequence(kind.model)
+            bump_model_version(kind.model)
+
+    def validate(self, kind_name, kind, batch):
+        records = []
+        errors = []
+        for line_number, row in batch:
+            try:
+                record = {"id": _positive_int(row.get("id"))}
+                for name, parse in kind.fields.items():
+                    record[name] = parse(row.get(name))
+                for name in kind.relations:
+                    record[name] = _id_list(row.get(name) or [])
+            except (TypeError, ValueError) as error:
+                errors.append(f"{kind_name} line {line_number}: {error}")
+                continue
+            records.append((line_number, record))
+
+        missing = self._missing_references(kind, records)
+        duplicates = self._duplicates(kind_name, kind, records)
+        misfits = self._seat_map_misfits(kind, records)
+        valid = []
+        for line_number, record in records:
+            broken = [
+                f"{name}={pk}"
+                for name, pk in self._references(kind, record)
+                if pk in missing[name]
+            ]
+            if broken:
+                errors.append(
+                    f"{kind_name} line {line_number}: unknown "
+                    + ", ".join(broken)
+                )
+                continue
+            if id(record) in duplicates:
+                errors.append(
+                    f"{kind_name} line {line_number}: "
+                    f"{duplicates[id(record)]}"
+                )
+                continue
+            if record["id"] in misfits:
+                errors.append(
+                    f"{kind_name} line {line_number}: "
+                    f"{misfits[record['id']]}"
+                )
+                continue
+            valid.append(record)
+            if self.dry_run:
+                self._remember(kind_name, kind, record)
+        return valid, errors
+
+    def _remember(self, kind_name, kind, record):
+        if kind_name in self.seen_ids:
+            self.seen_ids[kind_name].add(record["id"])
+        for name in kind.unique_fields:
+            self.seen_values[kind_name][name][record[name]] = record["id"]
+
+    def _duplicates(self, kind_name, kind, records):
+        """
+        Map id() of records repeating a unique value of another row, in
+        the database, earlier in the batch or earlier in a dry run, to
+        their error.
+        """
+        duplicates = {}
+        for name in kind.unique_fields:
+            owners = dict(
+                kind.model.objects.filter(
+                    **{f"{name}__in": {record[name] for _, record in records}}
+                ).values_list(name, "id")
+            )
+            owners.update(self.seen_values[kind_name][name])
+            for _, record in records:
+                owner = owners.setdefault(record[name], record["id"])
+                if owner != record["id"]:
+                    duplicates[id(record)] = (
+                        f"{name}={record[name]!r} is used by id {owner}"
+                    )
+        return duplicates
+
+    @staticmethod
+    def _seat_map_misfits(kind, records):
+        """Map ids of records that would strand sold seats to the error."""
+        if kind.seat_map_changes is None:
+            return {}
+        misfits = {}
+        for record, size, performances in kind.seat_map_changes(
+                [record for _, record in records]
+        ):
+            if size is None:
+                continue
+            try:
+                Performance.validate_seats_fit(
+                    performances, *size, ValueError
+                )
+            except ValueError as error:
+                misfits[record["id"]] = error
+        return misfits
+
+    @staticmethod
+    def _references(kind, record):
+        for name in kind.references:
+            yield name, record[name]
+        for name in kind.relations:
+            for pk in record[name]:
+                yield name, pk
+
+    def _missing_references(self, kind, records):
+        targets = {**kind.references, **kind.relations}
+        wanted = {name: set() for name in targets}
+        for _, record in records:
+            for name, pk in self._references(kind, record):
+                wanted[name].add(pk)
+
+        missing = {}
+        for name, model in targets.items():
+            existing = set(
+                model.objects.filter(id__in=wanted[name]).values_list(
+                    "id", flat=True
+                )
+            )
+            seen = self._seen_ids_of(model)
+            missing[name] = {
+                pk for pk in wanted[name] - existing if pk not in seen
+            }
+        return missing
+
+    def _seen_ids_of(self, model):
+        for kind_name, kind in CATALOG_KINDS.items():
+            if kind.model is model and kind_name in self.seen_ids:
+                return self.seen_ids[kind_name]
+        return ()
+
+    def write(self, kind, records):
+        reindexed = []
+        if kind.seat_map_changes is not None:
+            # Lock the performances before their hall changes so no seat
+            # is sold between the upsert and the rebuild
+            reindexed = list(
+                Performance.objects.select_for_update(of=("self",)).filter(
+                    id__in=[
+                        pk
+                        for _, _, performances in kind.seat_map_changes(
+                            records
+                        )
+                        for pk in performances.values_list("id", flat=True)
+                    ]
+                ).values_list("id", flat=True)
+            )
+
+        if self.use_copy:
+            self._copy_upsert(kind, records)
+        else:
+            kind.model.objects.bulk_create(
+                [
+                    kind.model(**{
+                        column: record[column] for column in kind.columns
+                    })
+                    for record in records
+                ],
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=list(kind.fields),
+            )
+
+        for name, related_model in kind.relations.items():
+            through = getattr(kind.model, name).through
+            source = f"{kind.model._meta.model_name}_id"
+            target = f"{related_model._meta.model_name}_id"
+            through.objects.filter(
+                **{f"{source}__in": [record["id"] for record in records]}
+            ).delete()
+            rows = [
+                (record["id"], pk)
+                for record in records
+                for pk in dict.fromkeys(record[name])
+            ]
+            if self.use_copy:
+                self._copy(through._meta.db_table, [source, target], rows)
+            else:
+                through.objects.bulk_create(
+                    through(**{source: source_id, target: pk})
+                    for source_id, pk in rows
+                )
+
+        for performance in Performance.objects.select_related(
+                "theatre_hall"
+        ).filter(id__in=reindexed):
+            performance.rebuild_seats()
+
+        if kind.after_write is not None:
+            kind.after_write([record["id"] for record in records])
+
+    @staticmethod
+    def _copy(table, columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in row
+            )
+        buffer.seek(0)
+
+        quote = connection.ops.quote_name
+        quoted_columns = ", ".join(map(quote, columns))
+        # csv.writer leaves empty strings unquoted, which COPY would read
+        # as NULL. No imported value is ever NULL.
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(table)} ({quoted_columns}) "
+                f"FROM STDIN WITH (FORMAT csv, "
+                f"FORCE_NOT_NULL ({quoted_columns}))",
+                buffer,
+            )
+
+    def _copy_upsert(self, kind, records):
+        quote = connection.ops.quote_name
+        table = kind.model._meta.db_table
+        staging = f"import_{table}"
+        columns = ", ".join(map(quote, kind.columns))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {quote(staging)}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {quote(staging)} AS "
+                f"SELECT {columns} FROM {quote(table)} WITH NO DATA"
+            )
+        self._copy(
+            staging,
+            kind.columns,
+            (
+                [record[column] for column in kind.columns]
+                for record in records
+            ),
+        )
+
+        insert_columns = columns + "".join(
+            f", {quote(column)}" for column in kind.insert_defaults
+        )
+        select_columns = columns + "".join(
+            f", {value}" for value in kind.insert_defaults.values()
+        )
+        updates = ", ".join(
+            f"{quote(column)} = EXCLUDED.{quote(column)}"
+            for column in kind.fields
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(table)} ({insert_columns}) "
+                f"SELECT {select_columns} FROM {quote(staging)} "
+                f"ON CONFLICT ({quote('id')}) DO UPDATE SET {updates}"
+            )
+            cursor.execute(f"DROP TABLE {quote(staging)}")
+
+    @staticmethod
+    def reset_sequence(model):
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
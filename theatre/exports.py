@@ -0,0 +1,117 @@
+import csv
+import datetime
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from theatre.utils import batched
+
+# Rows fetched per round trip and written per chunk of the response
+EXPORT_CHUNK_SIZE = 2000
+
+TICKET_EXPORT_COLUMNS = {
+    "ticket_id": "id",
+    "reservation_id": "reservation_id",
+    "reserved_at": "reservation__created_at",
+    "user_email": "reservation__user__email",
+    "performance_id": "performance_id",
+    "show_time": "performance__show_time",
+    "play": "performance__play__title",
+    "theatre_hall": "performance__theatre_hall__name",
+    "row": "row",
+    "seat": "seat",
+}
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render error details, exports themselves are streamed"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if isinstance(data, dict):
+            writer.writerow(data.keys())
+            writer.writerow(data.values())
+        return buffer.getvalue()
+
+    @staticmethod
+    def stream(columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+        for chunk in batched(rows, EXPORT_CHUNK_SIZE):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                [
+                    value.isoformat()
+                    if isinstance(value, datetime.datetime) else value
+                    for value in row
+                ]
+                for row in chunk
+            )
+            yield buffer.getvalue()
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render error details, exports themselves are streamed"""
+        return json.dumps(data, cls=DjangoJSONEncoder) + "\n"
+
+    @staticmethod
+    def stream(columns, rows):
+        encoder = DjangoJSONEncoder()
+        for chunk in batched(rows, EXPORT_CHUNK_SIZE):
+            yield "".join(
+                encoder.encode(dict(zip(columns, row))) + "\n"
+                for row in chunk
+            )
+
+
+async def _astream(chunks):
+    """
+    Iterate chunks in the request's sync thread, the server-side cursor
+    must stay on the connection that opened it.
+    """
+    to_thread = sync_to_async(next)
+    try:
+        while (chunk := await to_thread(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def export_response(request, queryset, columns, filename):
+    """
+    Stream a flat projection of queryset in the negotiated export format.
+    Rows are read through a server-side cursor so memory use does not
+    depend on the size of the export.
+    """
+    renderer = request.accepted_renderer
+    rows = queryset.values_list(*columns.values()).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    chunks = renderer.stream(list(columns), rows)
+    # ASGI buffers a sync iterator before sending it, WSGI an async one
+    if isinstance(request._request, ASGIRequest):
+        chunks = _astream(chunks)
+    response = StreamingHttpResponse(
+        chunks,
+        content_type=f"{renderer.media_type}; charset=utf-8",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{renderer.format}"'
+    )
+    return response
@@ -0,0 +1,314 @@
+import orjson
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from theatre.models import Play, Ticket
+
+_mappers = {}
+
+
+def datetime_repr(value):
+    """DateTimeField.to_representation of an aware datetime."""
+    if not value:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def compile_mapper(expressions):
+    """
+    Compile (output name, Python expression) pairs into one function
+    map_row(row, related) returning the dict literal, so that a row costs
+    a single call whatever the number of fields.
+    """
+    source = "def map_row(row, related):\n    return {%s}\n" % ", ".join(
+        f"{name!r}: {expression}" for name, expression in expressions
+    )
+    namespace = {"datetime_repr": datetime_repr}
+    exec(compile(source, "<row mapper>", "exec"), namespace)
+    return namespace["map_row"]
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson. The output is identical for
+    already serialized data (strings, numbers, booleans, None, lists and
+    dicts), indented output is left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(
+                accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer escapes these to keep the output valid JavaScript
+        return orjson.dumps(
+            data, default=self.encoder_class().default
+        ).replace(
+            "\u2028".encode(), b"\\u2028"
+        ).replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class FastRows:
+    """
+    values() projection of a list serializer. fields maps each output
+    field, in serializer order, to a Python expression over row (the
+    values() dict) and related ({relation: {row id: values}}) and to the
+    values() names it reads.
+    """
+
+    fields = {}
+
+    def __init__(self, fields=None):
+        self.names = tuple(
+            name for name in self.fields if fields is None or name in fields
+        )
+        self.columns = list(dict.fromkeys(
+            column for name in self.names for column in self.fields[name][1]
+        ))
+
+        key = (type(self), self.names)
+        if key not in _mappers:
+            _mappers[key] = compile_mapper(
+                (name, self.fields[name][0]) for name in self.names
+            )
+        self.map_row = _mappers[key]
+
+    def relations(self, ids):
+        """
+        Return {relation: (values() queryset, key name, value function)}
+        of the related rows the fields need, grouped by row id.
+        """
+        return {}
+
+    @staticmethod
+    def group(rows, key, value):
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row[key], []).append(value(row))
+        return grouped
+
+    def map(self, rows, related):
+        map_row = self.map_row
+        return [map_row(row, related) for row in rows]
+
+
+class PlayRows(FastRows):
+    """PlayListSerializer"""
+
+    fields = {
+        "id": ('row["id"]', ("id",)),
+        "title": ('row["title"]', ("title",)),
+        "description": ('row["description"]', ("description",)),
+        "genres": ('related["genres"].get(row["id"], [])', ("id",)),
+        "actors": ('related["actors"].get(row["id"], [])', ("id",)),
+        "image_variants": ('row["image_variants"]', ("image_variants",)),
+    }
+
+    def relations(self, ids):
+        relations = {}
+        if "genres" in self.names:
+            relations["genres"] = (
+                Play.genres.through.objects.filter(
+                    play_id__in=ids
+                ).order_by("genre_id").values("play_id", "genre__name"),
+                "play_id",
+                lambda row: row["genre__name"],
+            )
+        if "actors" in self.names:
+            relations["actors"] = (
+                Play.actors.through.objects.filter(
+                    play_id__in=ids
+                ).order_by("actor_id").values(
+                    "play_id", "actor__first_name", "actor__last_name"
+                ),
+                "play_id",
+                lambda row: (
+                    f"{row['actor__first_name']} {row['actor__last_name']}"
+                ),
+            )
+        return relations
+
+
+def _performance_fields(prefix):
+    return {
+        "id": (f'row["{prefix}id"]', (f"{prefix}id",)),
+        "show_time": (
+            f'datetime_repr(row["{prefix}show_time"])',
+            (f"{prefix}show_time",),
+        ),
+        "play_title": (
+            f'row["{prefix}play__title"]', (f"{prefix}play__title",)
+        ),
+        "theatre_hall": (
+            f'row["{prefix}theatre_hall__name"]',
+            (f"{prefix}theatre_hall__name",),
+        ),
+        "theatre_hall_capacity": (
+            f'row["{prefix}theatre_hall__rows"]'
+            f' * row["{prefix}theatre_hall__seats_in_row"]',
+            (
+                f"{prefix}theatre_hall__rows",
+                f"{prefix}theatre_hall__seats_in_row",
+            ),
+        ),
+    }
+
+
+class PerformanceRows(FastRows):
+    """PerformanceListSerializer"""
+
+    fields = {
+        **_performance_fields(""),
+        "tickets_available": (
+            'row["tickets_available"]', ("tickets_available",)
+        ),
+    }
+
+
+def _nested(fields):
+    """Field expression building the dict of fields and its columns."""
+    return (
+        "{%s}" % ", ".join(
+            f"{name!r}: {expression}"
+            for name, (expression, _) in fields.items()
+        ),
+        [column for _, columns in fields.values() for column in columns],
+    )
+
+
+class TicketRows(FastRows):
+    """TicketListSerializer, its performance has no tickets_available"""
+
+    fields = {
+        "id": ('row["id"]', ("id",)),
+        "row": ('row["row"]', ("row",)),
+        "seat": ('row["seat"]', ("seat",)),
+        "performance": _nested(_performance_fields("performance__")),
+    }
+
+
+class ReservationRows(FastRows):
+    """ReservationListSerializer"""
+
+    fields = {
+        "id": ('row["id"]', ("id",)),
+        "created_at": (
+            'datetime_repr(row["created_at"])', ("created_at",)
+        ),
+        "tickets": ('related["tickets"].get(row["id"], [])', ("id",)),
+    }
+
+    def relations(self, ids):
+        tickets = TicketRows()
+        return {
+            "tickets": (
+                Ticket.objects.filter(reservation_id__in=ids).order_by(
+                    *Ticket._meta.ordering
+                ).values("reservation_id", *tickets.columns),
+                "reservation_id",
+                lambda row: tickets.map_row(row, None),
+            )
+        }
+
+
+FAST_JSON_RENDERER = FastJSONRenderer()
+
+
+class FastListMixin:
+    """
+    Opt-in list path skipping the serializers: rows are fetched with
+    values(), turned into dicts by the compiled mapper of fast_rows_class
+    and rendered with orjson, byte for byte like the serializer path.
+    Used with settings.FAST_LIST_RESPONSES for compact JSON responses
+    without ?expand=, anything else goes through the serializers.
+    """
+
+    fast_rows_class = None
+
+    def get_fast_rows(self):
+        """Return the FastRows of this request or None."""
+        if not settings.FAST_LIST_RESPONSES or self.fast_rows_class is None:
+            return None
+
+        renderer = self.request.accepted_renderer
+        if type(renderer) is not JSONRenderer or renderer.get_indent(
+                self.request.accepted_media_type, {}
+        ) is not None:
+            return None
+
+        fields = None
+        if hasattr(self, "sparse_fieldset"):
+            fields, expand = self.sparse_fieldset()
+            if expand:
+                return None
+        return self.fast_rows_class(fields)
+
+    def get_fast_queryset(self, rows):
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = ["id", *rows.columns]
+        if self.paginator is not None:
+            # Cursors are read from the ordering columns of the last row
+            columns.extend(
+                name.lstrip("-") for name in self.paginator.get_ordering(
+                    self.request, queryset, self
+                )
+            )
+        return queryset.prefetch_related(None).values(
+            *dict.fromkeys(columns)
+        )
+
+    def _fast_response(self, rows, page, records, related):
+        data = rows.map(records, related)
+        self.request.accepted_renderer = FAST_JSON_RENDERER
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_fast_rows()
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.get_fast_queryset(rows)
+        page = self.paginate_queryset(queryset)
+        records = list(queryset) if page is None else page
+        related = {
+            name: rows.group(relation_queryset, key, value)
+            for name, (relation_queryset, key, value) in rows.relations(
+                [record["id"] for record in records]
+            ).items()
+        }
+        return self._fast_response(rows, page, records, related)
+
+    async def alist(self, request, *args, **kwargs):
+        rows = self.get_fast_rows()
+        if rows is None:
+            return await super().alist(request, *args, **kwargs)
+
+        queryset = self.get_fast_queryset(rows)
+        page = None
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(
+                queryset, request, view=self
+            )
+        records = (
+            [record async for record in queryset] if page is None else page
+        )
+        related = {}
+        for name, (relation_queryset, key, value) in rows.relations(
+                [record["id"] for record in records]
+        ).items():
+            related[name] = rows.group(
+                [row async for row in relation_queryset], key, value
+            )
+        return self._fast_response(rows, page, records, related)
@@ -0,0 +1,108 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from theatre.caching import bump_model_version
+from theatre.models import Play
+
+logger = logging.getLogger(__name__)
+
+# Extension: (Pillow format, save options)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_path(name: str, variant: str, extension: str) -> str:
+    """Variants are named after the content-unique original."""
+    stem, _ = os.path.splitext(os.path.basename(name))
+    return os.path.join(
+        os.path.dirname(name), "variants", f"{stem}-{variant}.{extension}"
+    )
+
+
+def scale_down(image, size):
+    """Copy of image fitting in size, never enlarged."""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    return variant
+
+
+def encode(image, image_format, options) -> bytes:
+    """
+    Encode image without any of the original metadata (EXIF, ICC
+    profile, comments), flattened on white for formats without alpha.
+    """
+    if image_format == "JPEG" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    image.info = {}
+
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def open_upright(file):
+    """Open an image rotated by its EXIF orientation, as RGB(A)."""
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def generate_play_image_variants(play):
+    """
+    Write the PLAY_IMAGE_VARIANTS of play.image in every VARIANT_FORMATS
+    and record them on the play. The result is dropped when another image
+    was uploaded meanwhile, which gets its own variants. Return whether
+    the variants were recorded.
+    """
+    name = play.image.name
+    storage = play.image.storage
+    variants = {}
+    written = []
+    try:
+        with play.image.open("rb") as file:
+            image = open_upright(file)
+    except (OSError, Image.DecompressionBombError):
+        # Recorded as processed without variants, clients keep the image
+        logger.warning("Cannot read image %s of play %s", name, play.pk)
+    else:
+        for variant, size in settings.PLAY_IMAGE_VARIANTS.items():
+            scaled = scale_down(image, size)
+            entry = {"width": scaled.width, "height": scaled.height}
+            for extension, (image_format, options) in (
+                    VARIANT_FORMATS.items()
+            ):
+                saved = storage.save(
+                    variant_path(name, variant, extension),
+                    ContentFile(encode(scaled, image_format, options)),
+                )
+                written.append(saved)
+                entry[extension] = storage.url(saved)
+            variants[variant] = entry
+
+    if Play.objects.filter(pk=play.pk, image=name).update(
+            image_variants=variants
+    ):
+        bump_model_version(Play)
+        return True
+    for saved in written:
+        storage.delete(saved)
+    return False
+
+
+def pending_play_images():
+    """Plays with an image whose variants were not generated yet."""
+    return Play.objects.filter(
+        image_variants__isnull=True
+    ).exclude(image="").exclude(image__isnull=True)
@@ -0,0 +1,173 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from theatre.bench import percentile
+from theatre.models import Performance, Play, TheatreHall
+from theatre.seat_map import SeatMap, unpack_free_runs
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command to measure best-available seat allocation latency"""
+
+    help = (
+        "Fill performances of a large hall up to the given occupancy and "
+        "time best-available allocations, in memory and through the "
+        "locked database path"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=40)
+        parser.add_argument("--seats-in-row", type=int, default=50)
+        parser.add_argument("--occupancy", type=float, default=0.95)
+        parser.add_argument("--performances", type=int, default=20)
+        parser.add_argument(
+            "--allocations",
+            type=int,
+            default=200,
+            help="Number of allocations per quantity",
+        )
+        parser.add_argument(
+            "--quantity",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4],
+            help="Block sizes to allocate",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            help="Write results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            with transaction.atomic():
+                results = self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self._report(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _run(self, options):
+        rng = random.Random(options["seed"])
+        hall = TheatreHall.objects.create(
+            name="Bench allocation hall",
+            rows=options["rows"],
+            seats_in_row=options["seats_in_row"],
+        )
+        play = Play.objects.create(title="Bench allocation play")
+        taken = round(hall.capacity * options["occupancy"])
+
+        performances = []
+        for _ in range(options["performances"]):
+            seat_map = SeatMap(hall.rows, hall.seats_in_row)
+            for index in rng.sample(range(hall.capacity), taken):
+                row, seat = divmod(index, hall.seats_in_row)
+                seat_map.take(row + 1, seat + 1)
+            performance = Performance(
+                play=play,
+                theatre_hall=hall,
+                show_time=timezone.now(),
+                seat_map=seat_map.to_bytes(),
+                tickets_sold=taken,
+            )
+            performance.update_free_runs(seat_map)
+            performances.append(performance)
+        performances = Performance.objects.bulk_create(performances)
+        self.stdout.write(
+            f"Created {len(performances)} performances of "
+            f"{hall.capacity} seats with {taken} taken"
+        )
+
+        results = {
+            "options": {
+                key: options[key] for key in (
+                    "rows", "seats_in_row", "occupancy", "performances",
+                    "allocations", "quantity", "seed",
+                )
+            },
+            "quantities": {},
+        }
+        for quantity in options["quantity"]:
+            results["quantities"][str(quantity)] = {
+                "memory": self._measure_memory(
+                    performances, quantity, options["allocations"]
+                ),
+                "database": self._measure_database(
+                    performances, quantity, options["allocations"]
+                ),
+            }
+        return results
+
+    @staticmethod
+    def _measure_memory(performances, quantity, allocations):
+        latencies = []
+        allocated = 0
+        for index in range(allocations):
+            performance = performances[index % len(performances)]
+            started = time.perf_counter()
+            seat_map = performance.seats
+            block = seat_map.best_block(
+                quantity, unpack_free_runs(performance.free_runs)
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            allocated += block is not None
+        return _summary(latencies, allocated)
+
+    @staticmethod
+    def _measure_database(performances, quantity, allocations):
+        latencies = []
+        allocated = 0
+        for index in range(allocations):
+            performance = performances[index % len(performances)]
+            started = time.perf_counter()
+            try:
+                Performance.allocate_seats(
+                    performance.id, quantity, ValidationError
+                )
+                allocated += 1
+            except ValidationError:
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+        return _summary(latencies, allocated)
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'quantity':<10}{'path':<10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'allocated':>11}"
+        )
+        for quantity, paths in results["quantities"].items():
+            for path, summary in paths.items():
+                self.stdout.write(
+                    f"{quantity:<10}{path:<10}"
+                    f"{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}"
+                    f"{summary['p99_ms']:>10.3f}"
+                    f"{summary['allocated']:>6}/{summary['allocations']}"
+                )
+
+
+def _summary(latencies, allocated):
+    return {
+        "allocations": len(latencies),
+        "allocated": allocated,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
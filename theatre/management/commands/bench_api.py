@@ -0,0 +1,403 @@
+import io
+import itertools
+import json
+import time
+from unittest import mock
+
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from theatre.bench import build_dataset, percentile
+from theatre.caching import bump_model_version
+from theatre.models import Actor, Genre, Performance, Play, TheatreHall
+
+BENCH_PASSWORD = "bench12345"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command to benchmark every API route on a synthetic dataset"""
+
+    help = (
+        "Generate a reproducible dataset, drive every route in theatre.urls "
+        "and user.urls through the test client and report latency "
+        "percentiles, queries per request and response size"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--halls", type=int, default=5)
+        parser.add_argument("--genres", type=int, default=20)
+        parser.add_argument("--actors", type=int, default=200)
+        parser.add_argument("--plays", type=int, default=100)
+        parser.add_argument("--performances", type=int, default=1000)
+        parser.add_argument("--tickets", type=int, default=100000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Number of requests per route",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write results as JSON to this file",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Print the change against a previous JSON result",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Commit the generated dataset instead of rolling it back",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            with transaction.atomic():
+                results = self._run(options)
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        self._report(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline:
+                self._compare(json.load(baseline), results)
+
+    def _run(self, options):
+        dataset = build_dataset(
+            halls=options["halls"],
+            genres=options["genres"],
+            actors=options["actors"],
+            plays=options["plays"],
+            performances=options["performances"],
+            tickets=options["tickets"],
+            users=options["users"],
+            days=options["days"],
+            seed=options["seed"],
+            stdout=self.stdout,
+        )
+        for model in (TheatreHall, Genre, Actor, Play):
+            bump_model_version(model)
+
+        admin = get_user_model().objects.create_user(
+            email=f"bench-admin{options['seed']}@bench.local",
+            password=BENCH_PASSWORD,
+            is_staff=True,
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        anonymous = APIClient()
+
+        results = {
+            "options": {
+                key: options[key] for key in (
+                    "halls", "genres", "actors", "plays", "performances",
+                    "tickets", "users", "days", "seed", "requests",
+                )
+            },
+            "routes": {},
+        }
+        uploads = []
+        # Throttling would reject most of the benchmark traffic
+        with mock.patch.object(
+                APIView, "get_throttles", return_value=[]
+        ), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            for name, make_request in self._routes(
+                    client,
+                    anonymous,
+                    admin,
+                    dataset,
+                    uploads,
+                    options["requests"],
+            ):
+                results["routes"][name] = self._measure(
+                    make_request, options["requests"]
+                )
+        if not options["keep"]:
+            for name in uploads:
+                default_storage.delete(name)
+        return results
+
+    @staticmethod
+    def _routes(client, anonymous, admin, dataset, uploads, requests):
+        counter = itertools.count()
+        performance = Performance.objects.select_related(
+            "theatre_hall"
+        ).get(id=dataset["performances"][0])
+        seat_map = performance.seats
+        free_seats = (
+            {"row": row, "seat": seat}
+            for row in range(1, seat_map.rows + 1)
+            for seat in range(1, seat_map.seats_in_row + 1)
+            if not seat_map.is_taken(row, seat)
+        )
+        play_id = dataset["plays"][0]
+        token = anonymous.post(
+            reverse("user:token_obtain_pair"),
+            {"email": admin.email, "password": BENCH_PASSWORD},
+        ).data
+        image = io.BytesIO()
+        Image.new("RGB", (800, 1200)).save(image, format="JPEG")
+
+        # Rows the delete routes remove, one per request
+        deletable = {
+            model: iter(
+                model.objects.bulk_create(
+                    model(**fields(next(counter))) for _ in range(requests)
+                )
+            )
+            for model, fields in (
+                (Genre, lambda index: {"name": f"Bench old genre {index}"}),
+                (
+                    Actor,
+                    lambda index: {"first_name": "Old", "last_name": "Actor"},
+                ),
+                (
+                    TheatreHall,
+                    lambda index: {
+                        "name": "Bench old hall", "rows": 1, "seats_in_row": 1
+                    },
+                ),
+                (Play, lambda index: {"title": "Bench old play"}),
+                (
+                    Performance,
+                    lambda index: {
+                        "play_id": play_id,
+                        "theatre_hall_id": dataset["halls"][0],
+                        "show_time": performance.show_time,
+                    },
+                ),
+            )
+        }
+        for model in deletable:
+            bump_model_version(model)
+
+        def detail(name, pk):
+            return reverse(f"theatre:{name}-detail", args=[pk])
+
+        def update(name, pk, data):
+            return lambda: client.patch(detail(name, pk), data)
+
+        def delete(name, model):
+            return lambda: client.delete(
+                detail(name, next(deletable[model]).id)
+            )
+
+        def hold(seats):
+            return client.post(
+                reverse("theatre:performance-holds", args=[performance.id]),
+                {"seats": seats},
+                format="json",
+            )
+
+        def hold_and_release():
+            response = hold([next(free_seats)])
+            client.delete(detail("seathold", response.data["id"]))
+            return response
+
+        def hold_and_reserve():
+            response = hold([next(free_seats)])
+            return client.post(
+                reverse("theatre:seathold-reserve", args=[response.data["id"]])
+            )
+
+        def upload_image():
+            image.seek(0)
+            response = client.post(
+                reverse("theatre:play-upload-image", args=[play_id]),
+                {"image": SimpleUploadedFile(
+                    "poster.jpg", image.read(), content_type="image/jpeg"
+                )},
+                format="multipart",
+            )
+            uploads.append(Play.objects.get(id=play_id).image.name)
+            return response
+
+        return [
+            ("genre-list", lambda: client.get(
+                reverse("theatre:genre-list"))),
+            ("genre-retrieve", lambda: client.get(
+                detail("genre", dataset["genres"][0]))),
+            ("genre-create", lambda: client.post(
+                reverse("theatre:genre-list"),
+                {"name": f"Bench new genre {next(counter)}"})),
+            ("genre-update", lambda: client.patch(
+                detail("genre", dataset["genres"][0]),
+                {"name": f"Bench renamed genre {next(counter)}"})),
+            ("genre-delete", delete("genre", Genre)),
+            ("actor-list", lambda: client.get(
+                reverse("theatre:actor-list"))),
+            ("actor-retrieve", lambda: client.get(
+                detail("actor", dataset["actors"][0]))),
+            ("actor-create", lambda: client.post(
+                reverse("theatre:actor-list"),
+                {"first_name": "Bench", "last_name": "Actor"})),
+            ("actor-update", update(
+                "actor", dataset["actors"][0], {"last_name": "Renamed"})),
+            ("actor-delete", delete("actor", Actor)),
+            ("theatrehall-list", lambda: client.get(
+                reverse("theatre:theatrehall-list"))),
+            ("theatrehall-retrieve", lambda: client.get(
+                detail("theatrehall", dataset["halls"][0]))),
+            ("theatrehall-create", lambda: client.post(
+                reverse("theatre:theatrehall-list"),
+                {"name": "Bench hall", "rows": 20, "seats_in_row": 30})),
+            ("theatrehall-update", update(
+                "theatrehall", dataset["halls"][0], {"name": "Renamed"})),
+            ("theatrehall-delete", delete("theatrehall", TheatreHall)),
+            ("play-list", lambda: client.get(
+                reverse("theatre:play-list"))),
+            ("play-list-filtered", lambda: client.get(
+                reverse("theatre:play-list"),
+                {"genres": ",".join(map(str, dataset["genres"][:3]))})),
+            ("play-search", lambda: client.get(
+                reverse("theatre:play-list"), {"search": "bench play"})),
+            ("play-retrieve", lambda: client.get(
+                detail("play", play_id))),
+            ("play-create", lambda: client.post(
+                reverse("theatre:play-list"),
+                {
+                    "title": "Bench new play",
+                    "genres": dataset["genres"][:2],
+                    "actors": dataset["actors"][:5],
+                })),
+            ("play-update", update(
+                "play", play_id, {"description": "Updated description"})),
+            ("play-delete", delete("play", Play)),
+            ("play-upload-image", upload_image),
+            ("performance-list", lambda: client.get(
+                reverse("theatre:performance-list"))),
+            ("performance-list-by-play", lambda: client.get(
+                reverse("theatre:performance-list"), {"play": play_id})),
+            ("performance-retrieve", lambda: client.get(
+                detail("performance", performance.id))),
+            ("performance-retrieve-bitset", lambda: client.get(
+                detail("performance", performance.id),
+                {"seatmap": "bitset"})),
+            ("performance-create", lambda: client.post(
+                reverse("theatre:performance-list"),
+                {
+                    "play": play_id,
+                    "theatre_hall": dataset["halls"][0],
+                    "show_time": performance.show_time,
+                })),
+            ("performance-update", update(
+                "performance",
+                performance.id,
+                {"show_time": performance.show_time})),
+            ("performance-delete", delete("performance", Performance)),
+            ("performance-manifest", lambda: client.get(
+                reverse("theatre:performance-manifest",
+                        args=[performance.id]))),
+            ("performance-holds", hold_and_release),
+            ("seathold-list", lambda: client.get(
+                reverse("theatre:seathold-list"))),
+            ("seathold-reserve", hold_and_reserve),
+            ("reservation-list", lambda: client.get(
+                reverse("theatre:reservation-list"))),
+            ("reservation-create", lambda: client.post(
+                reverse("theatre:reservation-list"),
+                {"tickets": [
+                    {**next(free_seats), "performance": performance.id}
+                ]},
+                format="json")),
+            ("reservation-export", lambda: client.get(
+                reverse("theatre:reservation-export"))),
+            ("db-metrics", lambda: client.get(reverse("db-metrics"))),
+            ("user-create", lambda: anonymous.post(
+                reverse("user:create"),
+                {
+                    "email": f"bench-new{next(counter)}@bench.local",
+                    "password": BENCH_PASSWORD,
+                })),
+            ("user-token", lambda: anonymous.post(
+                reverse("user:token_obtain_pair"),
+                {"email": admin.email, "password": BENCH_PASSWORD})),
+            ("user-token-refresh", lambda: anonymous.post(
+                reverse("user:token_refresh"),
+                {"refresh": token["refresh"]})),
+            ("user-token-verify", lambda: anonymous.post(
+                reverse("user:token_verify"),
+                {"token": token["access"]})),
+            ("user-manage", lambda: client.get(reverse("user:manage"))),
+        ]
+
+    @staticmethod
+    def _measure(make_request, requests):
+        latencies = []
+        queries = []
+        sizes = []
+        statuses = set()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = make_request()
+                # Streamed responses run their queries while being read
+                size = (
+                    sum(map(len, response.streaming_content))
+                    if response.streaming else len(response.content)
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context))
+            sizes.append(size)
+            statuses.add(response.status_code)
+
+        return {
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries": max(queries),
+            "bytes": max(sizes),
+            "statuses": sorted(statuses),
+        }
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'route':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}{'bytes':>10}  status"
+        )
+        for name, route in results["routes"].items():
+            self.stdout.write(
+                f"{name:<28}{route['p50_ms']:>10.2f}{route['p95_ms']:>10.2f}"
+                f"{route['p99_ms']:>10.2f}{route['queries']:>9}"
+                f"{route['bytes']:>10}  {route['statuses']}"
+            )
+
+    def _compare(self, baseline, results):
+        self.stdout.write("Change against baseline (p95 ms, queries, bytes):")
+        for name, route in results["routes"].items():
+            before = baseline["routes"].get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{name:<28}"
+                f"{route['p95_ms'] - before['p95_ms']:>+10.2f}"
+                f"{route['queries'] - before['queries']:>+9}"
+                f"{route['bytes'] - before['bytes']:>+10}"
+            )
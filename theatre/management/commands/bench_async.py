@@ -0,0 +1,223 @@
+import asyncio
+import json
+import time
+from types import ModuleType
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import include, path
+from django.utils.module_loading import import_string
+from rest_framework.routers import DefaultRouter
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.bench import build_dataset, percentile
+from theatre.views import (
+    ActorViewSet,
+    GenreViewSet,
+    PerformanceViewSet,
+    PlayViewSet,
+    TheatreHallViewSet,
+)
+
+READ_VIEWSETS = {
+    "genres": GenreViewSet,
+    "actors": ActorViewSet,
+    "theatre_halls": TheatreHallViewSet,
+    "plays": PlayViewSet,
+    "performances": PerformanceViewSet,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def read_urlconf(async_reads):
+    """URLconf serving the catalog viewsets with or without async reads"""
+    router = DefaultRouter()
+    for prefix, viewset in READ_VIEWSETS.items():
+        router.register(
+            prefix,
+            type(viewset.__name__, (viewset,), {"async_reads": async_reads}),
+            basename=viewset.queryset.model._meta.model_name,
+        )
+    urlconf = ModuleType(f"bench_async_urls_{async_reads}")
+    urlconf.urlpatterns = [
+        path("api/theatre/", include((router.urls, "theatre")))
+    ]
+    return urlconf
+
+
+def async_capable_middleware():
+    return [
+        name for name in settings.MIDDLEWARE
+        if getattr(import_string(name), "async_capable", False)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to compare sync and async catalog read throughput"""
+
+    help = (
+        "Generate a reproducible dataset and drive the catalog list and "
+        "retrieve endpoints with concurrent ASGI clients, once through the "
+        "sync viewsets and once through the async read path"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--halls", type=int, default=5)
+        parser.add_argument("--genres", type=int, default=20)
+        parser.add_argument("--actors", type=int, default=200)
+        parser.add_argument("--plays", type=int, default=100)
+        parser.add_argument("--performances", type=int, default=1000)
+        parser.add_argument("--tickets", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=20,
+            help="Number of concurrent clients",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of requests per route and path",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the catalog response cache enabled",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            with transaction.atomic():
+                results = self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self._report(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _run(self, options):
+        dataset = build_dataset(
+            halls=options["halls"],
+            genres=options["genres"],
+            actors=options["actors"],
+            plays=options["plays"],
+            performances=options["performances"],
+            tickets=options["tickets"],
+            users=1,
+            seed=options["seed"],
+            stdout=self.stdout,
+        )
+        user = get_user_model().objects.get(id=dataset["users"][0])
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        routes = {
+            "genre-list": "genres/",
+            "actor-list": "actors/",
+            "theatrehall-list": "theatre_halls/",
+            "play-list": "plays/",
+            "play-retrieve": f"plays/{dataset['plays'][0]}/",
+            "performance-list": "performances/",
+            "performance-retrieve": (
+                f"performances/{dataset['performances'][0]}/"
+            ),
+        }
+
+        overrides = {
+            # Sync-only middleware would run every request in a thread
+            "DEBUG": False,
+            "MIDDLEWARE": async_capable_middleware(),
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        }
+        if not options["cache"]:
+            overrides["CACHES"] = {
+                settings.CATALOG_CACHE_ALIAS: {
+                    "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+                }
+            }
+
+        results = {
+            "options": {
+                key: options[key] for key in (
+                    "halls", "genres", "actors", "plays", "performances",
+                    "tickets", "seed", "clients", "requests", "cache",
+                )
+            },
+            "routes": {},
+        }
+        # Throttling would reject most of the benchmark traffic
+        with mock.patch.object(
+                APIView, "get_throttles", return_value=[]
+        ), override_settings(**overrides):
+            for mode, async_reads in (("sync", False), ("async", True)):
+                urlconf = read_urlconf(async_reads)
+                with override_settings(ROOT_URLCONF=urlconf):
+                    for name, url in routes.items():
+                        route = results["routes"].setdefault(name, {})
+                        route[mode] = async_to_sync(self._measure)(
+                            f"/api/theatre/{url}",
+                            headers,
+                            options["clients"],
+                            options["requests"],
+                        )
+        return results
+
+    @staticmethod
+    async def _measure(url, headers, clients, requests):
+        remaining = iter(range(requests))
+        latencies = []
+        statuses = set()
+
+        async def client_loop():
+            client = AsyncClient()
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "requests_per_second": round(requests / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "statuses": sorted(statuses),
+        }
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'route':<24}{'sync req/s':>12}{'async req/s':>13}"
+            f"{'sync p95':>10}{'async p95':>11}  status"
+        )
+        for name, route in results["routes"].items():
+            sync, async_ = route["sync"], route["async"]
+            self.stdout.write(
+                f"{name:<24}"
+                f"{sync['requests_per_second']:>12.1f}"
+                f"{async_['requests_per_second']:>13.1f}"
+                f"{sync['p95_ms']:>10.2f}{async_['p95_ms']:>11.2f}  "
+                f"{sorted({*sync['statuses'], *async_['statuses']})}"
+            )
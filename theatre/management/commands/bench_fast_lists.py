@@ -0,0 +1,152 @@
+import json
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from theatre.bench import build_dataset, percentile
+from theatre.caching import get_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command to compare the serializer and fast list paths"""
+
+    help = (
+        "Generate a reproducible dataset and time the play, performance "
+        "and reservation lists rendered by the serializers and by the "
+        "fast values() path, checking that both return the same bytes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plays", type=int, default=500)
+        parser.add_argument("--performances", type=int, default=2000)
+        parser.add_argument("--tickets", type=int, default=20000)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Number of requests per list and path",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            with transaction.atomic():
+                results = self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self._report(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _run(self, options):
+        build_dataset(
+            plays=options["plays"],
+            performances=options["performances"],
+            tickets=options["tickets"],
+            users=options["users"],
+            seed=options["seed"],
+            stdout=self.stdout,
+        )
+        # The user with the most reservations lists them
+        user = get_user_model().objects.annotate(
+            reservation_count=Count("reservations")
+        ).order_by("-reservation_count").first()
+        client = APIClient()
+        client.force_authenticate(user)
+
+        page_size = {"page_size": options["page_size"]}
+        results = {
+            "options": {
+                key: options[key] for key in (
+                    "plays", "performances", "tickets", "users",
+                    "page_size", "seed", "requests",
+                )
+            },
+            "lists": {},
+        }
+        # Throttling would reject most of the benchmark traffic
+        with mock.patch.object(
+                APIView, "get_throttles", return_value=[]
+        ), override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            for name in ("play", "performance", "reservation"):
+                url = reverse(f"theatre:{name}-list")
+                measured = {}
+                for path, enabled in (("serializer", False), ("fast", True)):
+                    with override_settings(FAST_LIST_RESPONSES=enabled):
+                        measured[path] = self._measure(
+                            lambda: client.get(url, page_size),
+                            options["requests"],
+                        )
+                results["lists"][f"{name}-list"] = {
+                    "serializer": measured["serializer"][0],
+                    "fast": measured["fast"][0],
+                    "identical": (
+                        measured["serializer"][1] == measured["fast"][1]
+                    ),
+                }
+        return results
+
+    @staticmethod
+    def _measure(make_request, requests):
+        latencies = []
+        content = None
+        for _ in range(requests):
+            # Catalog responses would otherwise come from the cache
+            get_cache().clear()
+            started = time.perf_counter()
+            response = make_request()
+            latencies.append((time.perf_counter() - started) * 1000)
+            content = response.content
+
+        return (
+            {
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "p99_ms": round(percentile(latencies, 99), 3),
+                "bytes": len(content),
+                "status": response.status_code,
+            },
+            content,
+        )
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'list':<20}{'path':<12}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'bytes':>10}  identical"
+        )
+        for name, paths in results["lists"].items():
+            for path in ("serializer", "fast"):
+                summary = paths[path]
+                self.stdout.write(
+                    f"{name:<20}{path:<12}"
+                    f"{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}"
+                    f"{summary['p99_ms']:>10.2f}{summary['bytes']:>10}"
+                    f"  {paths['identical']}"
+                )
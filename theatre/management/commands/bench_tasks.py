@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from theatre.bench import percentile
+from theatre.models import Task
+from theatre.task_queue import claim, enqueue, run, task
+
+
+@task
+def bench_noop():
+    pass
+
+
+class Command(BaseCommand):
+    """Django command to measure task queue throughput"""
+
+    help = (
+        "Time enqueueing no-op tasks one by one, then claiming and running "
+        "them with each batch size and number of concurrent workers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tasks",
+            type=int,
+            default=2000,
+            help="Number of tasks per measurement",
+        )
+        parser.add_argument(
+            "--batch-sizes",
+            default="1,10,100",
+            help="Comma-separated batch sizes to claim with",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Concurrent worker threads, each with its own connection",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        batch_sizes = [int(size) for size in options["batch_sizes"].split(",")]
+        results = {
+            "options": {
+                "tasks": options["tasks"],
+                "batch_sizes": batch_sizes,
+                "workers": options["workers"],
+                "database": settings.DATABASES["default"]["ENGINE"],
+            },
+            "claim": {},
+        }
+        bench_tasks = Task.objects.filter(name=bench_noop.task_name)
+        try:
+            results["enqueue"] = self._enqueue(options["tasks"])
+            for batch_size in batch_sizes:
+                bench_tasks.delete()
+                Task.objects.bulk_create(
+                    Task(name=bench_noop.task_name, max_attempts=1)
+                    for _ in range(options["tasks"])
+                )
+                results["claim"][str(batch_size)] = self._claim(
+                    batch_size, options["workers"], options["tasks"]
+                )
+        finally:
+            bench_tasks.delete()
+
+        self._report(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    @staticmethod
+    def _enqueue(tasks):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(tasks):
+            enqueued = time.perf_counter()
+            enqueue(bench_noop)
+            latencies.append((time.perf_counter() - enqueued) * 1000)
+        elapsed = time.perf_counter() - started
+
+        return {
+            "tasks_per_second": round(tasks / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        }
+
+    @staticmethod
+    def _claim(batch_size, workers, tasks):
+        ran = []
+
+        def work():
+            count = 0
+            while claimed := claim(batch_size, names=[bench_noop.task_name]):
+                count += sum(run(task) for task in claimed)
+            ran.append(count)
+
+        def thread_work():
+            try:
+                work()
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        if workers == 1:
+            # On this thread's connection, which sees uncommitted test data
+            work()
+        else:
+            threads = [
+                threading.Thread(target=thread_work) for _ in range(workers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "tasks_per_second": round(sum(ran) / elapsed, 1),
+            "ran": sum(ran),
+            "duplicates": sum(ran) - tasks,
+        }
+
+    def _report(self, results):
+        enqueue_summary = results["enqueue"]
+        self.stdout.write(
+            f"enqueue: {enqueue_summary['tasks_per_second']:.1f} tasks/s "
+            f"(p50 {enqueue_summary['p50_ms']:.2f} ms, "
+            f"p99 {enqueue_summary['p99_ms']:.2f} ms)"
+        )
+        self.stdout.write(
+            f"{'batch size':<12}{'tasks/s':>12}{'ran':>10}{'duplicates':>12}"
+        )
+        for batch_size, summary in results["claim"].items():
+            self.stdout.write(
+                f"{batch_size:<12}{summary['tasks_per_second']:>12.1f}"
+                f"{summary['ran']:>10}{summary['duplicates']:>12}"
+            )
@@ -0,0 +1,118 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.throttling import UserRateThrottle
+
+from theatre.bench import percentile
+from theatre.models import ThrottleBucket
+from theatre.throttling import UserSlidingWindowThrottle
+
+BACKENDS = {
+    "cache": UserRateThrottle,
+    "database": UserSlidingWindowThrottle,
+}
+
+
+class Command(BaseCommand):
+    """Django command to time the throttle check of a request"""
+
+    help = (
+        "Time allow_request() of DRF's cache throttle and of the database "
+        "sliding-window throttle for authenticated requests spread over "
+        "a number of clients"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--checks",
+            type=int,
+            default=2000,
+            help="Number of throttle checks per backend",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=50,
+            help="Number of distinct users the checks are spread over",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        results = {
+            "options": {
+                key: options[key] for key in ("checks", "clients")
+            },
+            "backends": {},
+        }
+        # Unsaved users, only their pk is read by the throttles
+        requests = []
+        for pk in range(1, options["clients"] + 1):
+            request = Request(RequestFactory().get("/"))
+            request.user = get_user_model()(pk=pk)
+            requests.append(request)
+
+        for name, throttle_class in BACKENDS.items():
+            # High enough for every check to be allowed
+            bench_class = type(
+                f"Bench{throttle_class.__name__}",
+                (throttle_class,),
+                {"scope": "bench", "rate": f"{options['checks']}/minute"},
+            )
+            try:
+                results["backends"][name] = self._measure(
+                    bench_class, requests, options["checks"]
+                )
+            finally:
+                ThrottleBucket.objects.filter(
+                    key__startswith="throttle_bench_"
+                ).delete()
+                cache.delete_many(
+                    f"throttle_bench_{request.user.pk}"
+                    for request in requests
+                )
+
+        self._report(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    @staticmethod
+    def _measure(throttle_class, requests, checks):
+        latencies = []
+        allowed = 0
+        for index in range(checks):
+            request = requests[index % len(requests)]
+            started = time.perf_counter()
+            # Views instantiate their throttles on every request
+            allowed += throttle_class().allow_request(request, None)
+            latencies.append((time.perf_counter() - started) * 1000000)
+
+        return {
+            "p50_us": round(percentile(latencies, 50), 1),
+            "p95_us": round(percentile(latencies, 95), 1),
+            "p99_us": round(percentile(latencies, 99), 1),
+            "allowed": allowed,
+        }
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'backend':<12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"
+            f"{'allowed':>10}"
+        )
+        for name, summary in results["backends"].items():
+            self.stdout.write(
+                f"{name:<12}{summary['p50_us']:>10.1f}"
+                f"{summary['p95_us']:>10.1f}{summary['p99_us']:>10.1f}"
+                f"{summary['allowed']:>10}"
+            )
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.catalog_import import IMPORT_ORDER, CatalogImporter
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    """Django command to stream a catalog from CSV or JSONL files"""
+
+    help = (
+        "Upsert halls, genres, actors, plays and performances from CSV or "
+        "JSONL files (by extension) in fixed-size batches. Every row needs "
+        "an id; plays list actor and genre ids as arrays (JSONL) or "
+        "comma separated values (CSV)."
+    )
+
+    def add_arguments(self, parser):
+        for kind in IMPORT_ORDER:
+            parser.add_argument(f"--{kind}", metavar="PATH")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate every file without writing to the database",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create even when PostgreSQL COPY is available",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        files = [
+            (kind, options[kind]) for kind in IMPORT_ORDER if options[kind]
+        ]
+        if not files:
+            raise CommandError("Pass at least one file to import")
+
+        importer = CatalogImporter(
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+            use_copy=False if options["no_copy"] else None,
+        )
+        mode = "Validating" if options["dry_run"] else "Importing"
+        method = "COPY" if importer.use_copy else "bulk_create"
+        self.stdout.write(f"{mode} catalog using {method}")
+
+        errors_count = 0
+        for kind, path in files:
+            started = time.perf_counter()
+            imported = 0
+            for batch_imported, errors in importer.import_file(kind, path):
+                imported += batch_imported
+                for error in errors:
+                    if errors_count < MAX_REPORTED_ERRORS:
+                        self.stderr.write(error)
+                    errors_count += 1
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{kind}: {imported} rows "
+                    f"({imported / max(elapsed, 1e-9):.0f} rows/s)"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{kind}: {imported} rows in "
+                    f"{time.perf_counter() - started:.2f}s"
+                )
+            )
+
+        if errors_count:
+            raise CommandError(f"{errors_count} invalid row(s) skipped")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from theatre.images import pending_play_images
+from theatre.task_queue import enqueue
+from theatre.tasks import process_play_image
+
+
+class Command(BaseCommand):
+    """
+    Django command to queue the variants of play images uploaded before
+    they were generated in the background, for run_worker to process
+    """
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        play_ids = pending_play_images().order_by("id").values_list(
+            "id", flat=True
+        )
+        queued = 0
+        for play_id in play_ids.iterator():
+            enqueue(process_play_image, play_id=play_id)
+            queued += 1
+        self.stdout.write(f"Queued {queued} play image(s)")
@@ -0,0 +1,12 @@
+import time
+
+from theatre.management.sweep import SweepCommand
+from theatre.models import ThrottleBucket
+
+
+class Command(SweepCommand):
+    """Django command to delete throttle buckets out of every window"""
+
+    def sweep(self):
+        purged = ThrottleBucket.purge_expired(time.time())
+        return f"Purged {purged} expired throttle bucket(s)"
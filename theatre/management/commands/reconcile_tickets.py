@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from theatre.models import Performance
+
+
+class Command(BaseCommand):
+    """Django command to fix drift of performance seat maps and counters"""
+
+    help = (
+        "Recompute Performance seat maps and counters from tickets "
+        "and active seat holds where they have drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--performance",
+            type=int,
+            action="append",
+            dest="performances",
+            help="Only check the given performance id (can be repeated)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted performances without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        queryset = Performance.objects.select_related(
+            "theatre_hall"
+        ).annotate(tickets_count=Count("tickets")).order_by("id")
+        if options["performances"]:
+            queryset = queryset.filter(id__in=options["performances"])
+
+        fixed = 0
+        for performance in queryset.iterator(chunk_size=500):
+            if (
+                performance.tickets_sold == performance.tickets_count
+                and performance.seats.taken_count()
+                == performance.tickets_sold + performance.seats_held
+            ):
+                continue
+
+            self.stdout.write(
+                f"Performance {performance.id}: tickets_sold="
+                f"{performance.tickets_sold}, "
+                f"tickets={performance.tickets_count}"
+            )
+            fixed += 1
+            if not options["dry_run"]:
+                with transaction.atomic():
+                    performance = Performance.objects.select_for_update(
+                        of=("self",)
+                    ).select_related("theatre_hall").get(id=performance.id)
+                    performance.rebuild_seats()
+
+        action = "Found" if options["dry_run"] else "Reconciled"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {fixed} drifted performance(s)")
+        )
@@ -0,0 +1,10 @@
+from theatre.management.sweep import SweepCommand
+from theatre.models import SeatHold
+
+
+class Command(SweepCommand):
+    """Django command to release seats of expired seat holds"""
+
+    def sweep(self):
+        released = SeatHold.release_expired()
+        return f"Released {released} expired seat hold(s)"
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from theatre.task_queue import claim, run
+
+
+class Command(BaseCommand):
+    """Django command to run queued background tasks"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Number of tasks claimed at once",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait for new tasks when none is due",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as no task is due",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        while True:
+            # Long-running process, as between requests
+            close_old_connections()
+            tasks = claim(options["batch_size"])
+            if tasks:
+                succeeded = sum(run(task) for task in tasks)
+                self.stdout.write(
+                    f"Ran {len(tasks)} task(s), "
+                    f"{len(tasks) - succeeded} failed"
+                )
+                continue
+
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
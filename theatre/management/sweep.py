@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class SweepCommand(BaseCommand):
+    """Base of the commands that sweep once or every --interval seconds"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep sweeping every given number of seconds",
+        )
+
+    def sweep(self) -> str:
+        """Sweep once and return the line to report"""
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        while True:
+            # Long-running process, as between requests
+            close_old_connections()
+            self.stdout.write(self.sweep())
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
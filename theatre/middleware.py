@@ -0,0 +1,101 @@
+import logging
+import os
+import traceback
+from collections import Counter
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+# Connections are thread local, these run in the thread the request's
+# sync code and async ORM calls use
+@sync_to_async
+def _add_execute_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+@sync_to_async
+def _remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class RepeatedQueriesMiddleware:
+    """
+    Dev-mode N+1 detector: report SQL statements executed with the same
+    shape at least N_PLUS_ONE_THRESHOLD times within one request, together
+    with the project stack that triggered them. Async capable, so the
+    async read views keep running on the event loop under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.N_PLUS_ONE_THRESHOLD
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _project_stack():
+        base_dir = str(settings.BASE_DIR)
+        frames = [
+            frame for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(base_dir)
+            and f"{os.sep}site-packages{os.sep}" not in frame.filename
+        ]
+        return "".join(traceback.format_list(frames))
+
+    def _recorder(self, counts, stacks):
+        def record(execute, sql, params, many, context):
+            counts[sql] += 1
+            if counts[sql] == self.threshold:
+                stacks[sql] = self._project_stack()
+            return execute(sql, params, many, context)
+        return record
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counts = Counter()
+        stacks = {}
+        with connection.execute_wrapper(self._recorder(counts, stacks)):
+            response = self.get_response(request)
+        return self._report(request, response, counts, stacks)
+
+    async def __acall__(self, request):
+        counts = Counter()
+        stacks = {}
+        record = self._recorder(counts, stacks)
+        await _add_execute_wrapper(record)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await _remove_execute_wrapper(record)
+        return self._report(request, response, counts, stacks)
+
+    @staticmethod
+    def _report(request, response, counts, stacks):
+        for sql, stack in stacks.items():
+            logger.warning(
+                "Query repeated %d times in %s %s: %s\nTriggered by:\n%s",
+                counts[sql],
+                request.method,
+                request.path,
+                sql,
+                stack,
+            )
+        if stacks:
+            response["X-Repeated-Queries"] = str(len(stacks))
+        return response
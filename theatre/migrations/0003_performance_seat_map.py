@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+from theatre.seat_map import SeatMap
+
+
+def build_seat_maps(apps, schema_editor):
+    Performance = apps.get_model("theatre", "Performance")
+    Ticket = apps.get_model("theatre", "Ticket")
+
+    for performance in Performance.objects.select_related("theatre_hall"):
+        seats = SeatMap(
+            performance.theatre_hall.rows,
+            performance.theatre_hall.seats_in_row,
+        )
+        tickets = Ticket.objects.filter(
+            performance=performance
+        ).values_list("row", "seat")
+        for row, seat in tickets:
+            seats.take(row, seat)
+        performance.seat_map = seats.to_bytes()
+        performance.save(update_fields=["seat_map"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0002_play_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performance',
+            name='seat_map',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(build_seat_maps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 02:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0004_performance_tickets_sold'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performance',
+            name='seats_held',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('performance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='theatre.performance')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['expires_at'],
+                'indexes': [models.Index(fields=['performance', 'expires_at'], name='theatre_sea_perform_3b69e6_idx')],
+            },
+        ),
+    ]
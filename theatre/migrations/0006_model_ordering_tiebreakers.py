@@ -0,0 +1,25 @@
+# Generated by Django 5.0.3 on 2026-10-18 02:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0005_seat_holds'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='performance',
+            options={'ordering': ['-show_time', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='play',
+            options={'ordering': ['title', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='reservation',
+            options={'ordering': ['-created_at', 'id']},
+        ),
+    ]
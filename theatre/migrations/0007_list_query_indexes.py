@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-18 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0006_model_ordering_tiebreakers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='performance',
+            index=models.Index(fields=['-show_time', 'id'], name='theatre_per_show_ti_574036_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performance',
+            index=models.Index(fields=['play', '-show_time', 'id'], name='theatre_per_play_id_68b788_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='play',
+            index=models.Index(fields=['title', 'id'], name='theatre_pla_title_97f6e4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='theatre_res_user_id_abaf53_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+from theatre.seat_map import SeatMap, pack_free_runs
+
+
+def build_free_runs(apps, schema_editor):
+    Performance = apps.get_model("theatre", "Performance")
+
+    # Untouched seat maps keep an empty summary, every seat is free
+    for performance in Performance.objects.select_related(
+            "theatre_hall"
+    ).exclude(seat_map=b""):
+        runs = SeatMap(
+            performance.theatre_hall.rows,
+            performance.theatre_hall.seats_in_row,
+            performance.seat_map,
+        ).free_runs()
+        performance.free_runs = pack_free_runs(runs)
+        performance.max_free_run = max(runs, default=0)
+        performance.save(update_fields=["free_runs", "max_free_run"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0007_list_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performance',
+            name='free_runs',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name='performance',
+            name='max_free_run',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_free_runs, migrations.RunPython.noop),
+    ]
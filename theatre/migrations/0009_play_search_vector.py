@@ -0,0 +1,82 @@
+# Generated by Django 5.0.3 on 2026-10-18 03:07
+
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+
+# GIN indexes are PostgreSQL only, they are kept out of Meta.indexes so
+# that the SQLite test database can still be migrated
+SEARCH_INDEXES = {
+    "theatre_play_search_vector_gin": "USING gin (search_vector)",
+    "theatre_play_title_trgm_gin": "USING gin (title gin_trgm_ops)",
+}
+
+
+def _related_names(Play, relation, name):
+    related_model = Play._meta.get_field(relation).related_model
+    query_name = Play._meta.get_field(relation).related_query_name()
+    return Subquery(
+        related_model.objects.filter(
+            **{query_name: OuterRef("pk")}
+        ).order_by().values(query_name).annotate(
+            names=StringAgg(name, delimiter=" ")
+        ).values("names")
+    )
+
+
+def _play_search_vector(Play):
+    """theatre.search.play_search_vector() as of this migration."""
+    return (
+        SearchVector("title", weight="A", config="english")
+        + SearchVector(
+            _related_names(
+                Play,
+                "actors",
+                Concat("first_name", Value(" "), "last_name"),
+            ),
+            _related_names(Play, "genres", "name"),
+            weight="B",
+            config="english",
+        )
+        + SearchVector("description", weight="D", config="english")
+    )
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, definition in SEARCH_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON theatre_play {definition}"
+        )
+
+    Play = apps.get_model("theatre", "Play")
+    Play.objects.update(search_vector=_play_search_vector(Play))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0008_performance_free_runs'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='play',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0009_play_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performance',
+            name='seat_changes',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name='performance',
+            name='seat_map_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0010_performance_seat_map_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('bucket', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.BigIntegerField(db_index=True)),
+            ],
+            options={
+                'unique_together': {('key', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theatre', '0011_throttlebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='play',
+            name='image_variants',
+            field=models.JSONField(editable=False, null=True),
+        ),
+    ]
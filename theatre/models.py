@@ -2,10 +2,20 @@ import os
 import uuid
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models, transaction
+from django.utils import timezone
 from django.utils.text import slugify
 
+from theatre.seat_map import (
+    SeatMap,
+    pack_free_runs,
+    pack_seat_changes,
+    unpack_free_runs,
+    unpack_seat_changes,
+)
+
 
 class TheatreHall(models.Model):
     name = models.CharField(max_length=255)
@@ -16,6 +26,57 @@ class TheatreHall(models.Model):
     def capacity(self):
         return self.rows * self.seats_in_row
 
+    def validate_seats_in_use(self, error_to_raise):
+        """
+        Raise error_to_raise when a ticket or an active seat hold of the
+        hall's performances lies outside its rows and seats_in_row.
+        """
+        if self.pk is not None:
+            Performance.validate_seats_fit(
+                Performance.objects.filter(theatre_hall_id=self.pk),
+                self.rows,
+                self.seats_in_row,
+                error_to_raise
+            )
+
+    def clean(self):
+        self.validate_seats_in_use(ValidationError)
+
+    def save(
+            self,
+            force_insert=False,
+            force_update=False,
+            using=None,
+            update_fields=None,
+    ):
+        resized = self.pk is not None and not TheatreHall.objects.filter(
+            pk=self.pk,
+            rows=self.rows,
+            seats_in_row=self.seats_in_row
+        ).exists()
+        if not resized:
+            super(TheatreHall, self).save(
+                force_insert, force_update, using, update_fields
+            )
+            return
+
+        with transaction.atomic():
+            super(TheatreHall, self).save(
+                force_insert, force_update, using, update_fields
+            )
+            # Seat indexes depend on the hall size, rebuild the maps of its
+            # performances under row lock
+            performances = list(
+                Performance.objects.select_for_update(
+                    of=("self",)
+                ).select_related("theatre_hall").filter(
+                    theatre_hall_id=self.pk
+                )
+            )
+            self.validate_seats_in_use(ValidationError)
+            for performance in performances:
+                performance.rebuild_seats()
+
     def __str__(self):
         return self.name
 
@@ -51,9 +112,15 @@ class Play(models.Model):
     genres = models.ManyToManyField(Genre)
     actors = models.ManyToManyField(Actor)
     image = models.ImageField(null=True, upload_to=play_image_path)
+    # {variant: {"width", "height", "webp", "jpeg"}} of the image, None
+    # until theatre.images has generated them
+    image_variants = models.JSONField(null=True, editable=False)
+    # Maintained by theatre.signals, PostgreSQL only (see theatre.search)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
-        ordering = ["title"]
+        ordering = ["title", "id"]
+        indexes = [models.Index(fields=["title", "id"])]
 
     def __str__(self):
         return self.title
@@ -71,9 +138,294 @@ class Performance(models.Model):
         related_name="performances"
     )
     show_time = models.DateTimeField()
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    seats_held = models.PositiveIntegerField(default=0, editable=False)
+    # Longest free run per row and overall, empty/None while the seat map
+    # has never been written (every seat is free)
+    free_runs = models.BinaryField(default=bytes, editable=False)
+    max_free_run = models.PositiveIntegerField(null=True, editable=False)
+    # Bumped on every seat map write, seat_changes keeps the seats changed
+    # by the latest versions for ?since_version= deltas
+    seat_map_version = models.PositiveIntegerField(default=0, editable=False)
+    seat_changes = models.BinaryField(default=bytes, editable=False)
 
     class Meta:
-        ordering = ["-show_time"]
+        ordering = ["-show_time", "id"]
+        indexes = [
+            models.Index(fields=["-show_time", "id"]),
+            models.Index(fields=["play", "-show_time", "id"]),
+        ]
+
+    @property
+    def seats(self) -> SeatMap:
+        return SeatMap(
+            self.theatre_hall.rows,
+            self.theatre_hall.seats_in_row,
+            self.seat_map
+        )
+
+    def moved(self):
+        """Whether the saved performance is assigned to another hall."""
+        return self.pk is not None and not Performance.objects.filter(
+            pk=self.pk,
+            theatre_hall_id=self.theatre_hall_id
+        ).exists()
+
+    def validate_seats_in_hall(self, theatre_hall, error_to_raise):
+        """
+        Raise error_to_raise when a ticket or an active seat hold of the
+        performance lies outside the given hall.
+        """
+        if self.pk is not None:
+            Performance.validate_seats_fit(
+                Performance.objects.filter(pk=self.pk),
+                theatre_hall.rows,
+                theatre_hall.seats_in_row,
+                error_to_raise
+            )
+
+    def clean(self):
+        if self.theatre_hall_id is not None and self.moved():
+            self.validate_seats_in_hall(self.theatre_hall, ValidationError)
+
+    def save(
+            self,
+            force_insert=False,
+            force_update=False,
+            using=None,
+            update_fields=None,
+    ):
+        if (
+            update_fields is not None
+            or self._state.adding
+            or not self.moved()
+        ):
+            super(Performance, self).save(
+                force_insert, force_update, using, update_fields
+            )
+            return
+
+        with transaction.atomic():
+            # Seat indexes depend on the hall size, rebuild the seat map
+            # for the new hall under row lock
+            Performance.lock(self.pk)
+            self.refresh_from_db(fields=["seat_map_version"])
+            super(Performance, self).save(
+                force_insert, force_update, using, update_fields
+            )
+            self.validate_seats_in_hall(self.theatre_hall, ValidationError)
+            self.rebuild_seats()
+
+    def update_free_runs(self, seat_map, rows=None):
+        """Refresh the free run summary of the given rows (default all)."""
+        runs = unpack_free_runs(self.free_runs)
+        if rows is None or len(runs) != seat_map.rows:
+            runs = seat_map.free_runs()
+        else:
+            for row in rows:
+                runs[row - 1] = seat_map.free_run(row)
+        self.free_runs = pack_free_runs(runs)
+        self.max_free_run = max(runs, default=0)
+
+    def log_seat_changes(self, indexes):
+        """
+        Bump the seat map version and record the changed seat indexes,
+        dropping whole old versions beyond SEAT_MAP_CHANGES_KEPT seats.
+        """
+        since_version, changes = unpack_seat_changes(
+            self.seat_changes, self.seat_map_version
+        )
+        self.seat_map_version += 1
+        changes.extend((self.seat_map_version, index) for index in indexes)
+        kept = settings.SEAT_MAP_CHANGES_KEPT
+        if len(changes) > kept:
+            since_version = changes[len(changes) - kept - 1][0]
+            changes = [
+                change for change in changes if change[0] > since_version
+            ]
+        self.seat_changes = pack_seat_changes(since_version, changes)
+
+    def changed_seats(self, since_version):
+        """
+        Return the sorted indexes of the seats changed after since_version
+        or None when the change log does not reach back to it.
+        """
+        first_version, changes = unpack_seat_changes(
+            self.seat_changes, self.seat_map_version
+        )
+        if not first_version <= since_version <= self.seat_map_version:
+            return None
+        return sorted(
+            {index for version, index in changes if version > since_version}
+        )
+
+    @staticmethod
+    def validate_seats_fit(performances, rows, seats_in_row, error_to_raise):
+        """
+        Raise error_to_raise when a ticket or an active seat hold of the
+        performances lies outside rows of seats_in_row seats.
+        """
+        tickets = Ticket.objects.filter(performance__in=performances).filter(
+            models.Q(row__gt=rows) | models.Q(seat__gt=seats_in_row)
+        )
+        held = SeatHold.objects.filter(
+            performance__in=performances,
+            expires_at__gt=timezone.now()
+        ).values_list("seats", flat=True)
+        if tickets.exists() or any(
+                seat["row"] > rows or seat["seat"] > seats_in_row
+                for seats in held
+                for seat in seats
+        ):
+            raise error_to_raise(
+                f"tickets or seat holds lie outside "
+                f"{rows} rows of {seats_in_row} seats"
+            )
+
+    @classmethod
+    def lock(cls, performance_id):
+        """Lock the performance row until the end of the transaction."""
+        list(cls.objects.select_for_update().filter(
+            id=performance_id
+        ).values_list("id", flat=True))
+
+    @classmethod
+    def mark_seats(
+            cls,
+            seats,
+            taken=True,
+            counter="tickets_sold",
+            error_to_raise=None
+    ):
+        """
+        Take or release (performance_id, row, seat) seats in the seat maps
+        under row lock and adjust the given counter. With error_to_raise
+        set, taking a seat that is already taken raises it.
+        """
+        seats_by_performance = {}
+        for performance_id, row, seat in seats:
+            seats_by_performance.setdefault(performance_id, []).append(
+                (row, seat)
+            )
+
+        with transaction.atomic():
+            performances = cls.objects.select_for_update(
+                of=("self",)
+            ).select_related("theatre_hall").filter(
+                id__in=seats_by_performance
+            )
+            for performance in performances:
+                performance._mark(
+                    performance.seats,
+                    seats_by_performance[performance.id],
+                    taken,
+                    counter,
+                    error_to_raise
+                )
+
+    @classmethod
+    def allocate_seats(cls, performance_id, quantity, error_to_raise):
+        """
+        Take the free block of quantity adjacent seats closest to the hall
+        centre under row lock and return its (row, seat) pairs. Rows are
+        picked from the free run summary, tickets are never scanned.
+        """
+        with transaction.atomic():
+            # Expired holds must not keep their seats from the sale
+            SeatHold.release_expired([performance_id])
+            performance = cls.objects.select_for_update(
+                of=("self",)
+            ).select_related("theatre_hall").get(id=performance_id)
+            seat_map = performance.seats
+            runs = unpack_free_runs(performance.free_runs)
+            block = None
+            if (
+                performance.max_free_run is None
+                or performance.max_free_run >= quantity
+            ):
+                block = seat_map.best_block(
+                    quantity, runs if len(runs) == seat_map.rows else None
+                )
+            if block is None:
+                raise error_to_raise(
+                    {"quantity": f"{quantity} adjacent seats "
+                                 f"are not available"}
+                )
+
+            row, first = block
+            seats = [(row, seat) for seat in range(first, first + quantity)]
+            performance._mark(
+                seat_map, seats, True, "tickets_sold", error_to_raise
+            )
+            return seats
+
+    def _mark(self, seat_map, seats, taken, counter, error_to_raise):
+        for row, seat in seats:
+            if not taken:
+                seat_map.release(row, seat)
+                continue
+            if error_to_raise and seat_map.is_taken(row, seat):
+                raise error_to_raise(
+                    {"seat": f"seat {seat} in row {row} is already taken"}
+                )
+            seat_map.take(row, seat)
+        self.seat_map = seat_map.to_bytes()
+        self.update_free_runs(seat_map, {row for row, _ in seats})
+        self.log_seat_changes(seat_map.index(row, seat) for row, seat in seats)
+        setattr(
+            self,
+            counter,
+            getattr(self, counter) + (len(seats) if taken else -len(seats))
+        )
+        self.save(
+            update_fields=[
+                "seat_map",
+                "free_runs",
+                "max_free_run",
+                "seat_map_version",
+                "seat_changes",
+                counter,
+            ]
+        )
+
+    def rebuild_seats(self):
+        """Recompute seat map and counters from tickets and active holds."""
+        seat_map = SeatMap(
+            self.theatre_hall.rows,
+            self.theatre_hall.seats_in_row
+        )
+        self.tickets_sold = 0
+        for row, seat in self.tickets.values_list("row", "seat"):
+            seat_map.take(row, seat)
+            self.tickets_sold += 1
+        # Expired holds are not in the rebuilt map, releasing them later
+        # could free sold seats
+        now = timezone.now()
+        self.holds.filter(expires_at__lte=now).delete()
+        self.seats_held = 0
+        for seats in self.holds.filter(
+                expires_at__gt=now
+        ).values_list("seats", flat=True):
+            for seat in seats:
+                seat_map.take(seat["row"], seat["seat"])
+                self.seats_held += 1
+        self.seat_map = seat_map.to_bytes()
+        self.update_free_runs(seat_map)
+        # Which seats changed is unknown, older versions get the full map
+        self.seat_map_version += 1
+        self.seat_changes = pack_seat_changes(self.seat_map_version, [])
+        self.save(
+            update_fields=[
+                "seat_map",
+                "free_runs",
+                "max_free_run",
+                "seat_map_version",
+                "seat_changes",
+                "tickets_sold",
+                "seats_held",
+            ]
+        )
 
     def __str__(self):
         return f"{self.play.title} {str(self.show_time)}"
@@ -88,7 +440,8 @@ class Reservation(models.Model):
     )
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "id"]
+        indexes = [models.Index(fields=["user", "-created_at", "id"])]
 
     def __str__(self):
         return str(self.created_at)
@@ -125,6 +478,25 @@ class Ticket(models.Model):
                     }
                 )
 
+    @staticmethod
+    def validate_seat_free(row, seat, performance, error_to_raise):
+        if performance.seats.is_taken(row, seat):
+            raise error_to_raise(
+                {"seat": f"seat {seat} in row {row} is already taken"}
+            )
+
+    @property
+    def seat_key(self):
+        return self.performance_id, self.row, self.seat
+
+    def stored_seat_key(self):
+        """The seat key saved in the database, None for new tickets."""
+        if self._state.adding:
+            return None
+        return Ticket.objects.filter(pk=self.pk).values_list(
+            "performance_id", "row", "seat"
+        ).first()
+
     def clean(self):
         Ticket.validate_ticket(
             self.row,
@@ -132,6 +504,13 @@ class Ticket(models.Model):
             self.performance.theatre_hall,
             ValidationError,
         )
+        if self.stored_seat_key() != self.seat_key:
+            Ticket.validate_seat_free(
+                self.row,
+                self.seat,
+                self.performance,
+                ValidationError,
+            )
 
     def save(
             self,
@@ -140,10 +519,19 @@ class Ticket(models.Model):
             using=None,
             update_fields=None,
     ):
-        self.full_clean()
-        return super(Ticket, self).save(
-            force_insert, force_update, using, update_fields
-        )
+        self.full_clean(validate_unique=False)
+        with transaction.atomic():
+            stored = self.stored_seat_key()
+            if stored != self.seat_key:
+                if stored is not None:
+                    Performance.mark_seats([stored], taken=False)
+                Performance.mark_seats(
+                    [self.seat_key],
+                    error_to_raise=ValidationError
+                )
+            super(Ticket, self).save(
+                force_insert, force_update, using, update_fields
+            )
 
     def __str__(self):
         return (f"{str(self.performance)} "
@@ -152,3 +540,232 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("performance", "row", "seat")
         ordering = ["row", "seat"]
+
+
+class SeatHold(models.Model):
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    seats = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["expires_at"]
+        indexes = [models.Index(fields=["performance", "expires_at"])]
+
+    @property
+    def seat_keys(self):
+        return [
+            (self.performance_id, seat["row"], seat["seat"])
+            for seat in self.seats
+        ]
+
+    @classmethod
+    def claim(cls, performance_id, user, seats, error_to_raise):
+        """Hold free seats of a performance for SEAT_HOLD_DURATION."""
+        cls.release_expired([performance_id])
+        with transaction.atomic():
+            hold = cls(
+                performance_id=performance_id,
+                user=user,
+                seats=[{"row": row, "seat": seat} for row, seat in seats],
+                expires_at=timezone.now() + settings.SEAT_HOLD_DURATION
+            )
+            Performance.mark_seats(
+                hold.seat_keys,
+                counter="seats_held",
+                error_to_raise=error_to_raise
+            )
+            hold.save()
+            return hold
+
+    @classmethod
+    def release_expired(cls, performance_ids=None):
+        """
+        Delete expired holds of the given performances (default all),
+        locking each performance before its holds. Return their number.
+        """
+        expired = cls.objects.filter(expires_at__lte=timezone.now())
+        if performance_ids is not None:
+            expired = expired.filter(performance_id__in=performance_ids)
+
+        released = 0
+        expired_ids = expired.order_by().values_list(
+            "performance_id", flat=True
+        )
+        # Sorted, concurrent sweeps lock the performances in the same order
+        for performance_id in sorted(set(expired_ids)):
+            with transaction.atomic():
+                Performance.lock(performance_id)
+                # Holds are only deleted under this lock, so the rows read
+                # here are exactly the ones deleted and their seats are
+                # still theirs
+                holds = list(expired.filter(performance_id=performance_id))
+                if not holds:
+                    continue
+                cls.objects.filter(
+                    id__in=[hold.id for hold in holds]
+                ).delete()
+                Performance.mark_seats(
+                    [key for hold in holds for key in hold.seat_keys],
+                    taken=False,
+                    counter="seats_held"
+                )
+                released += len(holds)
+        return released
+
+    def _delete_if_active(self):
+        """
+        Delete the hold under the performance lock held by the caller and
+        return whether it was still active. Expired holds are left to
+        release_expired, their seats may be back in sale already.
+        """
+        deleted, _ = SeatHold.objects.filter(
+            id=self.id,
+            expires_at__gt=timezone.now()
+        ).delete()
+        return bool(deleted)
+
+    def release(self):
+        """Delete the hold and free its seats unless it has expired."""
+        with transaction.atomic():
+            Performance.lock(self.performance_id)
+            if self._delete_if_active():
+                Performance.mark_seats(
+                    self.seat_keys,
+                    taken=False,
+                    counter="seats_held"
+                )
+                return
+        SeatHold.release_expired([self.performance_id])
+
+    def reserve(self, error_to_raise):
+        """Convert the hold into a reservation with tickets."""
+        with transaction.atomic():
+            Performance.lock(self.performance_id)
+            if not self._delete_if_active():
+                raise error_to_raise({"hold": "Seat hold has expired"})
+
+            # The held seats are sold to the hold owner, move them over
+            Performance.mark_seats(
+                self.seat_keys,
+                taken=False,
+                counter="seats_held"
+            )
+            reservation = Reservation.objects.create(user=self.user)
+            Performance.mark_seats(
+                self.seat_keys,
+                error_to_raise=error_to_raise
+            )
+            Ticket.objects.bulk_create(
+                Ticket(
+                    reservation=reservation,
+                    performance_id=performance_id,
+                    row=row,
+                    seat=seat
+                )
+                for performance_id, row, seat in self.seat_keys
+            )
+            return reservation
+
+    def __str__(self):
+        return f"{str(self.performance)} (until {self.expires_at})"
+
+
+class ThrottleBucket(models.Model):
+    """
+    Requests counted for a throttle key in one sub-window of its rate
+    duration, numbered from the epoch. The window of a key is the sum of
+    its last sub-windows, so every worker and node shares the same count.
+    """
+
+    key = models.CharField(max_length=255)
+    bucket = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    # Epoch second after which the bucket is out of every window
+    expires_at = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        unique_together = ("key", "bucket")
+
+    @classmethod
+    def hit(cls, key, now, duration, buckets):
+        """
+        Count a request of key at epoch time now and return the requests
+        of the sliding window of duration seconds split in buckets
+        sub-windows, the request included, with a single statement.
+        """
+        width = duration / buckets
+        bucket = int(now // width)
+        expires_at = int((bucket + buckets + 1) * width)
+
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        key_column, bucket_column, count_column, expires_column = map(
+            quote, ("key", "bucket", "count", "expires_at")
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} "
+                f"({key_column}, {bucket_column}, {count_column}, "
+                f"{expires_column}) VALUES (%s, %s, 1, %s) "
+                f"ON CONFLICT ({key_column}, {bucket_column}) DO UPDATE "
+                f"SET {count_column} = {table}.{count_column} + 1 "
+                f"RETURNING {count_column}, ("
+                f"SELECT COALESCE(SUM({count_column}), 0) FROM {table} "
+                f"WHERE {key_column} = %s AND {bucket_column} > %s "
+                f"AND {bucket_column} < %s)",
+                [key, bucket, expires_at, key, bucket - buckets, bucket],
+            )
+            count, earlier = cursor.fetchone()
+        return count + earlier
+
+    @classmethod
+    def purge_expired(cls, now):
+        """
+        Delete the buckets no window reaches at epoch time now, run by
+        the purge_throttle_buckets command. Return their number.
+        """
+        purged, _ = cls.objects.filter(expires_at__lt=now).delete()
+        return purged
+
+    def __str__(self):
+        return f"{self.key} #{self.bucket}: {self.count}"
+
+
+class Task(models.Model):
+    """
+    Background task run by the run_worker command, see theatre.task_queue.
+    Claimed tasks are hidden from other workers by moving run_at past the
+    lease, finished ones are deleted and failed ones kept with their error.
+    """
+
+    name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["run_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["run_at", "id"],
+                condition=models.Q(failed_at__isnull=True),
+                name="theatre_task_runnable_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} (attempt {self.attempts})"
@@ -1,7 +1,131 @@
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination, _reverse_ordering
 
 
-class ReservationSetPagination(PageNumberPagination):
+class AsyncCursorPagination(CursorPagination):
+    """
+    Cursor pagination that can also fetch its page with the async ORM.
+    The page query is built and the cursors are computed exactly as in
+    CursorPagination.paginate_queryset, only the fetch differs.
+    """
+
+    def _page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+        self._position = (offset, reverse, current_position)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if str(current_position) != "None":
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + "__lt": current_position}
+            else:
+                kwargs = {order_attr + "__gt": current_position}
+
+            filter_query = Q(**kwargs)
+            if (reverse and not is_reversed) or is_reversed:
+                filter_query |= Q(**{order_attr + "__isnull": True})
+            queryset = queryset.filter(filter_query)
+
+        # One extra item tells whether a following page exists
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _paginate_results(self, results):
+        (offset, reverse, current_position) = self._position
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        return self._paginate_results(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        return self._paginate_results(
+            [
+                obj async for obj in page_queryset.aiterator(
+                    chunk_size=self.page_size + 1
+                )
+            ]
+        )
+
+
+class PlaySetPagination(AsyncCursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("title", "id")
+
+    def get_ordering(self, request, queryset, view):
+        # Search results are ordered by relevance
+        if "search_rank" in queryset.query.annotations:
+            return ("-search_rank", "id")
+        return super().get_ordering(request, queryset, view)
+
+
+class PerformanceSetPagination(AsyncCursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-show_time", "id")
+
+
+class ReservationSetPagination(CursorPagination):
     page_size = 4
     page_size_query_param = "page_size"
     max_page_size = 20
+    ordering = ("-created_at", "id")
@@ -0,0 +1,116 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Concat
+
+SEARCH_CONFIG = "english"
+
+
+def search_available() -> bool:
+    """Whether plays carry a tsvector, otherwise search degrades."""
+    return connection.vendor == "postgresql"
+
+
+def _related_names(play_model, relation, name):
+    related_model = play_model._meta.get_field(relation).related_model
+    query_name = play_model._meta.get_field(relation).related_query_name()
+    return Subquery(
+        related_model.objects.filter(
+            **{query_name: OuterRef("pk")}
+        ).order_by().values(query_name).annotate(
+            names=StringAgg(name, delimiter=" ")
+        ).values("names")
+    )
+
+
+def play_search_vector(play_model):
+    """
+    Title (A), actor and genre names (B) and description (D) of a play
+    as a weighted tsvector expression, usable in update().
+    """
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(
+            _related_names(
+                play_model,
+                "actors",
+                Concat("first_name", Value(" "), "last_name"),
+            ),
+            _related_names(play_model, "genres", "name"),
+            weight="B",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector("description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(plays) -> None:
+    """Recompute the search vector of a queryset of plays in one query."""
+    if search_available():
+        plays.update(search_vector=play_search_vector(plays.model))
+
+
+def search_plays(queryset, text):
+    """
+    Filter plays matching text and annotate them with search_rank. On
+    PostgreSQL the tsvector match is ranked and trigram word similarity
+    on the title catches typos; elsewhere every word must be contained
+    in the title, description, an actor or a genre name.
+    """
+    if search_available():
+        query = SearchQuery(
+            text, search_type="websearch", config=SEARCH_CONFIG
+        )
+        # Double precision keeps the rank exact in pagination cursors
+        return queryset.annotate(
+            search_rank=Cast(
+                SearchRank(F("search_vector"), query)
+                + TrigramWordSimilarity(text, "title"),
+                FloatField(),
+            )
+        ).filter(
+            Q(search_vector=query) | Q(title__trigram_word_similar=text)
+        )
+
+    actors = queryset.model._meta.get_field("actors").related_model
+    genres = queryset.model._meta.get_field("genres").related_model
+    for word in text.split():
+        queryset = queryset.filter(
+            Q(title__icontains=word)
+            | Q(description__icontains=word)
+            | Exists(
+                actors.objects.filter(
+                    Q(first_name__icontains=word)
+                    | Q(last_name__icontains=word),
+                    play=OuterRef("pk"),
+                )
+            )
+            | Exists(
+                genres.objects.filter(
+                    name__icontains=word, play=OuterRef("pk")
+                )
+            )
+        )
+    return queryset.annotate(
+        search_rank=Case(
+            When(title__icontains=text, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
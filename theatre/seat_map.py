@@ -0,0 +1,136 @@
+import math
+
+
+def pack_free_runs(runs) -> bytes:
+    """Encode per-row longest free runs, two bytes per row."""
+    return b"".join(run.to_bytes(2, "little") for run in runs)
+
+
+def unpack_free_runs(data: bytes) -> list:
+    return [
+        int.from_bytes(data[index:index + 2], "little")
+        for index in range(0, len(data), 2)
+    ]
+
+
+def pack_seat_changes(since_version: int, changes) -> bytes:
+    """
+    Encode a seat change log: the version it starts after, then the
+    (version, seat index) pairs of the later versions, four bytes each.
+    """
+    values = [since_version]
+    for version, index in changes:
+        values += (version, index)
+    return b"".join(value.to_bytes(4, "little") for value in values)
+
+
+def unpack_seat_changes(data: bytes, version: int = 0):
+    """Return (since_version, changes), an empty log starts at version."""
+    if not data:
+        return version, []
+    values = [
+        int.from_bytes(data[index:index + 4], "little")
+        for index in range(0, len(data), 4)
+    ]
+    return values[0], list(zip(values[1::2], values[2::2]))
+
+
+class SeatMap:
+    """Occupancy bitmap of a theatre hall, one bit per seat (row-major)."""
+
+    def __init__(self, rows: int, seats_in_row: int, data: bytes = b""):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        size = (rows * seats_in_row + 7) // 8
+        self._bits = bytearray(bytes(data or b"")[:size])
+        self._bits.extend(bytes(size - len(self._bits)))
+
+    def index(self, row: int, seat: int) -> int:
+        """Bit of the seat, row-major from 0, least significant first."""
+        return (row - 1) * self.seats_in_row + (seat - 1)
+
+    def is_taken_at(self, index: int) -> bool:
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def is_taken(self, row: int, seat: int) -> bool:
+        return self.is_taken_at(self.index(row, seat))
+
+    def take(self, row: int, seat: int) -> None:
+        index = self.index(row, seat)
+        self._bits[index >> 3] |= 1 << (index & 7)
+
+    def release(self, row: int, seat: int) -> None:
+        index = self.index(row, seat)
+        self._bits[index >> 3] &= ~(1 << (index & 7))
+
+    def taken(self):
+        """Yield (row, seat) pairs of taken seats ordered by row and seat."""
+        for byte_index, byte in enumerate(self._bits):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    row, seat = divmod(byte_index * 8 + bit, self.seats_in_row)
+                    yield row + 1, seat + 1
+
+    def free_intervals(self, row: int):
+        """Yield (first, last) seats of the runs of free seats in the row."""
+        first = None
+        for seat in range(1, self.seats_in_row + 1):
+            if self.is_taken(row, seat):
+                if first is not None:
+                    yield first, seat - 1
+                    first = None
+            elif first is None:
+                first = seat
+        if first is not None:
+            yield first, self.seats_in_row
+
+    def free_run(self, row: int) -> int:
+        """Length of the longest run of adjacent free seats in the row."""
+        return max(
+            (last - first + 1 for first, last in self.free_intervals(row)),
+            default=0
+        )
+
+    def free_runs(self) -> list:
+        return [self.free_run(row) for row in range(1, self.rows + 1)]
+
+    def best_block(self, quantity: int, runs=None):
+        """
+        Return (row, first seat) of the free block of quantity adjacent
+        seats closest to the hall centre, or None. Blocks are scored by
+        the row distance plus the seat distance of the block centre from
+        the middle. runs, the longest free run per row, skips rows that
+        cannot fit the block without reading their seats.
+        """
+        middle_row = (self.rows + 1) / 2
+        centred_first = (self.seats_in_row - quantity) / 2 + 1
+        best, best_score = None, None
+
+        for row in sorted(
+                range(1, self.rows + 1),
+                key=lambda row: abs(row - middle_row)
+        ):
+            row_distance = abs(row - middle_row)
+            if best_score is not None and row_distance >= best_score:
+                break
+            if runs is not None and runs[row - 1] < quantity:
+                continue
+
+            for first, last in self.free_intervals(row):
+                if last - first + 1 < quantity:
+                    continue
+                start = math.floor(
+                    min(max(centred_first, first), last - quantity + 1)
+                )
+                score = row_distance + abs(start - centred_first)
+                if best_score is None or score < best_score:
+                    best, best_score = (row, start), score
+        return best
+
+    def taken_count(self) -> int:
+        return sum(bin(byte).count("1") for byte in self._bits)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
@@ -1,5 +1,8 @@
+import base64
+
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import connection, transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from theatre.models import (
@@ -9,8 +12,12 @@ from theatre.models import (
     Play,
     Performance,
     Reservation,
+    SeatHold,
     Ticket
 )
+from theatre.sparse_fields import SparseFieldsSerializerMixin
+from theatre.task_queue import enqueue_on_commit
+from theatre.tasks import send_reservation_confirmation
 
 
 class TheatreHallSerializer(serializers.ModelSerializer):
@@ -19,6 +26,17 @@ class TheatreHallSerializer(serializers.ModelSerializer):
         model = TheatreHall
         fields = ("id", "name", "rows", "seats_in_row", "capacity")
 
+    def validate(self, attrs):
+        if self.instance is not None:
+            TheatreHall(
+                id=self.instance.id,
+                rows=attrs.get("rows", self.instance.rows),
+                seats_in_row=attrs.get(
+                    "seats_in_row", self.instance.seats_in_row
+                ),
+            ).validate_seats_in_use(serializers.ValidationError)
+        return attrs
+
 
 class GenreSerializer(serializers.ModelSerializer):
 
@@ -45,10 +63,19 @@ class PlayImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Play
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
 
+    def update(self, instance, validated_data):
+        # Generated for the new image by the process_play_image task
+        instance.image_variants = None
+        return super().update(instance, validated_data)
 
-class PlayListSerializer(PlaySerializer):
+
+class PlayListSerializer(SparseFieldsSerializerMixin, PlaySerializer):
+    expandable_fields = {
+        "genres": (GenreSerializer, {"many": True}),
+        "actors": (ActorSerializer, {"many": True}),
+    }
     genres = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -60,8 +87,14 @@ class PlayListSerializer(PlaySerializer):
         slug_field="full_name"
     )
 
+    class Meta(PlaySerializer.Meta):
+        fields = PlaySerializer.Meta.fields + ("image_variants",)
+
 
-class PlayDetailSerializer(serializers.ModelSerializer):
+class PlayDetailSerializer(
+    SparseFieldsSerializerMixin,
+    serializers.ModelSerializer
+):
     genres = GenreSerializer(many=True, read_only=True)
     actors = ActorSerializer(many=True, read_only=True)
 
@@ -73,7 +106,8 @@ class PlayDetailSerializer(serializers.ModelSerializer):
             "description",
             "genres",
             "actors",
-            "image"
+            "image",
+            "image_variants"
         )
 
 
@@ -83,8 +117,27 @@ class PerformanceSerializer(serializers.ModelSerializer):
         model = Performance
         fields = ("id", "play", "theatre_hall", "show_time")
 
-
-class PerformanceListSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        theatre_hall = attrs.get("theatre_hall")
+        if (
+            self.instance is not None
+            and theatre_hall is not None
+            and theatre_hall.id != self.instance.theatre_hall_id
+        ):
+            self.instance.validate_seats_in_hall(
+                theatre_hall, serializers.ValidationError
+            )
+        return attrs
+
+
+class PerformanceListSerializer(
+    SparseFieldsSerializerMixin,
+    serializers.ModelSerializer
+):
+    expandable_fields = {
+        "play": (PlayListSerializer, {}),
+        "theatre_hall": (TheatreHallSerializer, {}),
+    }
     play_title = serializers.CharField(source="play.title", read_only=True)
     theatre_hall = serializers.CharField(
         source="theatre_hall.name",
@@ -108,7 +161,66 @@ class PerformanceListSerializer(serializers.ModelSerializer):
         )
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolve pk from objects preloaded by a parent list serializer."""
+
+    def to_internal_value(self, data):
+        # int() would turn true into 1 and 1.9 into 1
+        if isinstance(data, bool) or (
+                isinstance(data, float) and not data.is_integer()
+        ):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        preloaded = getattr(self.parent, "preloaded", None) or {}
+        try:
+            return preloaded[self.field_name][int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
+
+class TicketBatchSerializer(serializers.ListSerializer):
+    """Validate tickets of one request with a constant number of queries."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            # Ids out of the column range would overflow the IN lookups,
+            # they are left to the field to reject as unknown
+            low, high = connection.ops.integer_field_range(
+                Performance._meta.pk.get_internal_type()
+            )
+            performance_ids = set()
+            for ticket in data:
+                try:
+                    performance_id = int(ticket["performance"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if low <= performance_id <= high:
+                    performance_ids.add(performance_id)
+            # Seats of expired holds are free for the seat map checks
+            SeatHold.release_expired(performance_ids)
+            self.child.preloaded = {
+                "performance": Performance.objects.select_related(
+                    "theatre_hall"
+                ).in_bulk(performance_ids)
+            }
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        requested_seats = set()
+        for ticket in attrs:
+            key = (ticket["performance"].id, ticket["row"], ticket["seat"])
+            if key in requested_seats:
+                raise ValidationError(
+                    {"seat": f"seat {ticket['seat']} in row {ticket['row']} "
+                             f"is requested more than once"}
+                )
+            requested_seats.add(key)
+        return attrs
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    performance = PreloadedPrimaryKeyRelatedField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
 
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
@@ -118,11 +230,20 @@ class TicketSerializer(serializers.ModelSerializer):
             attrs["performance"].theatre_hall,
             ValidationError
         )
+        Ticket.validate_seat_free(
+            attrs["row"],
+            attrs["seat"],
+            attrs["performance"],
+            ValidationError
+        )
         return data
 
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "performance")
+        list_serializer_class = TicketBatchSerializer
+        # Taken seats are checked against the seat map in validate()
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -136,36 +257,199 @@ class TicketSeatSerializer(TicketSerializer):
         fields = ("row", "seat")
 
 
-class PerformanceDetailSerializer(serializers.ModelSerializer):
+class PerformanceDetailSerializer(
+    SparseFieldsSerializerMixin,
+    serializers.ModelSerializer
+):
     play = PlayListSerializer(read_only=True)
     theatre_hall = TheatreHallSerializer(read_only=True)
-    taken_places = TicketSeatSerializer(
-        source="tickets",
-        many=True,
-        read_only=True
-    )
+    taken_places = serializers.SerializerMethodField()
 
     class Meta:
         model = Performance
         fields = ("id", "show_time", "play", "theatre_hall", "taken_places")
         read_only_fields = ("play", "theatre_hall")
 
+    @extend_schema_field(TicketSeatSerializer(many=True))
+    def get_taken_places(self, obj):
+        seat_map = obj.seats
+        if self.context.get("seatmap") != "bitset":
+            return [
+                {"row": row, "seat": seat} for row, seat in seat_map.taken()
+            ]
+
+        since_version = self.context.get("since_version")
+        changed = (
+            None if since_version is None
+            else obj.changed_seats(since_version)
+        )
+        if changed is None:
+            return {
+                "encoding": "bitset",
+                "version": obj.seat_map_version,
+                "rows": seat_map.rows,
+                "seats_in_row": seat_map.seats_in_row,
+                "bits": base64.b64encode(seat_map.to_bytes()).decode(),
+            }
+        return {
+            "encoding": "delta",
+            "version": obj.seat_map_version,
+            "since_version": since_version,
+            "taken": [
+                index for index in changed if seat_map.is_taken_at(index)
+            ],
+            "released": [
+                index for index in changed
+                if not seat_map.is_taken_at(index)
+            ],
+        }
+
 
 class ReservationSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    tickets = TicketSerializer(
+        many=True,
+        read_only=False,
+        allow_empty=False,
+        required=False
+    )
+    performance = serializers.PrimaryKeyRelatedField(
+        queryset=Performance.objects.select_related("theatre_hall"),
+        write_only=True,
+        required=False
+    )
+    quantity = serializers.IntegerField(
+        min_value=1,
+        write_only=True,
+        required=False
+    )
+    strategy = serializers.ChoiceField(
+        choices=["best"],
+        default="best",
+        write_only=True
+    )
 
     class Meta:
         model = Reservation
-        fields = ("id", "created_at", "tickets")
+        fields = (
+            "id",
+            "created_at",
+            "tickets",
+            "performance",
+            "quantity",
+            "strategy"
+        )
+
+    def validate(self, attrs):
+        data = super(ReservationSerializer, self).validate(attrs=attrs)
+        auto_assign = "performance" in attrs or "quantity" in attrs
+        if auto_assign == ("tickets" in attrs):
+            raise ValidationError(
+                {"tickets": "Provide either tickets or a performance "
+                            "with a quantity of seats"}
+            )
+        if not auto_assign:
+            return data
+
+        for field in ("performance", "quantity"):
+            if field not in attrs:
+                raise ValidationError({field: "This field is required."})
+        seats_in_row = attrs["performance"].theatre_hall.seats_in_row
+        if attrs["quantity"] > seats_in_row:
+            raise ValidationError(
+                {"quantity": f"quantity must be in available range: "
+                             f"(1, seats_in_row): (1, {seats_in_row})"}
+            )
+        return data
 
     def create(self, validated_data):
+        validated_data.pop("strategy")
+        performance = validated_data.pop("performance", None)
+        quantity = validated_data.pop("quantity", None)
+        tickets = validated_data.pop("tickets", None)
+
         with transaction.atomic():
-            tickets = validated_data.pop("tickets")
             reservation = Reservation.objects.create(**validated_data)
-            ticket_instances = (Ticket(reservation=reservation, **ticket) for ticket in tickets)
+            if performance is not None:
+                ticket_instances = [
+                    Ticket(
+                        reservation=reservation,
+                        performance=performance,
+                        row=row,
+                        seat=seat
+                    )
+                    for row, seat in Performance.allocate_seats(
+                        performance.id,
+                        quantity,
+                        serializers.ValidationError
+                    )
+                ]
+            else:
+                ticket_instances = [
+                    Ticket(reservation=reservation, **ticket)
+                    for ticket in tickets
+                ]
+                SeatHold.release_expired(
+                    {ticket.performance_id for ticket in ticket_instances}
+                )
+                Performance.mark_seats(
+                    [
+                        (ticket.performance_id, ticket.row, ticket.seat)
+                        for ticket in ticket_instances
+                    ],
+                    error_to_raise=serializers.ValidationError
+                )
             Ticket.objects.bulk_create(ticket_instances)
+            enqueue_on_commit(
+                send_reservation_confirmation, reservation_id=reservation.id
+            )
             return reservation
 
 
 class ReservationListSerializer(ReservationSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = SeatHold
+        fields = ("id", "performance", "seats", "created_at", "expires_at")
+        read_only_fields = ("performance", "created_at", "expires_at")
+
+    def validate_seats(self, seats):
+        performance = self.context["performance"]
+        requested_seats = set()
+        for seat in seats:
+            Ticket.validate_ticket(
+                seat["row"],
+                seat["seat"],
+                performance.theatre_hall,
+                ValidationError
+            )
+            Ticket.validate_seat_free(
+                seat["row"],
+                seat["seat"],
+                performance,
+                ValidationError
+            )
+            if (seat["row"], seat["seat"]) in requested_seats:
+                raise ValidationError(
+                    {"seat": f"seat {seat['seat']} in row {seat['row']} "
+                             f"is requested more than once"}
+                )
+            requested_seats.add((seat["row"], seat["seat"]))
+        return seats
+
+    def create(self, validated_data):
+        return SeatHold.claim(
+            self.context["performance"].id,
+            validated_data["user"],
+            [(seat["row"], seat["seat"]) for seat in validated_data["seats"]],
+            serializers.ValidationError
+        )
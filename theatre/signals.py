@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from theatre.caching import bump_model_version
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    TheatreHall,
+    Ticket,
+)
+from theatre.search import update_search_vectors
+
+
+def deletes_performances(origin):
+    """Whether a delete started by origin removes whole performances."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Performance, Play, TheatreHall))
+
+
+@receiver(pre_delete, sender=Ticket)
+def collect_ticket_seat(sender, instance, origin=None, **kwargs):
+    # Every pre_delete of a delete is sent before the first post_delete,
+    # the seats are released together once the last ticket is gone
+    if origin is not None and not deletes_performances(origin):
+        origin.__dict__.setdefault("_pending_ticket_seats", {})[
+            instance.pk
+        ] = (instance.performance_id, instance.row, instance.seat)
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seats(sender, instance, origin=None, **kwargs):
+    if origin is None:
+        Performance.mark_seats(
+            [(instance.performance_id, instance.row, instance.seat)],
+            taken=False
+        )
+        return
+
+    pending = origin.__dict__.get("_pending_ticket_seats")
+    if pending is None:
+        return
+    released = origin.__dict__.setdefault("_released_ticket_seats", [])
+    released.append(pending.pop(instance.pk))
+    if not pending:
+        del origin._pending_ticket_seats, origin._released_ticket_seats
+        Performance.mark_seats(released, taken=False)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def release_user_holds(sender, instance, **kwargs):
+    # The cascade would delete the holds without freeing their seats
+    for hold in instance.seat_holds.all():
+        hold.release()
+
+
+@receiver(post_save, sender=TheatreHall)
+@receiver(post_delete, sender=TheatreHall)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Actor)
+@receiver(post_delete, sender=Actor)
+@receiver(post_save, sender=Play)
+@receiver(post_delete, sender=Play)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_model_version(sender)
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def invalidate_play_relations_cache(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_model_version(Play)
+
+
+@receiver(post_save, sender=Play)
+def update_play_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"title", "description"} & set(update_fields):
+        update_search_vectors(Play.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def update_related_search_vectors(
+        sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action.startswith("post_"):
+            update_search_vectors(Play.objects.filter(pk=instance.pk))
+        return
+
+    # A genre or actor lost or gained plays, clear() needs them beforehand
+    if action == "pre_clear":
+        instance._cleared_play_ids = list(
+            instance.play_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        update_search_vectors(
+            Play.objects.filter(
+                pk__in=getattr(instance, "_cleared_play_ids", [])
+            )
+        )
+    elif action in ("post_add", "post_remove"):
+        update_search_vectors(Play.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+def update_named_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(instance.play_set.all())
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Actor)
+def remember_named_plays(sender, instance, **kwargs):
+    instance._deleted_play_ids = list(
+        instance.play_set.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+def update_deleted_name_search_vectors(sender, instance, **kwargs):
+    update_search_vectors(
+        Play.objects.filter(pk__in=getattr(instance, "_deleted_play_ids", []))
+    )
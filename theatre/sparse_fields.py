@@ -0,0 +1,94 @@
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Accept fields (names to keep) and expand (names to render with the
+    serializers of expandable_fields) keyword arguments.
+    """
+
+    # Field name -> (serializer class, keyword arguments)
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+        if fields is not None:
+            for name in set(self.fields) - {*fields, *expand}:
+                self.fields.pop(name)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=a,b trims list and retrieve output to the named fields and
+    ?expand=c nests the related objects of c. The queryset only joins,
+    prefetches and annotates what the rendered fields need, as declared
+    in field_requirements.
+    """
+
+    # Field name -> {queryset method name: arguments}, an annotate
+    # method takes a dict of expressions
+    field_requirements = {}
+    sparse_actions = ("list", "retrieve")
+
+    def _sparse_param(self, name, allowed):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+
+        names = [field.strip() for field in value.split(",")]
+        if unknown := [field for field in names if field not in allowed]:
+            raise ValidationError(
+                {name: f"Unknown fields: {', '.join(unknown)}. "
+                       f"Choose from: {', '.join(allowed)}."}
+            )
+        return list(dict.fromkeys(names))
+
+    def sparse_fieldset(self):
+        """Return the requested (fields or None, expand) of the action."""
+        if self.action not in self.sparse_actions:
+            return None, []
+
+        if not hasattr(self, "_sparse_fieldset"):
+            serializer_class = self.get_serializer_class()
+            expandable = list(serializer_class.expandable_fields)
+            self._sparse_fieldset = (
+                self._sparse_param(
+                    "fields", [*serializer_class.Meta.fields, *expandable]
+                ),
+                self._sparse_param("expand", expandable) or [],
+            )
+        return self._sparse_fieldset
+
+    def rendered_fields(self):
+        fields, expand = self.sparse_fieldset()
+        if fields is None:
+            fields = self.get_serializer_class().Meta.fields
+        return {*fields, *expand}
+
+    def apply_field_requirements(self, queryset):
+        """Replace the eager loading of queryset by what is rendered."""
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        for name in sorted(self.rendered_fields()):
+            for method, arguments in self.field_requirements.get(
+                    name, {}
+            ).items():
+                if method == "annotate":
+                    queryset = queryset.annotate(**arguments)
+                else:
+                    queryset = getattr(queryset, method)(*arguments)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            fields, expand = self.sparse_fieldset()
+            kwargs.setdefault("fields", fields)
+            kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
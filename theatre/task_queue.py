@@ -0,0 +1,100 @@
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from theatre.models import Task
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(func):
+    """Register func to be enqueued by reference and run by run_worker."""
+    func.task_name = f"{func.__module__}.{func.__qualname__}"
+    _tasks[func.task_name] = func
+    return func
+
+
+def enqueue(func, run_at=None, max_attempts=None, **kwargs) -> Task:
+    """Queue func(**kwargs), kwargs must be JSON serializable."""
+    return Task.objects.create(
+        name=func.task_name,
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_on_commit(func, **kwargs) -> None:
+    """
+    Queue func(**kwargs) once the current transaction commits, so that
+    rolled back work never runs and committed rows are visible to it.
+    """
+    transaction.on_commit(lambda: enqueue(func, **kwargs))
+
+
+def claim(batch_size=1, names=None) -> list:
+    """
+    Claim up to batch_size due tasks, oldest first, for TASK_LEASE.
+    Rows locked by another worker's claim are skipped (PostgreSQL).
+    """
+    now = timezone.now()
+    due = Task.objects.filter(run_at__lte=now, failed_at__isnull=True)
+    if names is not None:
+        due = due.filter(name__in=names)
+
+    with transaction.atomic():
+        tasks = list(
+            due.select_for_update(skip_locked=True).order_by(
+                "run_at", "id"
+            )[:batch_size]
+        )
+        if tasks:
+            Task.objects.filter(id__in=[task.id for task in tasks]).update(
+                run_at=now + settings.TASK_LEASE,
+                attempts=F("attempts") + 1,
+            )
+    for task in tasks:
+        task.attempts += 1
+    return tasks
+
+
+def retry_delay(attempts):
+    """Delay before the next attempt, doubling after every failure."""
+    return min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASK_RETRY_MAX_DELAY,
+    )
+
+
+def run(task) -> bool:
+    """
+    Run a claimed task. It is deleted when it succeeds, otherwise
+    scheduled again after retry_delay() or, out of attempts, marked
+    failed. Return whether it succeeded.
+    """
+    try:
+        func = _tasks[task.name]
+        func(**task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            logger.error("Task %s failed:\n%s", task, error)
+            Task.objects.filter(id=task.id).update(
+                failed_at=timezone.now(), last_error=error
+            )
+        else:
+            logger.warning("Task %s will be retried:\n%s", task, error)
+            Task.objects.filter(id=task.id).update(
+                run_at=timezone.now() + retry_delay(task.attempts),
+                last_error=error,
+            )
+        return False
+
+    Task.objects.filter(id=task.id).delete()
+    return True
@@ -0,0 +1,44 @@
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from theatre import images
+from theatre.models import Play, Reservation
+from theatre.task_queue import task
+
+
+@task
+def process_play_image(play_id):
+    """Generate the variants of a play's image unless done already."""
+    play = Play.objects.only("id", "image", "image_variants").filter(
+        pk=play_id
+    ).first()
+    if play is not None and play.image and play.image_variants is None:
+        images.generate_play_image_variants(play)
+
+
+@task
+def send_reservation_confirmation(reservation_id):
+    """Email the tickets of a reservation to its user."""
+    reservation = Reservation.objects.select_related("user").filter(
+        pk=reservation_id
+    ).first()
+    if reservation is None:
+        return
+
+    lines = [f"Your reservation #{reservation.id}:", ""]
+    for ticket in reservation.tickets.select_related(
+            "performance__play", "performance__theatre_hall"
+    ):
+        performance = ticket.performance
+        show_time = timezone.localtime(performance.show_time)
+        lines.append(
+            f"{performance.play.title}, {show_time:%Y-%m-%d %H:%M}, "
+            f"{performance.theatre_hall.name}: "
+            f"row {ticket.row}, seat {ticket.seat}"
+        )
+    send_mail(
+        subject=f"Reservation #{reservation.id}",
+        message="\n".join(lines),
+        from_email=None,
+        recipient_list=[reservation.user.email],
+    )
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.views import APIView
+
+BUDGET_SIZES = (1, 10, 1000)
+
+# In-process cache for counting an endpoint's own queries, lookups in the
+# shared database cache would add to them
+LOCAL_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+def without_throttling():
+    """
+    Patch throttling out of the views, throttles count every request in
+    the database and are not part of an endpoint's queries.
+    """
+    return mock.patch.object(APIView, "get_throttles", lambda self: [])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class QueryBudgetTestCase(TestCase):
+    """Assert that an endpoint stays within a fixed query budget at scale."""
+
+    def assertQueryBudget(self, budget, make_request, seed=None):
+        """
+        Call seed(count) to grow the data set to each of BUDGET_SIZES rows
+        and check that make_request() runs at most budget queries every
+        time. The response cache is cleared so that misses are measured.
+        """
+        seeded = 0
+        for size in BUDGET_SIZES:
+            if seed is not None:
+                seed(size - seeded)
+                seeded = size
+            cache.clear()
+
+            with without_throttling(), \
+                    CaptureQueriesContext(connection) as context:
+                response = make_request()
+
+            self.assertLess(response.status_code, 400, response.data)
+            self.assertLessEqual(
+                len(context),
+                budget,
+                f"{len(context)} queries at {size} rows exceed the budget "
+                f"of {budget}:\n"
+                + "\n".join(
+                    query["sql"] for query in context.captured_queries
+                )
+            )
@@ -6,6 +6,7 @@ from rest_framework.test import APIClient
 
 from theatre.models import Actor
 from theatre.serializers import ActorSerializer
+from theatre.tests.query_budget import QueryBudgetTestCase
 
 ACTOR_URL = reverse("theatre:actor-list")
 
@@ -83,3 +84,45 @@ class AdminActorViewSetTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Actor.objects.filter(first_name="John").exists())
+
+
+class ActorQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def seed(count):
+        Actor.objects.bulk_create(
+            Actor(first_name="John", last_name="Smith") for _ in range(count)
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            1, lambda: self.client.get(ACTOR_URL), self.seed
+        )
+
+    def test_retrieve_budget(self):
+        actor = sample_actor()
+
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(
+                reverse("theatre:actor-detail", args=[actor.id])
+            ),
+            self.seed
+        )
+
+    def test_create_budget(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.post(
+                ACTOR_URL, {"first_name": "John", "last_name": "Smith"}
+            ),
+            self.seed
+        )
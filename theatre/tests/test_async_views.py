@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.models import Genre, Play
+from theatre.serializers import PlayListSerializer
+
+GENRE_URL = reverse("theatre:genre-list")
+PLAY_URL = reverse("theatre:play-list")
+
+
+class AsyncReadRoutingTests(TestCase):
+    def test_reads_are_async(self):
+        self.assertTrue(iscoroutinefunction(resolve(PLAY_URL).func))
+        self.assertTrue(
+            iscoroutinefunction(
+                resolve(reverse("theatre:play-detail", args=[1])).func
+            )
+        )
+        self.assertFalse(
+            iscoroutinefunction(
+                resolve(
+                    reverse("theatre:play-upload-image", args=[1])
+                ).func
+            )
+        )
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+        Genre.objects.create(name="Drama")
+        Genre.objects.create(name="Comedy")
+
+    async def test_list_with_jwt(self):
+        response = await self.async_client.get(
+            GENRE_URL, headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content),
+            [{"id": genre.id, "name": genre.name}
+             async for genre in Genre.objects.all()]
+        )
+
+    async def test_invalid_token(self):
+        response = await self.async_client.get(
+            GENRE_URL, headers={"Authorization": "Bearer invalid"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("WWW-Authenticate", response.headers)
+
+    async def test_inactive_user(self):
+        self.user.is_active = False
+        await self.user.asave()
+
+        response = await self.async_client.get(
+            GENRE_URL, headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_retrieve_not_found(self):
+        response = await self.async_client.get(
+            reverse("theatre:genre-detail", args=[0]), headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_browsable_api_served_by_sync_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get(GENRE_URL, HTTP_ACCEPT="text/html")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("text/html", response["Content-Type"])
+
+    def test_cursor_pages(self):
+        for index in range(5):
+            Play.objects.create(title=f"Play {index}")
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        titles = []
+        url = PLAY_URL + "?page_size=2"
+        while url:
+            response = client.get(url)
+            titles.extend(play["title"] for play in response.data["results"])
+            url = response.data["next"]
+        previous = client.get(response.data["previous"])
+
+        self.assertEqual(titles, [f"Play {index}" for index in range(5)])
+        self.assertEqual(
+            previous.data["results"],
+            PlayListSerializer(
+                Play.objects.filter(title__in=["Play 2", "Play 3"]),
+                many=True
+            ).data
+        )
+
+
+class BenchAsyncCommandTests(TestCase):
+    def test_bench_async_reports_both_paths(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+
+            call_command(
+                "bench_async",
+                halls=1,
+                genres=3,
+                actors=5,
+                plays=3,
+                performances=5,
+                tickets=20,
+                clients=3,
+                requests=6,
+                output=output,
+                stdout=StringIO(),
+            )
+
+            with open(output) as bench:
+                results = json.load(bench)
+
+        self.assertFalse(Play.objects.exists())
+        for name, route in results["routes"].items():
+            self.assertEqual(route["sync"]["statuses"], [200], name)
+            self.assertEqual(route["async"]["statuses"], [200], name)
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from theatre.bench import build_dataset
+from theatre.models import Performance, Play, Ticket
+
+
+class BenchApiCommandTests(TestCase):
+    def test_bench_api_reports_every_route(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+
+            with override_settings(MEDIA_ROOT=directory):
+                call_command(
+                    "bench_api",
+                    halls=1,
+                    genres=3,
+                    actors=5,
+                    plays=3,
+                    performances=5,
+                    tickets=50,
+                    users=2,
+                    requests=2,
+                    output=output,
+                    stdout=StringIO(),
+                )
+                call_command(
+                    "bench_api",
+                    halls=1,
+                    genres=3,
+                    actors=5,
+                    plays=3,
+                    performances=5,
+                    tickets=50,
+                    users=2,
+                    requests=2,
+                    compare=output,
+                    stdout=StringIO(),
+                )
+
+            with open(output) as bench:
+                results = json.load(bench)
+            uploads = os.listdir(os.path.join(directory, "uploads", "plays"))
+
+        self.assertFalse(Play.objects.exists())
+        self.assertFalse(Ticket.objects.exists())
+        self.assertEqual(uploads, [])
+        self.assertEqual(
+            results["routes"]["performance-retrieve"]["statuses"], [200]
+        )
+        for name in (
+                "reservation-export",
+                "performance-manifest",
+                "genre-update",
+                "play-delete",
+                "play-search",
+                "db-metrics",
+        ):
+            self.assertIn(name, results["routes"])
+        self.assertGreater(
+            results["routes"]["reservation-export"]["bytes"], 0
+        )
+        for name, route in results["routes"].items():
+            self.assertLess(max(route["statuses"]), 400, name)
+            self.assertLessEqual(route["p50_ms"], route["p99_ms"], name)
+
+    @unittest.skipUnless(
+        connection.vendor == "postgresql",
+        "Search vectors are only filled on PostgreSQL"
+    )
+    def test_dataset_plays_have_search_vectors(self):
+        build_dataset(plays=3, performances=2, tickets=10, users=1)
+
+        self.assertFalse(
+            Play.objects.filter(search_vector__isnull=True).exists()
+        )
+
+
+class BenchAllocationCommandTests(TestCase):
+    def test_bench_allocation_reports_every_quantity(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+
+            call_command(
+                "bench_allocation",
+                rows=4,
+                seats_in_row=5,
+                occupancy=0.5,
+                performances=2,
+                allocations=3,
+                quantity=[1, 2],
+                output=output,
+                stdout=StringIO(),
+            )
+
+            with open(output) as bench:
+                results = json.load(bench)
+
+        self.assertFalse(Performance.objects.exists())
+        self.assertEqual(sorted(results["quantities"]), ["1", "2"])
+        self.assertEqual(
+            results["quantities"]["1"]["database"]["allocated"], 3
+        )
+        for paths in results["quantities"].values():
+            for summary in paths.values():
+                self.assertEqual(summary["allocations"], 3)
+                self.assertLessEqual(summary["p50_ms"], summary["p99_ms"])
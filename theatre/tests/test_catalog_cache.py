@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from theatre.caching import (
+    catalog_cache_accessed,
+    get_cache,
+    get_cache_stats,
+    reset_cache_stats,
+)
+from theatre.models import Genre, Play
+from theatre.tests.test_actor_view_set import sample_actor
+
+GENRE_URL = reverse("theatre:genre-list")
+PLAY_URL = reverse("theatre:play-list")
+
+
+class CatalogCacheTestsMixin:
+    def setUp(self):
+        caches["default"].clear()
+        reset_cache_stats()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        Genre.objects.create(name="drama")
+
+        first = self.client.get(GENRE_URL)
+        second = self.client.get(GENRE_URL)
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(
+            get_cache_stats()["genre-list"], {"hits": 1, "misses": 1}
+        )
+
+    def test_save_invalidates_cache(self):
+        Genre.objects.create(name="drama")
+        self.client.get(GENRE_URL)
+
+        Genre.objects.create(name="comedy")
+        response = self.client.get(GENRE_URL)
+
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(get_cache_stats()["genre-list"]["hits"], 0)
+
+    def test_m2m_change_invalidates_play_cache(self):
+        play = Play.objects.create(title="test", description="testtest")
+        actor = sample_actor()
+        self.client.get(PLAY_URL)
+
+        play.actors.add(actor)
+        response = self.client.get(PLAY_URL)
+
+        self.assertEqual(
+            response.data["results"][0]["actors"], [actor.full_name]
+        )
+
+    def test_related_model_invalidates_play_cache(self):
+        play = Play.objects.create(title="test", description="testtest")
+        actor = sample_actor()
+        play.actors.add(actor)
+        self.client.get(PLAY_URL)
+
+        actor.first_name = "Changed"
+        actor.save()
+        response = self.client.get(PLAY_URL)
+
+        self.assertEqual(
+            response.data["results"][0]["actors"], [actor.full_name]
+        )
+
+    def test_query_params_normalized(self):
+        first = sample_actor()
+        second = sample_actor()
+
+        self.client.get(PLAY_URL, {"actors": f"{second.id},{first.id}"})
+        self.client.get(
+            PLAY_URL, {"actors": f"{first.id},{second.id},{first.id}"}
+        )
+
+        self.assertEqual(
+            get_cache_stats()["play-list"], {"hits": 1, "misses": 1}
+        )
+
+    def test_serializer_variants_cached_separately(self):
+        play = Play.objects.create(title="test", description="testtest")
+
+        self.client.get(PLAY_URL)
+        response = self.client.get(
+            reverse("theatre:play-detail", args=[play.id])
+        )
+
+        self.assertEqual(response.data["description"], "testtest")
+        self.assertEqual(get_cache_stats()["play-retrieve"]["misses"], 1)
+
+    def test_stats_hook(self):
+        accesses = []
+
+        def receiver(sender, view_name, hit, **kwargs):
+            accesses.append((view_name, hit))
+
+        catalog_cache_accessed.connect(receiver)
+        self.addCleanup(catalog_cache_accessed.disconnect, receiver)
+
+        self.client.get(GENRE_URL)
+        self.client.get(GENRE_URL)
+
+        self.assertEqual(
+            accesses, [("genre-list", False), ("genre-list", True)]
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class LocMemCatalogCacheTests(CatalogCacheTestsMixin, TestCase):
+    pass
+
+
+class FileBasedCatalogCacheTests(CatalogCacheTestsMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.enterClassContext(
+            override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": (
+                            "django.core.cache.backends.filebased."
+                            "FileBasedCache"
+                        ),
+                        "LOCATION": cls.cache_dir,
+                    }
+                }
+            )
+        )
+        cls.addClassCleanup(shutil.rmtree, cls.cache_dir)
+        super().setUpClass()
+
+
+class SharedCatalogCacheTests(CatalogCacheTestsMixin, TestCase):
+    """The configured cache, shared by every worker process"""
+
+    def test_cache_shared_between_processes(self):
+        self.assertNotIsInstance(get_cache(), LocMemCache)
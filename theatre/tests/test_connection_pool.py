@@ -0,0 +1,182 @@
+import threading
+import time
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from theatre_api_service.exceptions import exception_handler
+from theatre_api_service.postgresql_pool.base import DatabaseWrapper
+from theatre_api_service.postgresql_pool.pool import (
+    ConnectionPool,
+    PoolTimeout,
+)
+
+DB_METRICS_URL = reverse("db-metrics")
+
+
+class StubConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connection_reused(self):
+        pool = ConnectionPool(max_size=2)
+
+        first = pool.acquire(StubConnection)
+        pool.release(first)
+        second = pool.acquire(StubConnection)
+
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()["opened"], 1)
+        self.assertEqual(pool.stats()["acquired"], 2)
+        self.assertEqual(pool.stats()["in_use"], 1)
+
+    def test_fail_fast_when_exhausted(self):
+        pool = ConnectionPool(max_size=1, timeout=0)
+        pool.acquire(StubConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(StubConnection)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        busy = pool.acquire(StubConnection)
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(StubConnection))
+        )
+
+        waiter.start()
+        while pool.stats()["waiting"] == 0:
+            time.sleep(0.001)
+        pool.release(busy)
+        waiter.join()
+
+        self.assertEqual(acquired, [busy])
+        self.assertEqual(pool.stats()["wait_ms"]["count"], 2)
+        self.assertGreater(pool.stats()["wait_ms"]["sum"], 0)
+
+    def test_failed_check_discards_connection(self):
+        pool = ConnectionPool(check=lambda conn: False, check_after=0)
+        broken = pool.acquire(StubConnection)
+        pool.release(broken)
+
+        fresh = pool.acquire(StubConnection)
+
+        self.assertIsNot(fresh, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.stats()["failed_checks"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_unreusable_connection_closed_on_release(self):
+        pool = ConnectionPool(reset=lambda conn: False)
+        conn = pool.acquire(StubConnection)
+
+        pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_idle_connections_expire_above_min_size(self):
+        pool = ConnectionPool(min_size=1, max_size=3, max_idle=0)
+        connections = [pool.acquire(StubConnection) for _ in range(3)]
+
+        for conn in connections:
+            pool.release(conn)
+
+        self.assertEqual(pool.stats()["size"], 1)
+        self.assertEqual(
+            [conn.closed for conn in connections], [True, True, False]
+        )
+
+    def test_pool_timeout_answered_with_503(self):
+        try:
+            raise OperationalError("pool exhausted") from PoolTimeout()
+        except OperationalError as exc:
+            response = exception_handler(exc, {})
+
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(response["Retry-After"], "1")
+
+
+class DatabaseMetricsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_staff_required(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.com",
+                password="test12345"
+            )
+        )
+
+        response = self.client.get(DB_METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@test.com",
+                password="test12345",
+                is_staff=True
+            )
+        )
+
+        response = self.client.get(DB_METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("default", response.data["databases"])
+        self.assertIn("pools", response.data)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "Connection pooling is only available on PostgreSQL"
+)
+class PooledConnectionReuseTests(TransactionTestCase):
+    """
+    Every request ends with connection.close() (CONN_MAX_AGE = 0) and
+    reconnects on its first query, the pooled backend must hand out the
+    same server session again instead of opening a new one.
+    """
+
+    def test_connection_reused_across_requests(self):
+        pooled = DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                "ENGINE": "theatre_api_service.postgresql_pool",
+                "CONN_MAX_AGE": 0,
+                "OPTIONS": {"pool": {"max_size": 2}},
+            },
+            alias="pooled",
+        )
+        backend_pids = []
+        try:
+            for _ in range(3):
+                with pooled.cursor() as cursor:
+                    cursor.execute("SELECT pg_backend_pid()")
+                    backend_pids.append(cursor.fetchone()[0])
+                pooled.close()
+
+            stats = pooled.pool.stats()
+        finally:
+            pooled.pool.close()
+
+        self.assertEqual(len(set(backend_pids)), 1)
+        self.assertEqual(stats["opened"], 1)
+        self.assertEqual(stats["acquired"], 3)
+        self.assertEqual(stats["idle"], 1)
@@ -0,0 +1,160 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.models import Reservation, Ticket
+from theatre.tests.test_seat_hold_view_set import sample_performance
+
+EXPORT_URL = reverse("theatre:reservation-export")
+
+
+def manifest_url(performance_id):
+    return reverse("theatre:performance-manifest", args=[performance_id])
+
+
+def read(response):
+    return b"".join(response.streaming_content).decode()
+
+
+class ExportPermissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_staff_required(self):
+        performance = sample_performance()
+
+        self.assertEqual(
+            self.client.get(EXPORT_URL).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            self.client.get(manifest_url(performance.id)).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+
+class StaffExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.performance = sample_performance()
+        self.other_performance = sample_performance()
+        self.reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.bulk_create(
+            Ticket(
+                row=row,
+                seat=seat,
+                performance=performance,
+                reservation=self.reservation
+            )
+            for performance, row, seat in (
+                (self.performance, 2, 1),
+                (self.performance, 1, 3),
+                (self.other_performance, 1, 1),
+            )
+        )
+
+    def test_manifest_csv(self):
+        response = self.client.get(manifest_url(self.performance.id))
+        lines = read(response).splitlines()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            lines[0],
+            "ticket_id,reservation_id,reserved_at,user_email,"
+            "performance_id,show_time,play,theatre_hall,row,seat"
+        )
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(",1,3"))
+        self.assertTrue(lines[2].endswith(",2,1"))
+        self.assertIn("test@test.com", lines[1])
+
+    def test_manifest_ndjson(self):
+        response = self.client.get(
+            manifest_url(self.performance.id), {"format": "ndjson"}
+        )
+        rows = [json.loads(line) for line in read(response).splitlines()]
+
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        self.assertEqual(
+            [(row["row"], row["seat"]) for row in rows], [(1, 3), (2, 1)]
+        )
+        self.assertEqual(rows[0]["play"], "test")
+        self.assertEqual(rows[0]["reservation_id"], self.reservation.id)
+
+    def test_reservation_export(self):
+        response = self.client.get(
+            EXPORT_URL, HTTP_ACCEPT="application/x-ndjson"
+        )
+        rows = [json.loads(line) for line in read(response).splitlines()]
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            {row["user_email"] for row in rows}, {"test@test.com"}
+        )
+
+    def test_reservation_export_by_user(self):
+        response = self.client.get(EXPORT_URL, {"user": self.admin.id})
+
+        self.assertEqual(len(read(response).splitlines()), 1)
+
+    def test_reservation_export_invalid_user(self):
+        for user in ("abc", "0", "-1", "1.5"):
+            with self.subTest(user=user):
+                response = self.client.get(
+                    EXPORT_URL,
+                    {"user": user},
+                    HTTP_ACCEPT="application/x-ndjson"
+                )
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn("user", json.loads(response.content))
+
+    async def test_asgi_streams_asynchronously(self):
+        response = await AsyncClient().get(
+            EXPORT_URL,
+            headers={
+                "Authorization": f"Bearer {AccessToken.for_user(self.admin)}"
+            },
+        )
+        content = b"".join(
+            [chunk async for chunk in response.streaming_content]
+        ).decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(content.splitlines()), 4)
+
+    def test_export_single_query(self):
+        response = self.client.get(EXPORT_URL)
+
+        with CaptureQueriesContext(connection) as context:
+            read(response)
+
+        self.assertEqual(len(context), 1)
@@ -0,0 +1,257 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.fast_lists import FastJSONRenderer, FastRows
+from theatre.models import Actor, Genre, Performance, Play, Reservation, Ticket
+from theatre.tests.test_theatre_hall_view_set import sample_theatre_hall
+
+PLAY_URL = reverse("theatre:play-list")
+PERFORMANCE_URL = reverse("theatre:performance-list")
+RESERVATION_URL = reverse("theatre:reservation-list")
+
+
+class FastJSONRendererTests(TestCase):
+    def test_same_bytes_as_json_renderer(self):
+        data = {
+            "results": [
+                {
+                    "title": "Separators \u2028 \u2029",
+                    "description": 'Quotes " \\ </script> \x01 \t\n',
+                    "actors": ["Łukasz Żółć", "李小龍", "\U0001f3ad"],
+                    "count": 0,
+                    "ratio": None,
+                    "active": True,
+                    "empty": [],
+                },
+            ],
+            "next": None,
+        }
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indent_left_to_json_renderer(self):
+        data = {"id": 1, "genres": ["Drama"]}
+
+        self.assertEqual(
+            FastJSONRenderer().render(
+                data, "application/json; indent=2", {}
+            ),
+            JSONRenderer().render(data, "application/json; indent=2", {}),
+        )
+
+
+class FastListParityTests(TestCase):
+    """The fast path must render exactly the bytes of the serializers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+
+        drama = Genre.objects.create(name="Drama")
+        comedy = Genre.objects.create(name="Comédie \u2028")
+        first = Actor.objects.create(first_name="Łukasz", last_name="Żółć")
+        second = Actor.objects.create(first_name="Jo", last_name='"Quote"')
+        self.plays = [
+            Play.objects.create(
+                title=f"Play {index} \U0001f3ad",
+                description="Separators \u2028 \u2029 </script> \x01",
+            )
+            for index in range(3)
+        ]
+        Play.objects.filter(id=self.plays[0].id).update(image_variants={
+            "thumbnail": {
+                "width": 200,
+                "height": 300,
+                "webp": "/media/uploads/plays/variants/play-thumbnail.webp",
+                "jpeg": "/media/uploads/plays/variants/play-thumbnail.jpeg",
+            },
+        })
+        self.plays[0].genres.add(comedy, drama)
+        self.plays[0].actors.add(second, first)
+        self.plays[1].genres.add(drama)
+
+        hall = sample_theatre_hall()
+        show_time = timezone.now().replace(microsecond=123456)
+        self.performances = [
+            Performance.objects.create(
+                play=play,
+                theatre_hall=hall,
+                show_time=show_time + datetime.timedelta(days=index),
+            )
+            for index, play in enumerate(self.plays)
+        ]
+        self.performances.append(
+            Performance.objects.create(
+                play=self.plays[0],
+                theatre_hall=hall,
+                show_time=show_time.replace(microsecond=0),
+            )
+        )
+
+        for index, performance in enumerate(self.performances):
+            reservation = Reservation.objects.create(user=self.user)
+            Ticket.objects.create(
+                row=2, seat=index + 1,
+                performance=performance, reservation=reservation,
+            )
+            Ticket.objects.create(
+                row=1, seat=index + 1,
+                performance=self.performances[0], reservation=reservation,
+            )
+
+    def get_both(self, url, params=None, **extra):
+        """GET url with the serializers and with the fast path"""
+        responses = []
+        for enabled in (False, True):
+            # Catalog responses would otherwise come from the cache
+            cache.clear()
+            with override_settings(FAST_LIST_RESPONSES=enabled), \
+                    mock.patch.object(
+                        FastRows, "map", autospec=True,
+                        side_effect=FastRows.map,
+                    ) as fast_map:
+                response = self.client.get(url, params, **extra)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            responses.append((response, fast_map.called))
+        return responses
+
+    def assertSameContent(self, url, params=None):
+        (serializer, fast_used_off), (fast, fast_used_on) = self.get_both(
+            url, params
+        )
+
+        self.assertFalse(fast_used_off)
+        self.assertTrue(fast_used_on)
+        self.assertEqual(fast.content, serializer.content)
+        return json.loads(fast.content)
+
+    def test_play_list(self):
+        for params in (
+            None,
+            {"fields": "title,actors"},
+            {"fields": "genres"},
+            {"title": self.plays[0].title},
+            {"search": "Play"},
+            {"genres": f"{Genre.objects.get(name='Drama').id}"},
+            {
+                "genres": ",".join(
+                    map(str, Genre.objects.values_list("id", flat=True))
+                ),
+                "match": "all",
+            },
+        ):
+            with self.subTest(params=params):
+                self.assertSameContent(PLAY_URL, params)
+
+    def test_play_list_pages(self):
+        page = self.assertSameContent(PLAY_URL, {"page_size": 1})
+
+        while page["next"]:
+            page = self.assertSameContent(page["next"])
+
+    def test_performance_list(self):
+        for params in (
+            None,
+            {"fields": "id,show_time"},
+            {"fields": "tickets_available,play_title"},
+            {"play": self.plays[0].id},
+            {"adjacent_seats": 2},
+        ):
+            with self.subTest(params=params):
+                self.assertSameContent(PERFORMANCE_URL, params)
+
+    def test_performance_list_pages(self):
+        page = self.assertSameContent(PERFORMANCE_URL, {"page_size": 2})
+
+        while page["next"]:
+            page = self.assertSameContent(page["next"])
+
+    def test_reservation_list_pages(self):
+        page = self.assertSameContent(RESERVATION_URL, {"page_size": 3})
+
+        while page["next"]:
+            page = self.assertSameContent(page["next"])
+
+    def test_async_play_list_with_jwt(self):
+        self.client.force_authenticate(None)
+        responses = self.get_both(
+            PLAY_URL,
+            headers={
+                "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+            },
+        )
+
+        self.assertTrue(responses[1][1])
+        self.assertEqual(responses[1][0].content, responses[0][0].content)
+
+    def test_expand_and_indent_use_serializers(self):
+        for url, params, extra in (
+            (PLAY_URL, {"expand": "genres"}, {}),
+            (PERFORMANCE_URL, {"expand": "play"}, {}),
+            (
+                RESERVATION_URL,
+                None,
+                {"HTTP_ACCEPT": "application/json; indent=4"},
+            ),
+        ):
+            with self.subTest(url=url):
+                (serializer, _), (fast, fast_used) = self.get_both(
+                    url, params, **extra
+                )
+
+                self.assertFalse(fast_used)
+                self.assertEqual(fast.content, serializer.content)
+
+
+class BenchFastListsCommandTests(TestCase):
+    def test_bench_fast_lists_reports_identical_lists(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+
+            call_command(
+                "bench_fast_lists",
+                plays=3,
+                performances=5,
+                tickets=50,
+                users=2,
+                requests=2,
+                output=output,
+                stdout=StringIO(),
+            )
+
+            with open(output) as bench:
+                results = json.load(bench)
+
+        self.assertFalse(Play.objects.exists())
+        self.assertEqual(
+            sorted(results["lists"]),
+            ["performance-list", "play-list", "reservation-list"],
+        )
+        for name, paths in results["lists"].items():
+            self.assertTrue(paths["identical"], name)
+            for path in ("serializer", "fast"):
+                self.assertEqual(paths[path]["status"], 200, name)
+                self.assertLessEqual(
+                    paths[path]["p50_ms"], paths[path]["p99_ms"], name
+                )
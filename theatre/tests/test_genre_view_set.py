@@ -6,6 +6,7 @@ from rest_framework.test import APIClient
 
 from theatre.models import Genre
 from theatre.serializers import GenreSerializer
+from theatre.tests.query_budget import BUDGET_SIZES, QueryBudgetTestCase
 
 GENRE_URL = reverse("theatre:genre-list")
 
@@ -61,3 +62,48 @@ class AdminGenreViewSetTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Genre.objects.filter(name="test1").exists())
+
+
+class GenreQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def seed(self, count):
+        start = Genre.objects.count()
+        Genre.objects.bulk_create(
+            Genre(name=f"genre {index}")
+            for index in range(start, start + count)
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            1, lambda: self.client.get(GENRE_URL), self.seed
+        )
+
+    def test_retrieve_budget(self):
+        genre = Genre.objects.create(name="test")
+
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(
+                reverse("theatre:genre-detail", args=[genre.id])
+            ),
+            self.seed
+        )
+
+    def test_create_budget(self):
+        names = iter(range(len(BUDGET_SIZES)))
+
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.post(
+                GENRE_URL, {"name": f"new {next(names)}"}
+            ),
+            self.seed
+        )
@@ -0,0 +1,286 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from theatre.catalog_import import IdRanges
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+
+
+class IdRangesTests(SimpleTestCase):
+    def test_membership(self):
+        ids = IdRanges()
+        for pk in (5, 1, 3, 2, 9, 4, 10):
+            ids.add(pk)
+
+        self.assertEqual((ids.firsts, ids.lasts), ([1, 9], [5, 10]))
+        for pk in range(12):
+            self.assertEqual(pk in ids, pk in (1, 2, 3, 4, 5, 9, 10), pk)
+
+
+class ImportCatalogCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", newline="") as target:
+            target.write(content)
+        return path
+
+    def write_jsonl(self, name, rows):
+        return self.write(
+            name, "".join(json.dumps(row) + "\n" for row in rows)
+        )
+
+    def catalog_files(self):
+        return {
+            "halls": self.write(
+                "halls.csv",
+                "id,name,rows,seats_in_row\n1,Main,10,20\n2,Small,5,5\n"
+            ),
+            "genres": self.write(
+                "genres.csv", "id,name\n1,Drama\n2,Comedy\n"
+            ),
+            "actors": self.write_jsonl(
+                "actors.jsonl",
+                [
+                    {"id": 1, "first_name": "John", "last_name": "Smith"},
+                    {"id": 2, "first_name": "Jane", "last_name": "Doe"},
+                ]
+            ),
+            "plays": self.write(
+                "plays.csv",
+                'id,title,description,genres,actors\n'
+                '1,Hamlet,Tragedy,1,"1,2"\n'
+                '2,Tartuffe,,2,2\n'
+            ),
+            "performances": self.write_jsonl(
+                "performances.jsonl",
+                [
+                    {
+                        "id": 1,
+                        "play_id": 1,
+                        "theatre_hall_id": 1,
+                        "show_time": "2024-10-01T19:00:00+00:00",
+                    },
+                    {
+                        "id": 2,
+                        "play_id": 2,
+                        "theatre_hall_id": 2,
+                        "show_time": "2024-10-02T19:00:00+00:00",
+                    },
+                ]
+            ),
+        }
+
+    def test_import_catalog(self):
+        call_command(
+            "import_catalog",
+            batch_size=1,
+            stdout=StringIO(),
+            **self.catalog_files()
+        )
+
+        hamlet = Play.objects.get(id=1)
+        self.assertEqual(TheatreHall.objects.count(), 2)
+        self.assertEqual(
+            sorted(hamlet.actors.values_list("id", flat=True)), [1, 2]
+        )
+        self.assertEqual(list(hamlet.genres.values_list("name", flat=True)),
+                         ["Drama"])
+        self.assertEqual(Performance.objects.get(id=2).theatre_hall.name,
+                         "Small")
+        self.assertEqual(Performance.objects.get(id=2).tickets_sold, 0)
+
+    def test_import_catalog_upserts(self):
+        files = self.catalog_files()
+        call_command("import_catalog", stdout=StringIO(), **files)
+
+        call_command(
+            "import_catalog",
+            plays=self.write(
+                "plays_update.jsonl",
+                '{"id": 1, "title": "Hamlet II", "actors": [2]}\n'
+            ),
+            stdout=StringIO()
+        )
+
+        hamlet = Play.objects.get(id=1)
+        self.assertEqual(Play.objects.count(), 2)
+        self.assertEqual(hamlet.title, "Hamlet II")
+        self.assertEqual(list(hamlet.actors.values_list("id", flat=True)),
+                         [2])
+        self.assertFalse(hamlet.genres.exists())
+        self.assertEqual(Actor.objects.create(first_name="A",
+                                              last_name="B").id, 3)
+
+    def test_dry_run_does_not_write(self):
+        stdout = StringIO()
+
+        call_command(
+            "import_catalog",
+            dry_run=True,
+            stdout=stdout,
+            **self.catalog_files()
+        )
+
+        self.assertFalse(Genre.objects.exists())
+        self.assertFalse(Performance.objects.exists())
+        self.assertIn("performances: 2 rows", stdout.getvalue())
+
+    def test_invalid_rows_reported(self):
+        stderr = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "import_catalog",
+                performances=self.write_jsonl(
+                    "performances.jsonl",
+                    [
+                        {
+                            "id": 1,
+                            "play_id": 5,
+                            "theatre_hall_id": 1,
+                            "show_time": "2024-10-01T19:00:00+00:00",
+                        },
+                        {"id": 2, "play_id": 1, "show_time": "tomorrow"},
+                    ]
+                ),
+                stdout=StringIO(),
+                stderr=stderr,
+            )
+
+        self.assertIn("line 1: unknown play_id=5", stderr.getvalue())
+        self.assertIn("line 2:", stderr.getvalue())
+
+    def test_duplicate_unique_values_reported(self):
+        Genre.objects.create(id=1, name="Drama")
+        stderr = StringIO()
+
+        for dry_run in (True, False):
+            with self.subTest(dry_run=dry_run), \
+                    self.assertRaises(CommandError):
+                call_command(
+                    "import_catalog",
+                    genres=self.write(
+                        "genres.csv",
+                        "id,name\n2,Drama\n3,Comedy\n4,Comedy\n"
+                    ),
+                    batch_size=2,
+                    dry_run=dry_run,
+                    stdout=StringIO(),
+                    stderr=stderr,
+                )
+
+        self.assertIn(
+            "genres line 2: name='Drama' is used by id 1", stderr.getvalue()
+        )
+        self.assertIn(
+            "genres line 4: name='Comedy' is used by id 3", stderr.getvalue()
+        )
+        self.assertEqual(
+            list(Genre.objects.values_list("id", "name")),
+            [(1, "Drama"), (3, "Comedy")]
+        )
+
+    def seat_map_setup(self):
+        call_command("import_catalog", stdout=StringIO(),
+                     **self.catalog_files())
+        user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        Ticket.objects.create(
+            row=5,
+            seat=10,
+            performance=Performance.objects.get(id=1),
+            reservation=Reservation.objects.create(user=user)
+        )
+
+    def test_moved_performance_seat_map_rebuilt(self):
+        self.seat_map_setup()
+
+        call_command(
+            "import_catalog",
+            halls=self.write(
+                "halls.csv", "id,name,rows,seats_in_row\n3,Wide,6,30\n"
+            ),
+            performances=self.write_jsonl(
+                "performances.jsonl",
+                [
+                    {
+                        "id": 1,
+                        "play_id": 1,
+                        "theatre_hall_id": 3,
+                        "show_time": "2024-10-01T19:00:00+00:00",
+                    },
+                ]
+            ),
+            stdout=StringIO(),
+        )
+        performance = Performance.objects.get(id=1)
+
+        self.assertEqual(performance.seats.seats_in_row, 30)
+        self.assertEqual(list(performance.seats.taken()), [(5, 10)])
+        self.assertEqual(performance.tickets_sold, 1)
+
+    def test_resized_hall_seat_map_rebuilt(self):
+        self.seat_map_setup()
+
+        call_command(
+            "import_catalog",
+            halls=self.write(
+                "halls.csv", "id,name,rows,seats_in_row\n1,Main,10,12\n"
+            ),
+            stdout=StringIO(),
+        )
+        performance = Performance.objects.get(id=1)
+
+        self.assertEqual(performance.seats.seats_in_row, 12)
+        self.assertEqual(list(performance.seats.taken()), [(5, 10)])
+
+    def test_stranding_sold_seats_reported(self):
+        self.seat_map_setup()
+        stderr = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "import_catalog",
+                halls=self.write(
+                    "halls.csv", "id,name,rows,seats_in_row\n1,Main,4,20\n"
+                ),
+                performances=self.write_jsonl(
+                    "performances.jsonl",
+                    [
+                        {
+                            "id": 1,
+                            "play_id": 1,
+                            "theatre_hall_id": 2,
+                            "show_time": "2024-10-01T19:00:00+00:00",
+                        },
+                    ]
+                ),
+                stdout=StringIO(),
+                stderr=stderr,
+            )
+
+        self.assertIn("halls line 2: tickets or seat holds lie outside",
+                      stderr.getvalue())
+        self.assertIn("performances line 1: tickets or seat holds lie",
+                      stderr.getvalue())
+        self.assertEqual(TheatreHall.objects.get(id=1).rows, 10)
+        self.assertEqual(Performance.objects.get(id=1).theatre_hall_id, 1)
@@ -0,0 +1,156 @@
+import os
+import tempfile
+
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from theatre_api_service.media import parse_range
+
+CONTENT = bytes(range(256)) * 1024
+
+
+class ParseRangeTests(TestCase):
+    def test_ranges(self):
+        for header, expected in (
+            (None, None),
+            ("bytes=0-99", (0, 99)),
+            ("bytes=100-", (100, 999)),
+            ("bytes=-100", (900, 999)),
+            ("bytes=-5000", (0, 999)),
+            ("bytes=900-5000", (900, 999)),
+            ("bytes=5-1", None),
+            ("bytes=0-1,5-6", None),
+            ("items=0-1", None),
+            ("bytes=-", None),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 1000), expected)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ("bytes=1000-", "bytes=-0", "bytes=2000-3000"):
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    parse_range(header, 1000)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.path = os.path.join(media_root.name, "uploads", "plays")
+        os.makedirs(self.path)
+        with open(os.path.join(self.path, "play-1.webp"), "wb") as file:
+            file.write(CONTENT)
+        self.url = reverse("media", args=["uploads/plays/play-1.webp"])
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=31536000, immutable"
+        )
+        self.assertTrue(response["ETag"].startswith('"'))
+
+    def test_range(self):
+        response = self.client.get(self.url, headers={"Range": "bytes=10-19"})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(
+            response["Content-Range"], f"bytes 10-19/{len(CONTENT)}"
+        )
+        self.assertEqual(response["Content-Length"], "10")
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(
+            self.url, headers={"Range": f"bytes={len(CONTENT)}-"}
+        )
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        response = self.client.get(
+            self.url,
+            headers={"Range": "bytes=10-19", "If-Range": '"stale"'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=31536000, immutable"
+        )
+
+    def test_head(self):
+        response = self.client.head(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+
+    def test_missing_files_and_traversal(self):
+        for path in (
+            "uploads/plays/missing.webp",
+            "uploads/plays",
+            "../etc/passwd",
+            "uploads/../../etc/passwd",
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(reverse("media", args=[path]))
+
+                self.assertEqual(response.status_code, 404)
+
+    def test_only_safe_methods(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(
+        MEDIA_SERVING="x-accel-redirect",
+        MEDIA_ACCEL_REDIRECT_LOCATION="/protected-media/",
+    )
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/uploads/plays/play-1.webp",
+        )
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    @override_settings(MEDIA_SERVING="x-sendfile")
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response["X-Sendfile"], os.path.join(self.path, "play-1.webp")
+        )
+        self.assertEqual(response.content, b"")
+
+    async def test_asgi_streams_asynchronously(self):
+        response = await AsyncClient().get(
+            self.url, headers={"Range": "bytes=65530-65545"}
+        )
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        self.assertEqual(
+            b"".join([chunk async for chunk in response.streaming_content]),
+            CONTENT[65530:65546],
+        )
@@ -0,0 +1,64 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from theatre.middleware import RepeatedQueriesMiddleware
+from theatre.models import Genre
+
+
+def n_plus_one_view(request):
+    for genre_id in range(6):
+        Genre.objects.filter(id=genre_id).first()
+    return HttpResponse()
+
+
+async def async_n_plus_one_view(request):
+    await sync_to_async(n_plus_one_view)(request)
+    for genre_id in range(6):
+        await Genre.objects.filter(id=genre_id).afirst()
+    return HttpResponse()
+
+
+def single_query_view(request):
+    list(Genre.objects.all())
+    return HttpResponse()
+
+
+@override_settings(DEBUG=True, N_PLUS_ONE_THRESHOLD=5)
+class RepeatedQueriesMiddlewareTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/api/theatre/genres/")
+
+    def test_repeated_queries_reported(self):
+        middleware = RepeatedQueriesMiddleware(n_plus_one_view)
+
+        with self.assertLogs("theatre.middleware", "WARNING") as logs:
+            response = middleware(self.request)
+
+        self.assertEqual(response["X-Repeated-Queries"], "1")
+        self.assertIn("repeated 6 times", logs.output[0])
+        self.assertIn("n_plus_one_view", logs.output[0])
+
+    async def test_async_repeated_queries_reported(self):
+        middleware = RepeatedQueriesMiddleware(async_n_plus_one_view)
+
+        with self.assertLogs("theatre.middleware", "WARNING") as logs:
+            response = await middleware(self.request)
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(response["X-Repeated-Queries"], "1")
+        self.assertIn("repeated 12 times", logs.output[0])
+
+    def test_distinct_queries_not_reported(self):
+        middleware = RepeatedQueriesMiddleware(single_query_view)
+
+        with self.assertNoLogs("theatre.middleware", "WARNING"):
+            response = middleware(self.request)
+
+        self.assertNotIn("X-Repeated-Queries", response)
+
+    @override_settings(DEBUG=False)
+    def test_disabled_without_debug(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RepeatedQueriesMiddleware(single_query_view)
@@ -1,13 +1,24 @@
+import base64
 import datetime
+from io import StringIO
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from theatre.models import Play, Performance
+from theatre.models import Play, Performance, Reservation, SeatHold, Ticket
 from theatre.serializers import PerformanceDetailSerializer
+from theatre.tests.query_budget import (
+    QueryBudgetTestCase,
+    without_throttling,
+)
+from theatre.tests.test_seat_hold_view_set import sample_performance
 from theatre.tests.test_theatre_hall_view_set import sample_theatre_hall
 
 PERFORMANCE_URL = reverse("theatre:performance-list")
@@ -53,6 +64,132 @@ class AuthenticatedPerformanceViewSetTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_retrieve_performance_taken_places(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time=datetime.datetime.now()
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in [(4, 1), (1, 5)]:
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                performance=performance,
+                reservation=reservation
+            )
+
+        response = self.client.get(
+            reverse("theatre:performance-detail", args=[performance.id])
+        )
+
+        self.assertEqual(
+            response.data["taken_places"],
+            [{"row": 1, "seat": 5}, {"row": 4, "seat": 1}]
+        )
+
+    def retrieve_seat_map(self, performance, **params):
+        response = self.client.get(
+            reverse("theatre:performance-detail", args=[performance.id]),
+            {"seatmap": "bitset", **params}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["taken_places"]
+
+    def test_retrieve_seatmap_bitset(self):
+        performance = sample_performance(
+            theatre_hall=sample_theatre_hall(rows=3, seats_in_row=4)
+        )
+        SeatHold.claim(performance.id, self.user, [(1, 2), (3, 4)], ValueError)
+
+        taken_places = self.retrieve_seat_map(performance)
+        bits = base64.b64decode(taken_places.pop("bits"))
+
+        self.assertEqual(
+            taken_places,
+            {"encoding": "bitset", "version": 1, "rows": 3, "seats_in_row": 4}
+        )
+        # Seats 1 (row 1, seat 2) and 11 (row 3, seat 4)
+        self.assertEqual(bits, bytes([0b10, 0b1000]))
+
+    def test_retrieve_seatmap_since_version(self):
+        performance = sample_performance(
+            theatre_hall=sample_theatre_hall(rows=3, seats_in_row=4)
+        )
+        hold = SeatHold.claim(
+            performance.id, self.user, [(1, 1), (2, 2)], ValueError
+        )
+        version = self.retrieve_seat_map(performance)["version"]
+
+        self.assertEqual(
+            self.retrieve_seat_map(performance, since_version=version),
+            {
+                "encoding": "delta",
+                "version": version,
+                "since_version": version,
+                "taken": [],
+                "released": [],
+            }
+        )
+
+        hold.release()
+        SeatHold.claim(performance.id, self.user, [(2, 2), (3, 1)], ValueError)
+
+        self.assertEqual(
+            self.retrieve_seat_map(performance, since_version=version),
+            {
+                "encoding": "delta",
+                "version": version + 2,
+                "since_version": version,
+                "taken": [5, 8],
+                "released": [0],
+            }
+        )
+
+    @override_settings(SEAT_MAP_CHANGES_KEPT=2)
+    def test_retrieve_seatmap_since_old_version(self):
+        performance = sample_performance()
+        for seat in range(1, 4):
+            SeatHold.claim(performance.id, self.user, [(1, seat)], ValueError)
+
+        self.assertEqual(
+            self.retrieve_seat_map(performance, since_version=1)["taken"],
+            [1, 2]
+        )
+        for since_version in (0, 4):
+            self.assertEqual(
+                self.retrieve_seat_map(
+                    performance, since_version=since_version
+                )["encoding"],
+                "bitset"
+            )
+
+    def test_retrieve_seatmap_invalid_params(self):
+        performance = sample_performance()
+
+        for params, error in (
+                ({"seatmap": "png"}, "seatmap"),
+                (
+                    {"seatmap": "bitset", "since_version": "-1"},
+                    "since_version",
+                ),
+                ({"since_version": "1"}, "since_version"),
+        ):
+            response = self.client.get(
+                reverse("theatre:performance-detail", args=[performance.id]),
+                params
+            )
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+            self.assertIn(error, response.data)
+
     def test_create_performance_forbidden(self):
         play = Play.objects.create(
             title="test",
@@ -71,6 +208,56 @@ class AuthenticatedPerformanceViewSetTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_list_tickets_available(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=sample_theatre_hall(),
+            show_time=datetime.datetime.now()
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=1, seat=1, performance=performance, reservation=reservation
+        )
+
+        response = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(response.data["results"][0]["tickets_available"], 24)
+
+    def test_list_performances_cursor_pagination(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        show_time = datetime.datetime(2024, 3, 29, tzinfo=datetime.UTC)
+        performances = [
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=show_time
+            )
+            for _ in range(3)
+        ]
+
+        first_page = self.client.get(PERFORMANCE_URL, {"page_size": 2})
+        second_page = self.client.get(first_page.data["next"])
+
+        self.assertNotIn("count", first_page.data)
+        self.assertEqual(
+            [
+                performance["id"]
+                for performance in (
+                    first_page.data["results"] + second_page.data["results"]
+                )
+            ],
+            [performance.id for performance in performances]
+        )
+        self.assertIsNone(second_page.data["next"])
+
     def test_filter_by_date(self):
         play = Play.objects.create(
             title="test",
@@ -92,7 +279,35 @@ class AuthenticatedPerformanceViewSetTests(TestCase):
         response = self.client.get(PERFORMANCE_URL, {"date": "2024-03-29"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_filter_by_date_range_bounds(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        for show_time in (
+                "2024-03-28T23:59:59Z",
+                "2024-03-29T00:00:00Z",
+                "2024-03-29T23:59:59Z",
+                "2024-03-30T00:00:00Z",
+        ):
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=show_time
+            )
+
+        response = self.client.get(PERFORMANCE_URL, {"date": "2024-03-29"})
+
+        self.assertEqual(
+            [
+                performance["show_time"]
+                for performance in response.data["results"]
+            ],
+            ["2024-03-29T23:59:59Z", "2024-03-29T00:00:00Z"]
+        )
 
     def test_filter_by_play(self):
         play1 = Play.objects.create(
@@ -119,7 +334,165 @@ class AuthenticatedPerformanceViewSetTests(TestCase):
         response = self.client.get(PERFORMANCE_URL, {"play": f"{play1.id}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_filter_by_adjacent_seats(self):
+        play = Play.objects.create(title="test", description="testtest")
+        theatre_hall = sample_theatre_hall()
+        split = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-03-29T19:00:00Z"
+        )
+        untouched = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-03-30T19:00:00Z"
+        )
+        # Seat 3 taken in every row leaves runs of two seats
+        Performance.mark_seats(
+            (split.id, row, 3) for row in range(1, 6)
+        )
+
+        four = self.client.get(PERFORMANCE_URL, {"adjacent_seats": 4})
+        two = self.client.get(PERFORMANCE_URL, {"adjacent_seats": 2})
+        Performance.mark_seats([(split.id, 2, 3)], taken=False)
+        released = self.client.get(PERFORMANCE_URL, {"adjacent_seats": 5})
+
+        self.assertEqual(
+            [performance["id"] for performance in four.data["results"]],
+            [untouched.id]
+        )
+        self.assertEqual(len(two.data["results"]), 2)
+        self.assertEqual(len(released.data["results"]), 2)
+
+    def test_filter_by_date_from_to(self):
+        play = Play.objects.create(title="test", description="testtest")
+        theatre_hall = sample_theatre_hall()
+        for show_time in (
+                "2024-02-29T23:59:59Z",
+                "2024-03-01T00:00:00Z",
+                "2024-03-31T23:59:59Z",
+                "2024-04-01T00:00:00Z",
+        ):
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=show_time
+            )
+
+        response = self.client.get(
+            PERFORMANCE_URL,
+            {"date_from": "2024-03-01", "date_to": "2024-03-31"}
+        )
+
+        self.assertEqual(
+            [
+                performance["show_time"]
+                for performance in response.data["results"]
+            ],
+            ["2024-03-31T23:59:59Z", "2024-03-01T00:00:00Z"]
+        )
+
+    def test_filter_invalid_params(self):
+        for params in (
+                {"adjacent_seats": "0"},
+                {"adjacent_seats": "four"},
+                {"date_from": "2024-13-01"},
+                {"date": "tomorrow"},
+                {"play": "hamlet"},
+                {"play": "-1"},
+        ):
+            response = self.client.get(PERFORMANCE_URL, params)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_list_sparse_fields(self):
+        play = Play.objects.create(title="test", description="testtest")
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=sample_theatre_hall(),
+            show_time="2024-03-29T19:00:00Z"
+        )
+
+        with without_throttling(), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                PERFORMANCE_URL, {"fields": "id,play_title,show_time"}
+            )
+
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": performance.id,
+                    "play_title": "test",
+                    "show_time": "2024-03-29T19:00:00Z",
+                }
+            ]
+        )
+        self.assertEqual(len(context), 1)
+        self.assertNotIn("theatre_theatrehall", context[0]["sql"])
+
+    def test_list_expand(self):
+        play = Play.objects.create(title="test", description="testtest")
+        theatre_hall = sample_theatre_hall()
+        Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time="2024-03-29T19:00:00Z"
+        )
+
+        with without_throttling(), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                PERFORMANCE_URL,
+                {"fields": "id", "expand": "play,theatre_hall"}
+            )
+
+        result = response.data["results"][0]
+        self.assertEqual(sorted(result), ["id", "play", "theatre_hall"])
+        self.assertEqual(result["play"]["title"], "test")
+        self.assertEqual(
+            result["theatre_hall"]["capacity"], theatre_hall.capacity
+        )
+        # Page, then genres and actors of the plays
+        self.assertEqual(len(context), 3)
+
+    def test_retrieve_sparse_fields(self):
+        performance = Performance.objects.create(
+            play=Play.objects.create(title="test", description="testtest"),
+            theatre_hall=sample_theatre_hall(),
+            show_time="2024-03-29T19:00:00Z"
+        )
+
+        with without_throttling(), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse("theatre:performance-detail", args=[performance.id]),
+                {"fields": "id,show_time"}
+            )
+
+        self.assertEqual(
+            response.data,
+            {"id": performance.id, "show_time": "2024-03-29T19:00:00Z"}
+        )
+        self.assertEqual(len(context), 1)
+
+    def test_sparse_fields_unknown(self):
+        for params in (
+                {"fields": "id,secret"},
+                {"expand": "play_title"},
+        ):
+            response = self.client.get(PERFORMANCE_URL, params)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+            self.assertIn(next(iter(params)), response.data)
 
 
 class AdminPerformanceViewSetTests(TestCase):
@@ -150,3 +523,174 @@ class AdminPerformanceViewSetTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Performance.objects.filter(play_id=play.id).exists())
+
+    def sample_ticket(self, performance, row, seat):
+        return Ticket.objects.create(
+            row=row,
+            seat=seat,
+            performance=performance,
+            reservation=Reservation.objects.create(user=self.user)
+        )
+
+    def test_move_performance_rebuilds_seat_map(self):
+        performance = sample_performance(
+            theatre_hall=sample_theatre_hall(rows=5, seats_in_row=10)
+        )
+        self.sample_ticket(performance, 2, 1)
+        theatre_hall = sample_theatre_hall(rows=5, seats_in_row=20)
+
+        response = self.client.patch(
+            reverse("theatre:performance-detail", args=[performance.id]),
+            {"theatre_hall": theatre_hall.id}
+        )
+        performance.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(performance.seats.seats_in_row, 20)
+        self.assertEqual(list(performance.seats.taken()), [(2, 1)])
+        self.assertEqual(performance.tickets_sold, 1)
+
+        response = self.client.post(
+            reverse("theatre:reservation-list"),
+            {"tickets": [
+                {"row": 2, "seat": 1, "performance": performance.id}
+            ]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_move_performance_to_smaller_hall(self):
+        performance = sample_performance(
+            theatre_hall=sample_theatre_hall(rows=5, seats_in_row=10)
+        )
+        self.sample_ticket(performance, 5, 1)
+        SeatHold.claim(performance.id, self.user, [(1, 10)], ValueError)
+        hall_id = performance.theatre_hall_id
+
+        for rows, seats_in_row in [(4, 10), (5, 9)]:
+            theatre_hall = sample_theatre_hall(
+                rows=rows, seats_in_row=seats_in_row
+            )
+            response = self.client.patch(
+                reverse("theatre:performance-detail", args=[performance.id]),
+                {"theatre_hall": theatre_hall.id}
+            )
+            performance.refresh_from_db()
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            self.assertEqual(performance.theatre_hall_id, hall_id)
+
+
+class ReconcileTicketsCommandTests(TestCase):
+    def test_reconcile_tickets_fixes_drift(self):
+        user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=sample_theatre_hall(),
+            show_time=datetime.datetime.now()
+        )
+        reservation = Reservation.objects.create(user=user)
+        Ticket.objects.create(
+            row=1, seat=1, performance=performance, reservation=reservation
+        )
+        Performance.objects.filter(id=performance.id).update(
+            tickets_sold=7, seat_map=b""
+        )
+
+        call_command("reconcile_tickets", stdout=StringIO())
+        performance.refresh_from_db()
+
+        self.assertEqual(performance.tickets_sold, 1)
+        self.assertEqual(list(performance.seats.taken()), [(1, 1)])
+
+
+class PerformanceQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        self.theatre_hall = sample_theatre_hall(rows=50, seats_in_row=50)
+        self.performance = Performance.objects.create(
+            play=self.play,
+            theatre_hall=self.theatre_hall,
+            show_time=timezone.now()
+        )
+        self.reservation = Reservation.objects.create(user=self.user)
+
+    def seed_performances(self, count):
+        Performance.objects.bulk_create(
+            Performance(
+                play=self.play,
+                theatre_hall=self.theatre_hall,
+                show_time=timezone.now()
+            )
+            for _ in range(count)
+        )
+
+    def seed_tickets(self, count):
+        start = self.performance.tickets.count()
+        tickets = [
+            Ticket(
+                row=index // 50 + 1,
+                seat=index % 50 + 1,
+                performance=self.performance,
+                reservation=self.reservation
+            )
+            for index in range(start, start + count)
+        ]
+        Ticket.objects.bulk_create(tickets)
+        Performance.mark_seats(
+            (ticket.performance_id, ticket.row, ticket.seat)
+            for ticket in tickets
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(PERFORMANCE_URL),
+            self.seed_performances
+        )
+
+    def test_retrieve_budget(self):
+        self.assertQueryBudget(
+            3,
+            lambda: self.client.get(
+                reverse(
+                    "theatre:performance-detail",
+                    args=[self.performance.id]
+                )
+            ),
+            self.seed_tickets
+        )
+
+    def test_create_budget(self):
+        self.assertQueryBudget(
+            3,
+            lambda: self.client.post(
+                PERFORMANCE_URL,
+                {
+                    "play": self.play.id,
+                    "theatre_hall": self.theatre_hall.id,
+                    "show_time": timezone.now()
+                }
+            ),
+            self.seed_performances
+        )
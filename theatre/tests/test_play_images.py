@@ -0,0 +1,204 @@
+import os
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from theatre.images import generate_play_image_variants
+from theatre.models import Play, Task
+from theatre.tasks import process_play_image
+
+PLAY_URL = reverse("theatre:play-list")
+
+
+def sample_image(
+        size=(800, 600), mode="RGB", color="red", exif=None,
+        image_format="JPEG"
+):
+    image = Image.new(mode, size, color)
+    output = BytesIO()
+    image.save(output, image_format, **({"exif": exif} if exif else {}))
+    extension = image_format.lower()
+    return SimpleUploadedFile(
+        f"poster.{extension}", output.getvalue(), f"image/{extension}"
+    )
+
+
+def upload_image_url(play_id):
+    return reverse("theatre:play-upload-image", args=[play_id])
+
+
+def media_path(url):
+    return url.removeprefix("/media/")
+
+
+class PlayImageVariantsTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root.name))
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.play = Play.objects.create(title="test", description="test")
+
+    def upload(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                upload_image_url(self.play.id),
+                {"image": image},
+                format="multipart",
+            )
+
+    @staticmethod
+    def run_worker():
+        call_command("run_worker", once=True, stdout=StringIO())
+
+    def open_variant(self, url):
+        return Image.open(os.path.join(self.media_root.name, media_path(url)))
+
+    def test_upload_leaves_variants_to_the_worker(self):
+        response = self.upload(sample_image())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["image_variants"])
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.media_root.name, "uploads/plays/variants")
+            )
+        )
+
+    def test_worker_generates_variants(self):
+        self.upload(sample_image((2000, 1000)))
+
+        self.run_worker()
+        variants = self.client.get(
+            reverse("theatre:play-detail", args=[self.play.id])
+        ).data["image_variants"]
+
+        self.assertEqual(list(variants), ["thumbnail", "card", "full"])
+        self.assertEqual(
+            [
+                (variant["width"], variant["height"])
+                for variant in variants.values()
+            ],
+            [(200, 100), (600, 300), (1600, 800)],
+        )
+        for variant in variants.values():
+            for extension, image_format in (
+                    ("webp", "WEBP"), ("jpeg", "JPEG")
+            ):
+                with self.open_variant(variant[extension]) as image:
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(
+                        image.size, (variant["width"], variant["height"])
+                    )
+
+    def test_list_exposes_variants(self):
+        self.upload(sample_image())
+        self.assertIsNone(
+            self.client.get(PLAY_URL).data["results"][0]["image_variants"]
+        )
+
+        self.run_worker()
+        play = self.client.get(PLAY_URL).data["results"][0]
+
+        self.assertEqual(play["image_variants"]["thumbnail"]["width"], 200)
+
+    def test_small_images_are_not_enlarged(self):
+        self.upload(sample_image((100, 150)))
+
+        self.run_worker()
+        self.play.refresh_from_db()
+
+        for variant in self.play.image_variants.values():
+            self.assertEqual((variant["width"], variant["height"]), (100, 150))
+
+    def test_metadata_is_stripped_after_orientation(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees
+        exif[0x010F] = "Camera maker"
+        self.upload(sample_image((400, 200), exif=exif.tobytes()))
+
+        self.run_worker()
+        self.play.refresh_from_db()
+        full = self.play.image_variants["full"]
+
+        self.assertEqual((full["width"], full["height"]), (200, 400))
+        for extension in ("webp", "jpeg"):
+            with self.open_variant(full[extension]) as image:
+                self.assertEqual(dict(image.getexif()), {})
+                self.assertNotIn("icc_profile", image.info)
+
+    def test_transparent_png_is_flattened_for_jpeg(self):
+        self.upload(
+            sample_image(
+                mode="RGBA", color=(255, 0, 0, 128), image_format="PNG"
+            )
+        )
+
+        self.run_worker()
+        self.play.refresh_from_db()
+        card = self.play.image_variants["card"]
+
+        with self.open_variant(card["jpeg"]) as image:
+            self.assertEqual(image.mode, "RGB")
+        with self.open_variant(card["webp"]) as image:
+            self.assertEqual(image.mode, "RGBA")
+
+    def test_variants_of_a_replaced_image_are_dropped(self):
+        self.upload(sample_image())
+        stale = Play.objects.get(id=self.play.id)
+        self.upload(sample_image())
+
+        self.assertFalse(generate_play_image_variants(stale))
+        self.play.refresh_from_db()
+
+        self.assertIsNone(self.play.image_variants)
+        self.assertEqual(
+            os.listdir(
+                os.path.join(self.media_root.name, "uploads/plays/variants")
+            ),
+            [],
+        )
+
+    def test_unreadable_image_is_recorded_without_variants(self):
+        self.upload(sample_image())
+        with open(Play.objects.get(id=self.play.id).image.path, "wb") as image:
+            image.write(b"not an image")
+
+        with self.assertLogs("theatre.images", "WARNING"):
+            self.run_worker()
+        self.play.refresh_from_db()
+
+        self.assertEqual(self.play.image_variants, {})
+
+    def test_backfill_queues_images_without_variants(self):
+        self.upload(sample_image())
+        self.run_worker()
+        Play.objects.filter(id=self.play.id).update(image_variants=None)
+        Play.objects.create(title="no image", description="test")
+
+        call_command("process_play_images", stdout=StringIO())
+
+        self.assertEqual(
+            list(Task.objects.values_list("name", "kwargs")),
+            [(process_play_image.task_name, {"play_id": self.play.id})],
+        )
+        self.run_worker()
+        self.play.refresh_from_db()
+        self.assertEqual(
+            list(self.play.image_variants), ["thumbnail", "card", "full"]
+        )
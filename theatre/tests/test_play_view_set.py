@@ -1,11 +1,20 @@
+import unittest
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from theatre.models import Genre, Play
 from theatre.serializers import PlayListSerializer, PlayDetailSerializer
+from theatre.tests.query_budget import (
+    LOCAL_CACHES,
+    QueryBudgetTestCase,
+    without_throttling,
+)
 from theatre.tests.test_actor_view_set import sample_actor
 
 PLAY_URL = reverse("theatre:play-list")
@@ -47,7 +56,7 @@ class AuthenticatedPlayViewSetTests(TestCase):
         serializer = PlayListSerializer(plays, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_retrieve_play(self):
         genre = Genre.objects.create(name="test")
@@ -101,8 +110,8 @@ class AuthenticatedPlayViewSetTests(TestCase):
         serializer2 = PlayListSerializer(play2)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, response.data)
-        self.assertNotIn(serializer2.data, response.data)
+        self.assertIn(serializer1.data, response.data["results"])
+        self.assertNotIn(serializer2.data, response.data["results"])
 
     def test_filter_by_genre(self):
         play1 = Play.objects.create(
@@ -135,9 +144,9 @@ class AuthenticatedPlayViewSetTests(TestCase):
         serializer3 = PlayListSerializer(play3)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertIn(serializer1.data, response.data["results"])
+        self.assertIn(serializer2.data, response.data["results"])
+        self.assertNotIn(serializer3.data, response.data["results"])
 
     def test_filter_by_actor(self):
         play1 = Play.objects.create(
@@ -170,9 +179,205 @@ class AuthenticatedPlayViewSetTests(TestCase):
         serializer3 = PlayListSerializer(play3)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertIn(serializer1.data, response.data["results"])
+        self.assertIn(serializer2.data, response.data["results"])
+        self.assertNotIn(serializer3.data, response.data["results"])
+
+    def test_filter_by_genre_and_actor(self):
+        genre1 = Genre.objects.create(name="genre1")
+        genre2 = Genre.objects.create(name="genre2")
+        actor = sample_actor()
+        play1 = Play.objects.create(title="test1", description="testtest")
+        play2 = Play.objects.create(title="test2", description="testtest")
+        play1.genres.add(genre1, genre2)
+        play1.actors.add(actor)
+        play2.genres.add(genre1)
+
+        response = self.client.get(
+            PLAY_URL,
+            {"genres": f"{genre1.id},{genre2.id}", "actors": str(actor.id)}
+        )
+
+        self.assertEqual(
+            [result["id"] for result in response.data["results"]],
+            [play1.id]
+        )
+
+    def test_filter_match_all(self):
+        actor1 = sample_actor()
+        actor2 = sample_actor()
+        play1 = Play.objects.create(title="test1", description="testtest")
+        play2 = Play.objects.create(title="test2", description="testtest")
+        play1.actors.add(actor1, actor2)
+        play2.actors.add(actor1)
+        actors = f"{actor1.id},{actor2.id},{actor1.id}"
+
+        any_response = self.client.get(PLAY_URL, {"actors": actors})
+        all_response = self.client.get(
+            PLAY_URL, {"actors": actors, "match": "all"}
+        )
+
+        self.assertEqual(
+            [result["id"] for result in any_response.data["results"]],
+            [play1.id, play2.id]
+        )
+        self.assertEqual(
+            [result["id"] for result in all_response.data["results"]],
+            [play1.id]
+        )
+
+    def test_filter_invalid_params(self):
+        for params in (
+                {"actors": "1,x"},
+                {"actors": "abc"},
+                {"genres": "0"},
+                {"genres": "1,,2"},
+                {"actors": "1", "match": "some"},
+        ):
+            response = self.client.get(PLAY_URL, params)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+            self.assertEqual(len(response.data), 1, params)
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_list_sparse_fields(self):
+        play = Play.objects.create(title="test", description="testtest")
+        play.genres.add(Genre.objects.create(name="drama"))
+
+        with without_throttling(), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get(PLAY_URL, {"fields": "id,title"})
+
+        self.assertEqual(
+            response.data["results"], [{"id": play.id, "title": "test"}]
+        )
+        self.assertEqual(len(context), 1)
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_list_expand(self):
+        genre = Genre.objects.create(name="drama")
+        play = Play.objects.create(title="test", description="testtest")
+        play.genres.add(genre)
+
+        with without_throttling(), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                PLAY_URL, {"fields": "title", "expand": "genres"}
+            )
+
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "title": "test",
+                    "genres": [{"id": genre.id, "name": "drama"}],
+                }
+            ]
+        )
+        # Page and genres, actors are not loaded
+        self.assertEqual(len(context), 2)
+
+    def test_search(self):
+        hamlet = Play.objects.create(
+            title="Hamlet",
+            description="The prince of Denmark"
+        )
+        macbeth = Play.objects.create(title="Macbeth", description="Scots")
+        Play.objects.create(title="Cats", description="A musical")
+        macbeth.genres.add(Genre.objects.create(name="Tragedy"))
+        macbeth.actors.add(sample_actor(last_name="McKellen"))
+
+        for search, play in (
+                ("hamlet", hamlet),
+                ("denmark", hamlet),
+                ("tragedy", macbeth),
+                ("mckellen", macbeth),
+                ("macbeth tragedy", macbeth),
+        ):
+            response = self.client.get(PLAY_URL, {"search": search})
+
+            self.assertEqual(
+                [result["id"] for result in response.data["results"]],
+                [play.id],
+                search
+            )
+
+    def test_search_ordered_by_relevance(self):
+        in_description = Play.objects.create(
+            title="Another play",
+            description="Set in Denmark"
+        )
+        in_title = Play.objects.create(title="Denmark", description="")
+
+        response = self.client.get(PLAY_URL, {"search": "denmark"})
+
+        self.assertEqual(
+            [result["id"] for result in response.data["results"]],
+            [in_title.id, in_description.id]
+        )
+
+    def test_search_paginated(self):
+        plays = [
+            Play.objects.create(title=f"Opera {index}", description="")
+            for index in range(5)
+        ]
+
+        found = []
+        response = self.client.get(
+            PLAY_URL, {"search": "opera", "page_size": 2}
+        )
+        while True:
+            found.extend(result["id"] for result in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(sorted(found), [play.id for play in plays])
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "Search vectors are only maintained on PostgreSQL"
+)
+class PlaySearchVectorTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        response = self.client.get(PLAY_URL, {"search": text})
+        return [result["id"] for result in response.data["results"]]
+
+    def test_search_typo(self):
+        play = Play.objects.create(title="Hamlet", description="")
+
+        self.assertEqual(self.search("hamlett"), [play.id])
+
+    def test_vector_follows_relations(self):
+        play = Play.objects.create(title="Hamlet", description="")
+        actor = sample_actor(last_name="Olivier")
+        genre = Genre.objects.create(name="Tragedy")
+
+        play.actors.add(actor)
+        genre.play_set.add(play)
+        self.assertEqual(self.search("olivier tragedy"), [play.id])
+
+        actor.last_name = "Branagh"
+        actor.save()
+        self.assertEqual(self.search("olivier"), [])
+        self.assertEqual(self.search("branagh"), [play.id])
+
+        genre.play_set.clear()
+        self.assertEqual(self.search("tragedy"), [])
+
+        actor.delete()
+        self.assertEqual(self.search("branagh"), [])
 
 
 class AdminPlayViewSetTests(TestCase):
@@ -200,3 +405,73 @@ class AdminPlayViewSetTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Play.objects.filter(title="test").exists())
+
+
+class PlayQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.genre = Genre.objects.create(name="test")
+        self.actor = sample_actor()
+
+    def seed(self, count):
+        plays = Play.objects.bulk_create(
+            Play(title="test", description="testtest") for _ in range(count)
+        )
+        Play.genres.through.objects.bulk_create(
+            Play.genres.through(play=play, genre=self.genre) for play in plays
+        )
+        Play.actors.through.objects.bulk_create(
+            Play.actors.through(play=play, actor=self.actor) for play in plays
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            3, lambda: self.client.get(PLAY_URL), self.seed
+        )
+
+    def test_filtered_list_budget(self):
+        self.assertQueryBudget(
+            3,
+            lambda: self.client.get(
+                PLAY_URL,
+                {
+                    "genres": self.genre.id,
+                    "actors": self.actor.id,
+                    "match": "all"
+                }
+            ),
+            self.seed
+        )
+
+    def test_retrieve_budget(self):
+        self.seed(1)
+        play = Play.objects.first()
+
+        self.assertQueryBudget(
+            3,
+            lambda: self.client.get(
+                reverse("theatre:play-detail", args=[play.id])
+            ),
+            self.seed
+        )
+
+    def test_create_budget(self):
+        self.assertQueryBudget(
+            11,
+            lambda: self.client.post(
+                PLAY_URL,
+                {
+                    "title": "test",
+                    "description": "testtest",
+                    "actors": self.actor.id,
+                    "genres": self.genre.id
+                }
+            ),
+            self.seed
+        )
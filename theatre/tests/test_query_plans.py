@@ -0,0 +1,207 @@
+import datetime
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from theatre.models import Actor, Genre, Play, Performance, Reservation
+from theatre.tests.test_theatre_hall_view_set import sample_theatre_hall
+
+PLAYS_COUNT = 2000
+PERFORMANCES_PER_PLAY = 5
+RESERVATIONS_COUNT = 5000
+FILTER_PLAYS_COUNT = 50000
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "Query plans are only checked on PostgreSQL"
+)
+class ListQueryPlanTests(TestCase):
+    """Fail when a list query falls back to a sequential scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test12345"
+        )
+        theatre_hall = sample_theatre_hall()
+        plays = Play.objects.bulk_create(
+            Play(title=f"play {index}", description="testtest")
+            for index in range(PLAYS_COUNT)
+        )
+        cls.play = plays[0]
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+        Performance.objects.bulk_create(
+            Performance(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=start + datetime.timedelta(hours=index)
+            )
+            for index, play in enumerate(plays * PERFORMANCES_PER_PLAY)
+        )
+        Reservation.objects.bulk_create(
+            Reservation(user=cls.user if index % 100 == 0 else other_user)
+            for index in range(RESERVATIONS_COUNT)
+        )
+        with connection.cursor() as cursor:
+            for table in (
+                    "theatre_play",
+                    "theatre_performance",
+                    "theatre_reservation",
+            ):
+                cursor.execute(f"ANALYZE {table}")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNoSeqScan(self, url, params, table):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, params)
+
+        queries = [
+            query["sql"] for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and f'FROM "{table}"' in query["sql"]
+        ]
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(f"EXPLAIN {sql}")
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+
+    def test_performance_list_by_date(self):
+        self.assertNoSeqScan(
+            reverse("theatre:performance-list"),
+            {"date": "2024-03-29"},
+            "theatre_performance"
+        )
+
+    def test_performance_list_by_play(self):
+        self.assertNoSeqScan(
+            reverse("theatre:performance-list"),
+            {"play": self.play.id},
+            "theatre_performance"
+        )
+
+    def test_performance_list(self):
+        self.assertNoSeqScan(
+            reverse("theatre:performance-list"),
+            {},
+            "theatre_performance"
+        )
+
+    def test_play_list_by_title(self):
+        self.assertNoSeqScan(
+            reverse("theatre:play-list"),
+            {"title": "play 7"},
+            "theatre_play"
+        )
+
+    def test_reservation_list(self):
+        self.assertNoSeqScan(
+            reverse("theatre:reservation-list"),
+            {},
+            "theatre_reservation"
+        )
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "Query plans are only checked on PostgreSQL"
+)
+class PlayFilterQueryPlanTests(TestCase):
+    """Genre and actor filters are semi-joins, never join + DISTINCT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        genres = Genre.objects.bulk_create(
+            Genre(name=f"genre {index}") for index in range(20)
+        )
+        actors = Actor.objects.bulk_create(
+            Actor(first_name="actor", last_name=str(index))
+            for index in range(500)
+        )
+        plays = Play.objects.bulk_create(
+            (
+                Play(title=f"play {index}", description="testtest")
+                for index in range(FILTER_PLAYS_COUNT)
+            ),
+            batch_size=5000
+        )
+        Play.genres.through.objects.bulk_create(
+            (
+                Play.genres.through(
+                    play_id=play.id,
+                    genre_id=genres[(index + offset) % len(genres)].id
+                )
+                for index, play in enumerate(plays)
+                for offset in range(2)
+            ),
+            batch_size=5000
+        )
+        Play.actors.through.objects.bulk_create(
+            (
+                Play.actors.through(
+                    play_id=play.id,
+                    actor_id=actors[(index + offset) % len(actors)].id
+                )
+                for index, play in enumerate(plays)
+                for offset in range(4)
+            ),
+            batch_size=5000
+        )
+        cls.params = {
+            "genres": ",".join(str(genre.id) for genre in genres[:5]),
+            "actors": ",".join(str(actor.id) for actor in actors[:3]),
+        }
+        with connection.cursor() as cursor:
+            for table in (
+                    "theatre_play",
+                    "theatre_play_genres",
+                    "theatre_play_actors",
+            ):
+                cursor.execute(f"ANALYZE {table}")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertSemiJoinPlan(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("theatre:play-list"), params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"])
+        # Page, genres and actors prefetch
+        self.assertEqual(len(context), 3)
+        sql = context.captured_queries[0]["sql"]
+        self.assertNotIn("DISTINCT", sql)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = [row[0] for row in cursor.fetchall()]
+        # The page is not deduplicated under the limit
+        for node in plan[:2]:
+            self.assertNotIn("Unique", node, "\n".join(plan))
+            self.assertNotIn("Aggregate", node, "\n".join(plan))
+
+    def test_combined_filters_any(self):
+        self.assertSemiJoinPlan(self.params)
+
+    def test_combined_filters_all(self):
+        self.assertSemiJoinPlan({**self.params, "match": "all"})
@@ -1,12 +1,21 @@
 import datetime
+import threading
+import unittest
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
 
 from theatre.models import Play, Performance, Ticket, Reservation
+from theatre.serializers import ReservationSerializer
+from theatre.tests.query_budget import QueryBudgetTestCase
+from theatre.tests.test_seat_hold_view_set import sample_performance
 from theatre.tests.test_theatre_hall_view_set import sample_theatre_hall
 
 RESERVATION_URL = reverse("theatre:reservation-list")
@@ -60,3 +69,453 @@ class AuthenticatedReservationViewSetTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Ticket.objects.all().exists())
         self.assertEqual(Reservation.objects.get(id=1).user, self.user)
+
+    def test_create_reservation_updates_seat_map(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time=datetime.datetime.now()
+        )
+        reservation_data = {
+            "tickets": [
+                {"seat": 2, "row": 1, "performance": performance.id},
+                {"seat": 5, "row": 3, "performance": performance.id},
+            ]
+        }
+
+        self.client.post(RESERVATION_URL, reservation_data, format="json")
+        performance.refresh_from_db()
+
+        self.assertEqual(
+            list(performance.seats.taken()), [(1, 2), (3, 5)]
+        )
+
+    def test_create_reservation_taken_seat(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time=datetime.datetime.now()
+        )
+        reservation_data = {
+            "tickets": [{"seat": 1, "row": 1, "performance": performance.id}]
+        }
+
+        self.client.post(RESERVATION_URL, reservation_data, format="json")
+        response = self.client.post(
+            RESERVATION_URL,
+            reservation_data,
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_delete_ticket_releases_seat(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time=datetime.datetime.now()
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=2, seat=3, performance=performance, reservation=reservation
+        )
+        performance.refresh_from_db()
+        self.assertTrue(performance.seats.is_taken(2, 3))
+
+        reservation.delete()
+        performance.refresh_from_db()
+
+        self.assertFalse(performance.seats.is_taken(2, 3))
+
+    def test_move_ticket_moves_seat(self):
+        first, second = sample_performance(), sample_performance()
+        ticket = Ticket.objects.create(
+            row=1, seat=1,
+            performance=first,
+            reservation=Reservation.objects.create(user=self.user)
+        )
+
+        ticket.seat = 2
+        ticket.save()
+        ticket.performance = second
+        ticket.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        self.assertEqual(first.tickets_sold, 0)
+        self.assertEqual(first.seats.taken_count(), 0)
+        self.assertEqual(second.tickets_sold, 1)
+        self.assertEqual(list(second.seats.taken()), [(1, 2)])
+
+    def test_move_ticket_to_taken_seat(self):
+        performance = sample_performance()
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=1, seat=1, performance=performance, reservation=reservation
+        )
+        ticket = Ticket.objects.create(
+            row=1, seat=2, performance=performance, reservation=reservation
+        )
+
+        ticket.seat = 1
+        with self.assertRaises(DjangoValidationError):
+            ticket.save()
+        performance.refresh_from_db()
+
+        self.assertEqual(performance.tickets_sold, 2)
+        self.assertEqual(
+            list(performance.seats.taken()), [(1, 1), (1, 2)]
+        )
+
+    def test_delete_tickets_releases_seats_in_one_write(self):
+        theatre_hall = sample_theatre_hall()
+        performances = [
+            sample_performance(theatre_hall=theatre_hall) for _ in range(2)
+        ]
+        queries = []
+        for seats_count in (1, 10):
+            reservation = Reservation.objects.create(user=self.user)
+            for seat in range(seats_count):
+                Ticket.objects.create(
+                    row=seat // 5 + 1,
+                    seat=seat % 5 + 1,
+                    performance=performances[seat % 2],
+                    reservation=reservation
+                )
+
+            with CaptureQueriesContext(connection) as context:
+                reservation.delete()
+            queries.append(len(context.captured_queries))
+
+            for performance in performances:
+                performance.refresh_from_db()
+                self.assertEqual(performance.tickets_sold, 0)
+                self.assertEqual(performance.seats.taken_count(), 0)
+        # The second delete writes both performances, the first only one
+        self.assertEqual(queries[1], queries[0] + 1)
+
+    def test_delete_performance_skips_seat_release(self):
+        performance = sample_performance()
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in range(1, 6):
+            Ticket.objects.create(
+                row=1, seat=seat,
+                performance=performance, reservation=reservation
+            )
+
+        with CaptureQueriesContext(connection) as context:
+            performance.delete()
+
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(
+            any(
+                query["sql"].startswith('UPDATE "theatre_performance"')
+                for query in context.captured_queries
+            )
+        )
+
+    def test_create_reservation_duplicate_seats(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        performance = Performance.objects.create(
+            play=play,
+            theatre_hall=theatre_hall,
+            show_time=datetime.datetime.now()
+        )
+        ticket_data = {"seat": 1, "row": 1, "performance": performance.id}
+        reservation_data = {"tickets": [ticket_data, ticket_data]}
+
+        response = self.client.post(
+            RESERVATION_URL,
+            reservation_data,
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_create_reservation_performance_not_integer(self):
+        performance = sample_performance()
+
+        for performance_id in (True, performance.id + 0.9, "1.0"):
+            response = self.client.post(
+                RESERVATION_URL,
+                {"tickets": [
+                    {"seat": 1, "row": 1, "performance": performance_id}
+                ]},
+                format="json"
+            )
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST,
+                performance_id
+            )
+            self.assertEqual(
+                response.data["tickets"][0]["performance"][0].code,
+                "incorrect_type",
+                performance_id
+            )
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_create_reservation_performance_out_of_range(self):
+        sample_performance()
+
+        for performance_id in (2 ** 63, -2 ** 63 - 1, 10 ** 30):
+            response = self.client.post(
+                RESERVATION_URL,
+                {"tickets": [
+                    {"seat": 1, "row": 1, "performance": performance_id}
+                ]},
+                format="json"
+            )
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST,
+                performance_id
+            )
+            self.assertEqual(
+                response.data["tickets"][0]["performance"][0].code,
+                "does_not_exist",
+                performance_id
+            )
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_create_reservation_best_seats(self):
+        performance = sample_performance()
+        Performance.mark_seats([(performance.id, 3, 3)])
+
+        response = self.client.post(
+            RESERVATION_URL,
+            {"performance": performance.id, "quantity": 3, "strategy": "best"},
+            format="json"
+        )
+        performance.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [
+                (ticket["row"], ticket["seat"])
+                for ticket in response.data["tickets"]
+            ],
+            [(2, 2), (2, 3), (2, 4)]
+        )
+        self.assertEqual(performance.tickets_sold, 4)
+        self.assertEqual(
+            list(performance.seats.taken()), [(2, 2), (2, 3), (2, 4), (3, 3)]
+        )
+
+    def test_create_reservation_best_seats_sold_out(self):
+        performance = sample_performance()
+        Performance.mark_seats(
+            (performance.id, row, seat)
+            for row in range(1, 6)
+            for seat in (2, 4)
+        )
+
+        response = self.client.post(
+            RESERVATION_URL,
+            {"performance": performance.id, "quantity": 2},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("quantity", response.data)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_create_reservation_best_seats_invalid(self):
+        performance = sample_performance()
+        ticket_data = {"seat": 1, "row": 1, "performance": performance.id}
+
+        for reservation_data in (
+                {},
+                {"performance": performance.id},
+                {"performance": performance.id, "quantity": 6},
+                {"performance": performance.id, "quantity": 0},
+                {"performance": performance.id, "quantity": 1,
+                 "strategy": "worst"},
+                {"performance": performance.id, "quantity": 1,
+                 "tickets": [ticket_data]},
+        ):
+            response = self.client.post(
+                RESERVATION_URL, reservation_data, format="json"
+            )
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST,
+                reservation_data
+            )
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_validate_reservation_constant_queries(self):
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        theatre_hall = sample_theatre_hall()
+        performances = [
+            Performance.objects.create(
+                play=play,
+                theatre_hall=theatre_hall,
+                show_time=datetime.datetime.now()
+            )
+            for _ in range(2)
+        ]
+
+        for seats_count in (1, 10):
+            tickets = [
+                {
+                    "row": seat // 5 + 1,
+                    "seat": seat % 5 + 1,
+                    "performance": performances[seat % 2].id
+                }
+                for seat in range(seats_count)
+            ]
+            serializer = ReservationSerializer(data={"tickets": tickets})
+
+            # Expired holds of the performances, then the performances
+            with self.assertNumQueries(2):
+                self.assertTrue(serializer.is_valid())
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "SQLite rejects concurrent writers with \"table is locked\""
+)
+class ConcurrentBestSeatsTests(TransactionTestCase):
+    def test_no_double_allocation(self):
+        performance = sample_performance()
+        users = [
+            get_user_model().objects.create_user(
+                email=f"test{index}@test.com",
+                password="test12345"
+            )
+            for index in range(8)
+        ]
+        barrier = threading.Barrier(len(users))
+        reservations = []
+        rejected = []
+
+        def reserve(user):
+            try:
+                serializer = ReservationSerializer(
+                    data={"performance": performance.id, "quantity": 3}
+                )
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                reservations.append(serializer.save(user=user))
+            except (ValidationError, IntegrityError) as error:
+                rejected.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=reserve, args=(user,)) for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        performance.refresh_from_db()
+        seats = list(
+            Ticket.objects.filter(
+                performance=performance
+            ).values_list("row", "seat")
+        )
+
+        # The hall fits five blocks of three adjacent seats
+        self.assertEqual(len(reservations), 5)
+        self.assertEqual(len(rejected), len(users) - 5)
+        self.assertEqual(len(seats), 15)
+        self.assertEqual(len(seats), len(set(seats)))
+        self.assertEqual(performance.tickets_sold, len(seats))
+        self.assertEqual(sorted(performance.seats.taken()), sorted(seats))
+
+
+class ReservationQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+        play = Play.objects.create(
+            title="test",
+            description="testtest"
+        )
+        self.performance = Performance.objects.create(
+            play=play,
+            theatre_hall=sample_theatre_hall(rows=50, seats_in_row=50),
+            show_time=datetime.datetime.now(datetime.UTC)
+        )
+        self.seats = (
+            (row, seat) for row in range(1, 51) for seat in range(1, 51)
+        )
+
+    def seed(self, count):
+        reservations = Reservation.objects.bulk_create(
+            Reservation(user=self.user) for _ in range(count)
+        )
+        tickets = []
+        for reservation in reservations:
+            row, seat = next(self.seats)
+            tickets.append(
+                Ticket(
+                    row=row,
+                    seat=seat,
+                    performance=self.performance,
+                    reservation=reservation
+                )
+            )
+        Ticket.objects.bulk_create(tickets)
+        Performance.mark_seats(
+            (ticket.performance_id, ticket.row, ticket.seat)
+            for ticket in tickets
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            5, lambda: self.client.get(RESERVATION_URL), self.seed
+        )
+
+    def test_create_budget(self):
+        def create_reservation():
+            tickets = []
+            for _ in range(10):
+                row, seat = next(self.seats)
+                tickets.append(
+                    {
+                        "row": row,
+                        "seat": seat,
+                        "performance": self.performance.id
+                    }
+                )
+            return self.client.post(
+                RESERVATION_URL,
+                {"tickets": tickets},
+                format="json"
+            )
+
+        self.assertQueryBudget(12, create_reservation, self.seed)
@@ -0,0 +1,365 @@
+import datetime
+import threading
+import unittest
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from theatre.models import Play, Performance, SeatHold, Ticket
+from theatre.tests.query_budget import QueryBudgetTestCase
+from theatre.tests.test_theatre_hall_view_set import sample_theatre_hall
+
+HOLD_URL = reverse("theatre:seathold-list")
+RESERVATION_URL = reverse("theatre:reservation-list")
+
+
+def sample_performance(**params):
+    defaults = {
+        "play": Play.objects.create(title="test", description="testtest"),
+        "theatre_hall": sample_theatre_hall(),
+        "show_time": timezone.now(),
+    }
+    defaults.update(params)
+
+    return Performance.objects.create(**defaults)
+
+
+def performance_holds_url(performance_id):
+    return reverse("theatre:performance-holds", args=[performance_id])
+
+
+class UnauthenticatedSeatHoldViewSetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        performance = sample_performance()
+
+        response = self.client.post(
+            performance_holds_url(performance.id),
+            {"seats": [{"row": 1, "seat": 1}]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedSeatHoldViewSetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def test_create_hold(self):
+        response = self.client.post(
+            performance_holds_url(self.performance.id),
+            {"seats": [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}]},
+            format="json"
+        )
+        self.performance.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.performance.seats_held, 2)
+        self.assertEqual(
+            list(self.performance.seats.taken()), [(1, 1), (1, 2)]
+        )
+
+    def test_held_seats_unavailable(self):
+        SeatHold.claim(self.performance.id, self.user, [(2, 2)], ValueError)
+
+        performance_list = self.client.get(
+            reverse("theatre:performance-list")
+        )
+        performance_detail = self.client.get(
+            reverse("theatre:performance-detail", args=[self.performance.id])
+        )
+
+        self.assertEqual(
+            performance_list.data["results"][0]["tickets_available"], 24
+        )
+        self.assertEqual(
+            performance_detail.data["taken_places"], [{"row": 2, "seat": 2}]
+        )
+
+    def test_create_hold_on_held_seat(self):
+        SeatHold.claim(self.performance.id, self.user, [(1, 1)], ValueError)
+
+        response = self.client.post(
+            performance_holds_url(self.performance.id),
+            {"seats": [{"row": 1, "seat": 1}]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_create_reservation_on_held_seat(self):
+        SeatHold.claim(self.performance.id, self.user, [(1, 1)], ValueError)
+
+        response = self.client.post(
+            RESERVATION_URL,
+            {"tickets": [
+                {"row": 1, "seat": 1, "performance": self.performance.id}
+            ]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reserve_hold(self):
+        hold = SeatHold.claim(
+            self.performance.id, self.user, [(3, 1), (3, 2)], ValueError
+        )
+
+        response = self.client.post(
+            reverse("theatre:seathold-reserve", args=[hold.id])
+        )
+        self.performance.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(
+            list(
+                Ticket.objects.filter(
+                    reservation__user=self.user
+                ).values_list("row", "seat")
+            ),
+            [(3, 1), (3, 2)]
+        )
+        self.assertEqual(self.performance.seats_held, 0)
+        self.assertEqual(self.performance.tickets_sold, 2)
+        self.assertEqual(
+            list(self.performance.seats.taken()), [(3, 1), (3, 2)]
+        )
+
+    def test_reserve_expired_hold(self):
+        hold = SeatHold.claim(
+            self.performance.id, self.user, [(1, 1)], ValueError
+        )
+        SeatHold.objects.filter(id=hold.id).update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        response = self.client.post(
+            reverse("theatre:seathold-reserve", args=[hold.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_release_expired_holds(self):
+        hold = SeatHold.claim(
+            self.performance.id, self.user, [(1, 1)], ValueError
+        )
+        SeatHold.claim(self.performance.id, self.user, [(1, 2)], ValueError)
+        SeatHold.objects.filter(id=hold.id).update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        call_command("release_expired_holds", stdout=StringIO())
+        self.performance.refresh_from_db()
+
+        self.assertEqual(SeatHold.objects.count(), 1)
+        self.assertEqual(self.performance.seats_held, 1)
+        self.assertEqual(list(self.performance.seats.taken()), [(1, 2)])
+
+    def test_expired_hold_seats_for_sale(self):
+        requests = [
+            {"seats": [{"row": 1, "seat": 1}]},
+            {"tickets": [{"row": 1, "seat": 1}]},
+            {"quantity": 5},
+        ]
+        for data in requests:
+            with self.subTest(data=data):
+                performance = sample_performance(
+                    theatre_hall=sample_theatre_hall(rows=1, seats_in_row=5)
+                )
+                hold = SeatHold.claim(
+                    performance.id,
+                    self.user,
+                    [(1, seat) for seat in range(1, 6)],
+                    ValueError
+                )
+                SeatHold.objects.filter(id=hold.id).update(
+                    expires_at=timezone.now() - datetime.timedelta(seconds=1)
+                )
+                if "seats" in data:
+                    url = performance_holds_url(performance.id)
+                else:
+                    url = RESERVATION_URL
+                    for ticket in data.get("tickets", [data]):
+                        ticket["performance"] = performance.id
+
+                response = self.client.post(url, data, format="json")
+                performance.refresh_from_db()
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_201_CREATED
+                )
+                self.assertFalse(SeatHold.objects.filter(id=hold.id).exists())
+                self.assertTrue(performance.seats.is_taken(1, 1))
+
+    def test_delete_hold(self):
+        hold = SeatHold.claim(
+            self.performance.id, self.user, [(1, 1)], ValueError
+        )
+
+        response = self.client.delete(
+            reverse("theatre:seathold-detail", args=[hold.id])
+        )
+        self.performance.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.performance.seats_held, 0)
+        self.assertFalse(self.performance.seats.is_taken(1, 1))
+
+    def test_release_swept_hold_keeps_new_holder_seat(self):
+        stale = SeatHold.claim(
+            self.performance.id, self.user, [(1, 1)], ValueError
+        )
+        SeatHold.objects.filter(id=stale.id).update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        other = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test12345"
+        )
+        SeatHold.claim(self.performance.id, other, [(1, 1)], ValueError)
+
+        stale.release()
+        self.performance.refresh_from_db()
+
+        self.assertEqual(SeatHold.objects.get().user, other)
+        self.assertEqual(self.performance.seats_held, 1)
+        self.assertTrue(self.performance.seats.is_taken(1, 1))
+
+    def test_release_reserved_hold_keeps_ticket_seat(self):
+        hold = SeatHold.claim(
+            self.performance.id, self.user, [(1, 1)], ValueError
+        )
+        hold.reserve(ValueError)
+
+        hold.release()
+        self.performance.refresh_from_db()
+
+        self.assertEqual(self.performance.tickets_sold, 1)
+        self.assertEqual(self.performance.seats_held, 0)
+        self.assertTrue(self.performance.seats.is_taken(1, 1))
+
+    def test_delete_user_releases_holds(self):
+        SeatHold.claim(self.performance.id, self.user, [(1, 1)], ValueError)
+
+        self.user.delete()
+        self.performance.refresh_from_db()
+
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(self.performance.seats_held, 0)
+        self.assertFalse(self.performance.seats.is_taken(1, 1))
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "SQLite rejects concurrent writers with \"table is locked\""
+)
+class ConcurrentSeatHoldTests(TransactionTestCase):
+    def test_no_double_holds(self):
+        performance = sample_performance()
+        users = [
+            get_user_model().objects.create_user(
+                email=f"test{index}@test.com",
+                password="test12345"
+            )
+            for index in range(8)
+        ]
+        barrier = threading.Barrier(len(users))
+        holds = []
+        rejected = []
+
+        def claim(user):
+            try:
+                barrier.wait()
+                holds.append(
+                    SeatHold.claim(
+                        performance.id,
+                        user,
+                        [(1, 1), (1, 2)],
+                        ValidationError
+                    )
+                )
+            except (ValidationError, IntegrityError) as error:
+                rejected.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=claim, args=(user,)) for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        performance.refresh_from_db()
+
+        self.assertEqual(len(holds), 1)
+        self.assertEqual(len(rejected), len(users) - 1)
+        self.assertEqual(SeatHold.objects.count(), 1)
+        self.assertEqual(performance.seats_held, 2)
+        self.assertEqual(performance.seats.taken_count(), 2)
+
+
+class SeatHoldQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance(
+            theatre_hall=sample_theatre_hall(rows=50, seats_in_row=50)
+        )
+        self.seats = (
+            (row, seat) for row in range(1, 51) for seat in range(1, 51)
+        )
+
+    def seed(self, count):
+        SeatHold.objects.bulk_create(
+            SeatHold(
+                performance=self.performance,
+                user=self.user,
+                seats=[],
+                expires_at=timezone.now() + datetime.timedelta(minutes=10)
+            )
+            for _ in range(count)
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            1, lambda: self.client.get(HOLD_URL), self.seed
+        )
+
+    def test_create_budget(self):
+        def create_hold():
+            seats = [
+                {"row": row, "seat": seat}
+                for row, seat in (next(self.seats) for _ in range(10))
+            ]
+            return self.client.post(
+                performance_holds_url(self.performance.id),
+                {"seats": seats},
+                format="json"
+            )
+
+        self.assertQueryBudget(10, create_hold, self.seed)
@@ -0,0 +1,274 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from theatre.models import Play, Task
+from theatre.task_queue import claim, enqueue, enqueue_on_commit, run, task
+from theatre.tests.test_play_images import sample_image, upload_image_url
+from theatre.tests.test_seat_hold_view_set import sample_performance
+
+RESERVATION_URL = reverse("theatre:reservation-list")
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task
+def fail():
+    raise RuntimeError("Task failure")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                enqueue_on_commit(record, value=1)
+                self.assertFalse(Task.objects.exists())
+
+        self.assertEqual(
+            list(Task.objects.values_list("name", "kwargs")),
+            [(record.task_name, {"value": 1})],
+        )
+
+    def test_rolled_back_work_enqueues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    enqueue_on_commit(record, value=1)
+                    raise RuntimeError
+
+        self.assertFalse(Task.objects.exists())
+
+    def test_claim_batches_due_tasks_oldest_first(self):
+        now = timezone.now()
+        first = enqueue(record, run_at=now - datetime.timedelta(1), value=1)
+        second = enqueue(record, value=2)
+        enqueue(record, run_at=now + datetime.timedelta(1), value=3)
+
+        claimed = claim(batch_size=5)
+
+        self.assertEqual([task.id for task in claimed], [first.id, second.id])
+        self.assertEqual([task.attempts for task in claimed], [1, 1])
+        # Hidden from other workers for the lease
+        self.assertEqual(claim(batch_size=5), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue(record, value=1)
+        claim()
+
+        with mock.patch(
+                "django.utils.timezone.now",
+                return_value=timezone.now() + datetime.timedelta(minutes=6),
+        ):
+            claimed = claim()
+
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_claim_by_name(self):
+        enqueue(fail)
+        recorded = enqueue(record, value=1)
+
+        claimed = claim(batch_size=5, names=[record.task_name])
+
+        self.assertEqual([task.id for task in claimed], [recorded.id])
+
+    def test_run_deletes_finished_tasks(self):
+        enqueue(record, value=1)
+
+        self.assertTrue(run(claim()[0]))
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(
+        TASK_RETRY_DELAY=datetime.timedelta(seconds=10),
+        TASK_RETRY_MAX_DELAY=datetime.timedelta(seconds=30),
+    )
+    def test_failures_are_retried_with_backoff(self):
+        enqueue(fail, max_attempts=5)
+        delays = []
+
+        for attempt in range(3):
+            claimed = Task.objects.get()
+            claimed.attempts = attempt + 1
+            with self.assertLogs("theatre.task_queue", "WARNING"):
+                self.assertFalse(run(claimed))
+            retried = Task.objects.get()
+            delays.append(
+                round((retried.run_at - timezone.now()).total_seconds())
+            )
+
+        self.assertEqual(delays, [10, 20, 30])
+        self.assertIn("Task failure", retried.last_error)
+        self.assertIsNone(retried.failed_at)
+
+    def test_failed_after_max_attempts(self):
+        enqueue(fail, max_attempts=1)
+
+        with self.assertLogs("theatre.task_queue", "ERROR"):
+            run(claim()[0])
+        failed = Task.objects.get()
+
+        self.assertIsNotNone(failed.failed_at)
+        self.assertIn("RuntimeError", failed.last_error)
+        with mock.patch(
+                "django.utils.timezone.now",
+                return_value=timezone.now() + datetime.timedelta(days=1),
+        ):
+            self.assertEqual(claim(), [])
+
+    def test_unknown_task_fails(self):
+        Task.objects.create(name="theatre.tasks.removed", max_attempts=1)
+
+        with self.assertLogs("theatre.task_queue", "ERROR"):
+            self.assertFalse(run(claim()[0]))
+
+    def test_run_worker_once(self):
+        for value in range(3):
+            enqueue(record, value=value)
+        out = StringIO()
+
+        call_command("run_worker", batch_size=2, once=True, stdout=out)
+
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ["Ran 2 task(s), 0 failed", "Ran 1 task(s), 0 failed"],
+        )
+
+
+class EnqueuedWorkTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_reservation_confirmation(self):
+        performance = sample_performance()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {"row": 2, "seat": 3, "performance": performance.id}
+                    ]
+                },
+                format="json",
+            )
+        call_command("run_worker", once=True, stdout=StringIO())
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertIn("row 2, seat 3", mail.outbox[0].body)
+
+    def test_rejected_reservation_enqueues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                RESERVATION_URL,
+                {"tickets": [{"row": 1, "seat": 1, "performance": 0}]},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Task.objects.exists())
+
+    def test_uploaded_image_variants(self):
+        play = Play.objects.create(title="test", description="test")
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    upload_image_url(play.id),
+                    {"image": sample_image()},
+                    format="multipart",
+                )
+            call_command("run_worker", once=True, stdout=StringIO())
+        play.refresh_from_db()
+
+        self.assertEqual(
+            list(play.image_variants), ["thumbnail", "card", "full"]
+        )
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "SKIP LOCKED is only used on PostgreSQL"
+)
+class ConcurrentClaimTests(TransactionTestCase):
+    def test_workers_claim_disjoint_tasks(self):
+        Task.objects.bulk_create(
+            Task(name=record.task_name, max_attempts=1) for _ in range(200)
+        )
+        claimed = []
+        barrier = threading.Barrier(4)
+
+        def work():
+            try:
+                barrier.wait()
+                while tasks := claim(batch_size=7):
+                    claimed.extend(task.id for task in tasks)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(claimed), 200)
+        self.assertEqual(len(set(claimed)), 200)
+
+
+class BenchTasksCommandTests(TestCase):
+    def test_bench_tasks_runs_every_task_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+
+            call_command(
+                "bench_tasks",
+                tasks=20,
+                batch_sizes="1,5",
+                output=output,
+                stdout=StringIO(),
+            )
+
+            with open(output) as bench:
+                results = json.load(bench)
+
+        self.assertFalse(Task.objects.exists())
+        self.assertGreater(results["enqueue"]["tasks_per_second"], 0)
+        self.assertEqual(sorted(results["claim"]), ["1", "5"])
+        for batch_size, summary in results["claim"].items():
+            self.assertEqual(summary["ran"], 20, batch_size)
+            self.assertEqual(summary["duplicates"], 0, batch_size)
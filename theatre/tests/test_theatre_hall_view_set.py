@@ -1,11 +1,19 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from theatre.models import TheatreHall
+from theatre.models import (
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
 from theatre.serializers import TheatreHallSerializer
+from theatre.tests.query_budget import QueryBudgetTestCase
 
 THEATRE_URL = reverse("theatre:theatrehall-list")
 
@@ -88,3 +96,87 @@ class AdminTheatreHallViewSetTests(TestCase):
         self.assertTrue(
             TheatreHall.objects.filter(name=response.data["name"]).exists()
         )
+
+    def sample_ticket(self, theatre_hall, row, seat):
+        performance = Performance.objects.create(
+            play=Play.objects.create(title="test", description="testtest"),
+            theatre_hall=theatre_hall,
+            show_time=timezone.now()
+        )
+        return Ticket.objects.create(
+            row=row,
+            seat=seat,
+            performance=performance,
+            reservation=Reservation.objects.create(user=self.user)
+        )
+
+    def test_resize_theatre_hall_rebuilds_seat_maps(self):
+        theatre_hall = sample_theatre_hall()
+        ticket = self.sample_ticket(theatre_hall, 2, 3)
+
+        response = self.client.patch(
+            reverse("theatre:theatrehall-detail", args=[theatre_hall.id]),
+            {"seats_in_row": 8}
+        )
+        performance = Performance.objects.get(id=ticket.performance_id)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(performance.seats.seats_in_row, 8)
+        self.assertEqual(list(performance.seats.taken()), [(2, 3)])
+        self.assertEqual(performance.tickets_sold, 1)
+
+    def test_shrink_theatre_hall_below_tickets(self):
+        theatre_hall = sample_theatre_hall()
+        self.sample_ticket(theatre_hall, 5, 1)
+
+        response = self.client.patch(
+            reverse("theatre:theatrehall-detail", args=[theatre_hall.id]),
+            {"rows": 4}
+        )
+        theatre_hall.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(theatre_hall.rows, 5)
+
+
+class TheatreHallQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def seed(count):
+        TheatreHall.objects.bulk_create(
+            TheatreHall(name="test", rows=5, seats_in_row=5)
+            for _ in range(count)
+        )
+
+    def test_list_budget(self):
+        self.assertQueryBudget(
+            1, lambda: self.client.get(THEATRE_URL), self.seed
+        )
+
+    def test_retrieve_budget(self):
+        theatre_hall = sample_theatre_hall()
+
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(
+                reverse("theatre:theatrehall-detail", args=[theatre_hall.id])
+            ),
+            self.seed
+        )
+
+    def test_create_budget(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.post(
+                THEATRE_URL, {"name": "test", "rows": 5, "seats_in_row": 5}
+            ),
+            self.seed
+        )
@@ -0,0 +1,199 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+
+from theatre.models import ThrottleBucket
+from theatre.tests.test_seat_hold_view_set import sample_performance
+from theatre.throttling import (
+    AnonSlidingWindowThrottle,
+    UserSlidingWindowThrottle,
+)
+
+RESERVATION_URL = reverse("theatre:reservation-list")
+TOKEN_URL = reverse("user:token_obtain_pair")
+
+
+class ThreePerMinuteThrottle(UserSlidingWindowThrottle):
+    rate = "3/minute"
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        self.request = Request(RequestFactory().get("/"))
+        self.request.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+
+    def allow(self, now, throttle_class=ThreePerMinuteThrottle):
+        """Check with a new throttle, like another worker process would."""
+        throttle = throttle_class()
+        throttle.timer = lambda: now
+        return throttle.allow_request(self.request, None), throttle
+
+    def test_limit_is_shared_by_throttle_instances(self):
+        # 6 second buckets, 996 starts one
+        for now in (996, 1000, 1005):
+            self.assertTrue(self.allow(now)[0])
+
+        allowed, throttle = self.allow(1009)
+
+        self.assertFalse(allowed)
+        self.assertEqual(throttle.wait(), 5)
+
+    def test_window_slides_by_buckets(self):
+        self.allow(996)
+        self.allow(1001)
+        self.allow(1026)
+
+        self.assertFalse(self.allow(1055)[0])
+        # The bucket of the first two requests left the window, the
+        # rejected request still counts
+        self.assertTrue(self.allow(1056)[0])
+        self.assertFalse(self.allow(1057)[0])
+
+    def test_rejected_requests_count(self):
+        for now in range(996, 1001):
+            self.allow(now)
+
+        self.assertEqual(
+            ThrottleBucket.objects.get(
+                key=f"throttle_user_{self.request.user.pk}"
+            ).count,
+            5,
+        )
+
+    def test_new_bucket_keeps_expired_buckets(self):
+        self.allow(1000)
+        other = Request(RequestFactory().get("/"))
+        other.user = get_user_model()(pk=self.request.user.pk + 1)
+        throttle = ThreePerMinuteThrottle()
+        throttle.timer = lambda: 1100
+
+        with self.assertNumQueries(1):
+            throttle.allow_request(other, None)
+
+        self.assertEqual(ThrottleBucket.objects.count(), 2)
+
+    def test_purge_throttle_buckets(self):
+        self.allow(1000)
+        ThrottleBucket.objects.create(
+            key="throttle_user_0", bucket=0, expires_at=2 ** 40
+        )
+
+        call_command("purge_throttle_buckets", stdout=StringIO())
+
+        self.assertEqual(
+            list(ThrottleBucket.objects.values_list("key", flat=True)),
+            ["throttle_user_0"],
+        )
+
+    def test_anonymous_requests_are_counted_by_address(self):
+        self.request.user = None
+        self.request._request.META["REMOTE_ADDR"] = "10.0.0.1"
+
+        self.allow(1000, AnonSlidingWindowThrottle)
+
+        self.assertTrue(
+            ThrottleBucket.objects.filter(
+                key="throttle_anon_10.0.0.1"
+            ).exists()
+        )
+
+
+@mock.patch.dict(
+    SimpleRateThrottle.THROTTLE_RATES,
+    {"reservation-create": "2/minute", "token": "2/minute"},
+)
+class ScopedThrottleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+
+    def test_reservation_create_scope(self):
+        self.client.force_authenticate(self.user)
+        performance = sample_performance()
+
+        statuses = [
+            self.client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {
+                            "row": 1,
+                            "seat": seat,
+                            "performance": performance.id,
+                        }
+                    ]
+                },
+                format="json",
+            ).status_code
+            for seat in (1, 2, 3)
+        ]
+        response = self.client.get(RESERVATION_URL)
+
+        self.assertEqual(
+            statuses,
+            [
+                status.HTTP_201_CREATED,
+                status.HTTP_201_CREATED,
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_scope(self):
+        credentials = {"email": self.user.email, "password": "test12345"}
+
+        responses = [
+            self.client.post(TOKEN_URL, credentials) for _ in range(3)
+        ]
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [
+                status.HTTP_200_OK,
+                status.HTTP_200_OK,
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            ],
+        )
+        self.assertIn("Retry-After", responses[2])
+
+
+class BenchThrottleCommandTests(TestCase):
+    def test_bench_throttle_reports_both_backends(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+
+            call_command(
+                "bench_throttle",
+                checks=20,
+                clients=3,
+                output=output,
+                stdout=StringIO(),
+            )
+
+            with open(output) as bench:
+                results = json.load(bench)
+
+        self.assertFalse(ThrottleBucket.objects.exists())
+        self.assertEqual(
+            sorted(results["backends"]), ["cache", "database"]
+        )
+        for name, summary in results["backends"].items():
+            self.assertEqual(summary["allowed"], 20, name)
+            self.assertLessEqual(summary["p50_us"], summary["p99_us"], name)
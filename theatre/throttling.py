@@ -0,0 +1,55 @@
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+from theatre.models import ThrottleBucket
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle counting requests in ThrottleBucket rows instead of
+    a timestamp list in the cache, so the limit holds across worker
+    processes and nodes. The window is approximated by `buckets` fixed
+    sub-windows, each check is one upsert. Rejected requests are counted
+    too: a client retrying past its limit stays throttled.
+    """
+
+    buckets = 10
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.count = ThrottleBucket.hit(
+            self.key, self.now, self.duration, self.buckets
+        )
+        if self.count > self.num_requests:
+            return self.throttle_failure()
+        return True
+
+    def wait(self):
+        """Seconds until the oldest sub-window leaves the window."""
+        width = self.duration / self.buckets
+        return width - self.now % width
+
+
+class AnonSlidingWindowThrottle(AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class ScopedSlidingWindowThrottle(
+    ScopedRateThrottle, SlidingWindowRateThrottle
+):
+    pass
@@ -8,6 +8,7 @@ from theatre.views import (
     PlayViewSet,
     PerformanceViewSet,
     ReservationViewSet,
+    SeatHoldViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -17,6 +18,7 @@ router.register("theatre_halls", TheatreHallViewSet)
 router.register("plays", PlayViewSet)
 router.register("performances", PerformanceViewSet)
 router.register("reservations", ReservationViewSet)
+router.register("holds", SeatHoldViewSet)
 
 urlpatterns = [path("", include(router.urls))]
 
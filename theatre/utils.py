@@ -0,0 +1,10 @@
+def batched(iterable, size):
+    """Yield lists of size items of iterable, the last one may be shorter."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,14 +1,30 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
-from django.db.models import F, Count
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q
+from django.utils import timezone
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from theatre.async_views import AsyncReadMixin
+from theatre.caching import CatalogCacheMixin
+from theatre.exports import (
+    CSVRenderer,
+    NDJSONRenderer,
+    TICKET_EXPORT_COLUMNS,
+    export_response,
+)
+from theatre.fast_lists import (
+    FastListMixin,
+    PerformanceRows,
+    PlayRows,
+    ReservationRows,
+)
 from theatre.models import (
     TheatreHall,
     Genre,
@@ -16,8 +32,15 @@ from theatre.models import (
     Play,
     Performance,
     Reservation,
+    SeatHold,
+    Ticket,
+)
+from theatre.paginations import (
+    PlaySetPagination,
+    PerformanceSetPagination,
+    ReservationSetPagination,
 )
-from theatre.paginations import ReservationSetPagination
+from theatre.search import search_plays
 from theatre.serializers import (
     TheatreHallSerializer,
     GenreSerializer,
@@ -30,48 +53,155 @@ from theatre.serializers import (
     PerformanceListSerializer,
     PerformanceDetailSerializer,
     ReservationListSerializer,
-    PlayImageSerializer
+    PlayImageSerializer,
+    SeatHoldSerializer,
 )
+from theatre.sparse_fields import SparseFieldsMixin
+from theatre.task_queue import enqueue_on_commit
+from theatre.tasks import process_play_image, send_reservation_confirmation
+
+
+class QueryParamMixin:
+    """Parse query parameters, answering malformed values with 400."""
 
+    def _query_param(self, name, parse, message):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return parse(value)
+        except ValueError:
+            raise ValidationError({name: message})
 
-class TheatreHallViewSet(viewsets.ModelViewSet):
+    @staticmethod
+    def _positive_int(value):
+        value = int(value)
+        if value < 1:
+            raise ValueError
+        return value
+
+
+class TheatreHallViewSet(
+    CatalogCacheMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     queryset = TheatreHall.objects.all()
     serializer_class = TheatreHallSerializer
+    cache_models = (TheatreHall,)
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(
+    CatalogCacheMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_models = (Genre,)
 
 
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(
+    CatalogCacheMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
+    cache_models = (Actor,)
 
 
-class PlayViewSet(viewsets.ModelViewSet):
-    queryset = Play.objects.prefetch_related("genres", "actors")
+class PlayViewSet(
+    CatalogCacheMixin,
+    SparseFieldsMixin,
+    FastListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Play.objects.prefetch_related("genres", "actors").defer(
+        "search_vector"
+    )
     serializer_class = PlaySerializer
+    pagination_class = PlaySetPagination
+    fast_rows_class = PlayRows
+    cache_models = (Play, Genre, Actor)
+    cache_query_params = (
+        "title",
+        "search",
+        "actors",
+        "genres",
+        "match",
+        "fields",
+        "expand",
+        "cursor",
+        "page_size",
+    )
+    cache_id_list_params = ("actors", "genres")
+    # Through table column of each id list filter
+    related_id_columns = {"actors": "actor_id", "genres": "genre_id"}
+    # Ordered like the related rows of PlayRows
+    field_requirements = {
+        "genres": {
+            "prefetch_related": (
+                Prefetch("genres", queryset=Genre.objects.order_by("id")),
+            ),
+        },
+        "actors": {
+            "prefetch_related": (
+                Prefetch("actors", queryset=Actor.objects.order_by("id")),
+            ),
+        },
+    }
 
     @staticmethod
     def _params_convert(query_string: str) -> list:
-        return [int(string_id) for string_id in query_string.split(",")]
+        ids = [int(string_id) for string_id in query_string.split(",")]
+        if any(pk < 1 for pk in ids):
+            raise ValueError
+        return ids
+
+    def _related_filter(self, name, match_all):
+        """
+        Semi-join on the through table instead of joining and
+        deduplicating: any id matches, or with match_all every id.
+        """
+        try:
+            ids = set(self._params_convert(self.request.query_params[name]))
+        except ValueError:
+            raise ValidationError(
+                {name: "Enter a comma-separated list of ids (ex. 2,5)."}
+            )
+
+        links = getattr(Play, name).through.objects.filter(
+            play_id=OuterRef("pk"),
+            **{f"{self.related_id_columns[name]}__in": ids}
+        )
+        if match_all:
+            links = links.values("play_id").annotate(
+                matched=Count("*")
+            ).filter(matched=len(ids))
+        return Exists(links)
 
     def get_queryset(self):
-        queryset = self.queryset
+        queryset = self.apply_field_requirements(self.queryset)
 
         if title := self.request.query_params.get("title"):
             queryset = queryset.filter(title=title)
 
-        if actors := self.request.query_params.get("actors"):
-            actors = self._params_convert(actors)
-            queryset = queryset.filter(actors__id__in=actors)
+        if search := self.request.query_params.get("search", "").strip():
+            queryset = search_plays(queryset, search)
+
+        match = self.request.query_params.get("match", "any")
+        if match not in ("any", "all"):
+            raise ValidationError({"match": "Enter either any or all."})
 
-        if genres := self.request.query_params.get("genres"):
-            genres = self._params_convert(genres)
-            queryset = queryset.filter(genres__id__in=genres)
+        for name in self.related_id_columns:
+            if self.request.query_params.get(name):
+                queryset = queryset.filter(
+                    self._related_filter(name, match_all=match == "all")
+                )
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -92,6 +222,7 @@ class PlayViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            enqueue_on_commit(process_play_image, play_id=play.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -108,38 +239,172 @@ class PlayViewSet(viewsets.ModelViewSet):
                 type={"type": "list", "items": {"type": "number"}},
                 description="Filter by actor id (ex. ?actors=2,5)",
             ),
+            OpenApiParameter(
+                "match",
+                type=OpenApiTypes.STR,
+                enum=["any", "all"],
+                description=(
+                    "Whether plays need any (default) or all of the "
+                    "genres and actors (ex. ?actors=2,5&match=all)"
+                ),
+            ),
             OpenApiParameter(
                 "title",
                 type=OpenApiTypes.STR,
                 description="Filter by play title (ex. ?title=drama)",
             ),
+            OpenApiParameter(
+                "search",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Search title, description, actors and genres, "
+                    "ordered by relevance (ex. ?search=hamlet)"
+                ),
+            ),
+            OpenApiParameter(
+                "fields",
+                type=OpenApiTypes.STR,
+                description="Only render these fields (ex. ?fields=id,title)",
+            ),
+            OpenApiParameter(
+                "expand",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Render genres or actors as objects "
+                    "(ex. ?expand=genres)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class PerformanceViewSet(viewsets.ModelViewSet):
-    queryset = Performance.objects.select_related("play", "theatre_hall")
+class PerformanceViewSet(
+    QueryParamMixin,
+    SparseFieldsMixin,
+    FastListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
+    # The seat change log is only read for ?since_version= deltas
+    queryset = Performance.objects.select_related(
+        "play", "theatre_hall"
+    ).defer("seat_changes")
     serializer_class = PerformanceSerializer
+    pagination_class = PerformanceSetPagination
+    fast_rows_class = PerformanceRows
+    field_requirements = {
+        "play_title": {"select_related": ("play",)},
+        "play": {
+            "select_related": ("play",),
+            "prefetch_related": ("play__genres", "play__actors"),
+        },
+        "theatre_hall": {"select_related": ("theatre_hall",)},
+        "theatre_hall_capacity": {"select_related": ("theatre_hall",)},
+        "taken_places": {"select_related": ("theatre_hall",)},
+        "tickets_available": {
+            "annotate": {
+                "tickets_available": (
+                    F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+                    - F("tickets_sold")
+                    - F("seats_held")
+                )
+            },
+        },
+    }
 
-    def get_queryset(self):
-        queryset = self.queryset.annotate(
-            tickets_available=(
-                F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
-                - Count("tickets")
-            )
+    @staticmethod
+    def _parse_date(value):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+    @staticmethod
+    def _day_start(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    @staticmethod
+    def _version(value):
+        value = int(value)
+        if value < 0:
+            raise ValueError
+        return value
+
+    def seat_map_format(self):
+        """Return the (?seatmap=, ?since_version=) of a retrieve."""
+        if self.action != "retrieve":
+            return "list", None
+
+        seatmap = self.request.query_params.get("seatmap") or "list"
+        if seatmap not in ("list", "bitset"):
+            raise ValidationError({"seatmap": "Enter either list or bitset."})
+
+        since_version = self._query_param(
+            "since_version",
+            self._version,
+            "Enter a seat map version (ex. ?since_version=12).",
         )
+        if since_version is not None and seatmap != "bitset":
+            raise ValidationError(
+                {"since_version": "Only available with ?seatmap=bitset."}
+            )
+        return seatmap, since_version
 
-        if date := self.request.query_params.get("date"):
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(show_time__date=date)
+    def get_queryset(self):
+        queryset = self.apply_field_requirements(self.queryset)
+
+        if self.seat_map_format()[1] is not None:
+            queryset = queryset.defer(None)
+
+        date_message = "Enter a date in YYYY-MM-DD format."
+        if date := self._query_param("date", self._parse_date, date_message):
+            queryset = queryset.filter(
+                show_time__gte=self._day_start(date),
+                show_time__lt=self._day_start(date + timedelta(days=1)),
+            )
 
-        if play_id := self.request.query_params.get("play"):
+        if play_id := self._query_param(
+                "play", self._positive_int, "Enter a play id (ex. ?play=2)."
+        ):
             queryset = queryset.filter(play_id=play_id)
 
+        if date_from := self._query_param(
+                "date_from", self._parse_date, date_message
+        ):
+            queryset = queryset.filter(
+                show_time__gte=self._day_start(date_from)
+            )
+
+        if date_to := self._query_param(
+                "date_to", self._parse_date, date_message
+        ):
+            queryset = queryset.filter(
+                show_time__lt=self._day_start(date_to + timedelta(days=1))
+            )
+
+        if adjacent_seats := self._query_param(
+                "adjacent_seats",
+                self._positive_int,
+                "Enter a positive integer."
+        ):
+            # A missing summary means nothing was ever taken
+            queryset = queryset.filter(
+                Q(max_free_run__gte=adjacent_seats)
+                | Q(
+                    max_free_run__isnull=True,
+                    theatre_hall__seats_in_row__gte=adjacent_seats
+                )
+            )
+
         return queryset
 
+    def get_serializer_context(self):
+        seatmap, since_version = self.seat_map_format()
+        return {
+            **super().get_serializer_context(),
+            "seatmap": seatmap,
+            "since_version": since_version,
+        }
+
     def get_serializer_class(self):
         if self.action == "list":
             return PerformanceListSerializer
@@ -147,8 +412,54 @@ class PerformanceViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return PerformanceDetailSerializer
 
+        if self.action == "holds":
+            return SeatHoldSerializer
+
         return self.serializer_class
 
+    @action(
+        methods=["POST"],
+        detail=True,
+        permission_classes=[IsAuthenticated]
+    )
+    def holds(self, request, pk=None):
+        performance = self.get_object()
+        if SeatHold.release_expired([performance.id]):
+            # Seats of expired holds are free for the seat map checks
+            performance.refresh_from_db(fields=["seat_map"])
+        serializer = self.get_serializer(
+            data=request.data,
+            context={
+                **self.get_serializer_context(),
+                "performance": performance
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(responses={200: OpenApiTypes.STR})
+    @action(
+        methods=["GET"],
+        detail=True,
+        permission_classes=[IsAdminUser],
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def manifest(self, request, pk=None):
+        """Stream every ticket of the performance (?format=csv|ndjson)"""
+        performance = self.get_object()
+        tickets = Ticket.objects.filter(
+            performance=performance
+        ).order_by("row", "seat")
+
+        return export_response(
+            request,
+            tickets,
+            TICKET_EXPORT_COLUMNS,
+            f"performance-{performance.id}-manifest"
+        )
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -164,13 +475,85 @@ class PerformanceViewSet(viewsets.ModelViewSet):
                         "(ex. ?date=2022-10-23)"
                 ),
             ),
+            OpenApiParameter(
+                "date_from",
+                type=OpenApiTypes.DATE,
+                description="Performances on or after the date",
+            ),
+            OpenApiParameter(
+                "date_to",
+                type=OpenApiTypes.DATE,
+                description="Performances on or before the date",
+            ),
+            OpenApiParameter(
+                "adjacent_seats",
+                type=OpenApiTypes.INT,
+                description=(
+                        "Only performances with a row having at least this "
+                        "many adjacent free seats (ex. ?adjacent_seats=4)"
+                ),
+            ),
+            OpenApiParameter(
+                "fields",
+                type=OpenApiTypes.STR,
+                description=(
+                        "Only render these fields "
+                        "(ex. ?fields=id,play_title,show_time)"
+                ),
+            ),
+            OpenApiParameter(
+                "expand",
+                type=OpenApiTypes.STR,
+                description=(
+                        "Render play or theatre_hall as objects "
+                        "(ex. ?expand=play)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "seatmap",
+                type=OpenApiTypes.STR,
+                enum=["list", "bitset"],
+                description=(
+                        "bitset renders taken_places as {encoding, version, "
+                        "rows, seats_in_row, bits}, bits being the base64 "
+                        "bitmap where seat index (row - 1) * seats_in_row "
+                        "+ seat - 1 is bit index % 8 of byte index // 8"
+                ),
+            ),
+            OpenApiParameter(
+                "since_version",
+                type=OpenApiTypes.INT,
+                description=(
+                        "With ?seatmap=bitset, only the seat indexes taken "
+                        "and released after this version ({encoding: "
+                        "delta, version, since_version, taken, released}), "
+                        "or the full bitset if the version is too old"
+                ),
+            ),
+            OpenApiParameter(
+                "fields",
+                type=OpenApiTypes.STR,
+                description=(
+                        "Only render these fields "
+                        "(ex. ?fields=taken_places)"
+                ),
+            ),
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class ReservationViewSet(
+    QueryParamMixin,
+    FastListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
@@ -181,6 +564,14 @@ class ReservationViewSet(
     serializer_class = ReservationSerializer
     pagination_class = ReservationSetPagination
     permission_classes = (IsAuthenticated,)
+    fast_rows_class = ReservationRows
+
+    @property
+    def throttle_scope(self):
+        """Creating reservations has its own, tighter rate."""
+        if self.action == "create":
+            return "reservation-create"
+        return None
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
@@ -193,3 +584,66 @@ class ReservationViewSet(
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "user",
+                type=OpenApiTypes.INT,
+                description="Filter by user id (ex. ?user=2)",
+            ),
+        ],
+        responses={200: OpenApiTypes.STR},
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        """Stream the tickets of all reservations (?format=csv|ndjson)"""
+        tickets = Ticket.objects.order_by("reservation_id", "id")
+
+        if user_id := self._query_param(
+                "user", self._positive_int, "Enter a user id (ex. ?user=2)."
+        ):
+            tickets = tickets.filter(reservation__user_id=user_id)
+
+        return export_response(
+            request, tickets, TICKET_EXPORT_COLUMNS, "reservations"
+        )
+
+
+class SeatHoldViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet
+):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        if self.action == "reserve":
+            return ReservationListSerializer
+
+        return self.serializer_class
+
+    def perform_destroy(self, instance):
+        instance.release()
+
+    @action(methods=["POST"], detail=True)
+    def reserve(self, request, pk=None):
+        hold = self.get_object()
+        reservation = hold.reserve(ValidationError)
+        enqueue_on_commit(
+            send_reservation_confirmation, reservation_id=reservation.id
+        )
+        serializer = self.get_serializer(reservation)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,23 @@
+from django.db import OperationalError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from theatre_api_service.postgresql_pool.pool import PoolTimeout
+
+# Seconds a client is asked to wait after the connection pool ran dry
+POOL_RETRY_AFTER = 1
+
+
+def exception_handler(exc, context):
+    """DRF exception handler answering pool exhaustion with 503"""
+    if isinstance(exc, OperationalError) and isinstance(
+            exc.__cause__, PoolTimeout
+    ):
+        return Response(
+            {"detail": "The service is busy, try again later."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(POOL_RETRY_AFTER)},
+        )
+
+    return drf_exception_handler(exc, context)
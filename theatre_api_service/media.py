@@ -0,0 +1,182 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import (
+    ImproperlyConfigured,
+    SuspiciousFileOperation,
+)
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# Uploaded names are content-unique (see theatre.models.play_image_path)
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte positions of a single Range header, None
+    to send the whole file when there is no range or it cannot be
+    honoured (malformed, several ranges). Raise ValueError when the range
+    lies beyond the file.
+    """
+    match = RANGE_PATTERN.match(header.replace(" ", "")) if header else None
+    if match is None or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last bytes of the file
+        if int(last) == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def read_file(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(MEDIA_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def aread_file(path, start, length):
+    """read_file() reading in worker threads, streamed without buffering."""
+    to_thread = sync_to_async(next, thread_sensitive=False)
+    chunks = read_file(path, start, length)
+    try:
+        while (chunk := await to_thread(chunks, None)) is not None:
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def stream_file(request, path, start, length):
+    """
+    Body iterator for the request's handler: ASGI buffers a sync
+    iterator before sending it, WSGI would buffer an async one.
+    """
+    if isinstance(request, ASGIRequest):
+        return aread_file(path, start, length)
+    return read_file(path, start, length)
+
+
+def _etag(file_stat):
+    """Same format as nginx, whichever server sends the file."""
+    return f'"{int(file_stat.st_mtime):x}-{file_stat.st_size:x}"'
+
+
+def _stream_response(request, path, file_stat):
+    size = file_stat.st_size
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if if_range is None or if_range in (
+            _etag(file_stat), http_date(file_stat.st_mtime)
+    ):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    if request.method == "HEAD":
+        response = HttpResponse()
+    else:
+        response = StreamingHttpResponse(
+            stream_file(request, path, start, length)
+        )
+    if byte_range is not None:
+        response.status_code = 206
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response.headers["Content-Length"] = length
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _accel_redirect_response(request, path, file_stat):
+    response = HttpResponse()
+    response.headers["X-Accel-Redirect"] = (
+        settings.MEDIA_ACCEL_REDIRECT_LOCATION.rstrip("/")
+        + "/"
+        + quote(os.path.relpath(path, settings.MEDIA_ROOT))
+    )
+    return response
+
+
+def _sendfile_response(request, path, file_stat):
+    response = HttpResponse()
+    response.headers["X-Sendfile"] = path
+    return response
+
+
+MEDIA_RESPONSES = {
+    "django": _stream_response,
+    "x-accel-redirect": _accel_redirect_response,
+    "x-sendfile": _sendfile_response,
+}
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file of MEDIA_ROOT, by the front server with
+    MEDIA_SERVING="x-accel-redirect" or "x-sendfile", otherwise streamed
+    from here with single byte ranges. Conditional requests are answered
+    here in every mode.
+    """
+    try:
+        make_response = MEDIA_RESPONSES[settings.MEDIA_SERVING]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"MEDIA_SERVING must be one of {', '.join(MEDIA_RESPONSES)}"
+        )
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+
+    etag = _etag(file_stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(file_stat.st_mtime)
+    )
+    if response is None:
+        response = make_response(request, full_path, file_stat)
+        if response.status_code != 416:
+            content_type, _ = mimetypes.guess_type(full_path)
+            response.headers["Content-Type"] = (
+                content_type or "application/octet-stream"
+            )
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(file_stat.st_mtime)
+    response.headers["Cache-Control"] = MEDIA_CACHE_CONTROL
+    return response
@@ -0,0 +1,94 @@
+from functools import partial
+
+import psycopg2
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from theatre_api_service.postgresql_pool.pool import close_pools, get_pool
+
+
+def check_connection(connection) -> bool:
+    """Ping a connection that has been idle for a while."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def reset_connection(connection) -> bool:
+    """Roll back leftovers of a request, False if it is not reusable."""
+    if connection.closed:
+        return False
+    try:
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class PooledDatabaseCreation(DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would block DROP DATABASE
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that borrows connections from a process-wide pool
+    configured by OPTIONS["pool"] (min_size, max_size, timeout, max_idle,
+    check_after) instead of opening one per request. Closing a connection
+    returns it to the pool.
+    """
+
+    creation_class = PooledDatabaseCreation
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    @property
+    def pool(self):
+        settings_dict = self.settings_dict
+        key = (
+            self.alias,
+            settings_dict["NAME"] or "postgres",
+            settings_dict["HOST"],
+            settings_dict["PORT"],
+            settings_dict["USER"],
+        )
+        return get_pool(
+            key,
+            {
+                "check": check_connection,
+                "reset": reset_connection,
+                **settings_dict["OPTIONS"].get("pool", {}),
+            },
+        )
+
+    def get_new_connection(self, conn_params):
+        # Kept so that the connection goes back to the pool it came from
+        self._pool = self.pool
+        connection = self._pool.acquire(
+            partial(super().get_new_connection, conn_params)
+        )
+        # Set by the parent when it opens a connection, reused ones need it
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.release(self.connection)
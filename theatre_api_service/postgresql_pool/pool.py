@@ -0,0 +1,224 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections. Connections are opened on
+    demand up to max_size, checked with check(connection) on checkout
+    when they have been idle for check_after seconds and closed after
+    max_idle seconds of idleness as long as more than min_size are open.
+    Checkout waits at most timeout seconds, 0 fails fast.
+    """
+
+    def __init__(
+            self,
+            check=None,
+            reset=None,
+            min_size=0,
+            max_size=10,
+            timeout=5.0,
+            max_idle=300.0,
+            check_after=30.0
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Pool sizes must satisfy 0 <= min <= max > 0")
+        self.check = check
+        self.reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+
+        self._condition = threading.Condition()
+        # (connection, returned at) pairs, the most recent on the right
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            "opened": 0,
+            "closed": 0,
+            "acquired": 0,
+            "timeouts": 0,
+            "failed_checks": 0,
+        }
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_sum_ms = 0.0
+
+    def acquire(self, connect):
+        """Return an idle connection or open one with connect()."""
+        while True:
+            connection, idle_since = self._checkout()
+            if connection is None:
+                return self._open(connect)
+
+            if (
+                self.check is None
+                or time.monotonic() - idle_since < self.check_after
+                or self.check(connection)
+            ):
+                return connection
+
+            with self._condition:
+                self._counters["failed_checks"] += 1
+            self._discard(connection)
+
+    def release(self, connection):
+        """Return a connection, closing it if it cannot be reused."""
+        reusable = not self._closed
+        if reusable and self.reset is not None:
+            reusable = self.reset(connection)
+        if not reusable:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            expired = self._pop_expired()
+            self._condition.notify()
+        for connection in expired:
+            self._discard(connection)
+
+    def close(self):
+        """Close idle connections, busy ones are closed on release."""
+        with self._condition:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self) -> dict:
+        with self._condition:
+            idle = len(self._idle)
+            buckets = {
+                f"le_{bound}": count
+                for bound, count in zip(WAIT_BUCKETS_MS, self._wait_buckets)
+            }
+            buckets["le_inf"] = self._wait_buckets[-1]
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "waiting": self._waiting,
+                **self._counters,
+                "wait_ms": {
+                    "buckets": buckets,
+                    "count": sum(self._wait_buckets),
+                    "sum": round(self._wait_sum_ms, 3),
+                },
+            }
+
+    def _checkout(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot, the connection is opened unlocked
+                    self._size += 1
+                    connection, idle_since = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection available within "
+                        f"{self.timeout}s ({self.max_size} in use)"
+                    )
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._counters["acquired"] += 1
+            waited_ms = (time.monotonic() - started) * 1000
+            self._wait_sum_ms += waited_ms
+            self._wait_buckets[
+                bisect.bisect_left(WAIT_BUCKETS_MS, waited_ms)
+            ] += 1
+        return connection, idle_since
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._counters["opened"] += 1
+        return connection
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._counters["closed"] += 1
+            self._condition.notify()
+
+    def _pop_expired(self):
+        expired = []
+        now = time.monotonic()
+        while (
+            self._idle
+            and self._size - len(expired) > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            expired.append(self._idle.popleft()[0])
+        return expired
+
+
+def get_pool(key, options) -> ConnectionPool:
+    """Return the process-wide pool for key, creating it from options."""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+def close_pools(dbname=None) -> None:
+    """Close and forget the pools of dbname, or all of them."""
+    with _pools_lock:
+        keys = [key for key in _pools if dbname in (None, key[1])]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+def get_pool_stats() -> dict:
+    """Return the stats of every pool of this process keyed by alias."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        f"{alias}:{dbname}": pool.stats()
+        for (alias, dbname, *_), pool in pools
+    }
@@ -24,9 +24,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-my!=jqvqxow-v$bqg@k(raif#p(uxsy4gyl8&x+gr9u1=b65ct'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "").lower() in ("1", "true", "yes")
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = os.environ.get(
+    "ALLOWED_HOSTS", "localhost,127.0.0.1"
+).split(",")
 
 
 # Application definition
@@ -38,9 +40,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
-    "debug_toolbar",
     "drf_spectacular",
     "theatre",
     "user",
@@ -48,15 +50,21 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    "theatre.middleware.RepeatedQueriesMiddleware",
 ]
 
+if DEBUG:
+    # Sync-only middleware, under ASGI it moves every request (including
+    # the async read views) onto a worker thread
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = 'theatre_api_service.urls'
 
 TEMPLATES = [
@@ -89,10 +97,38 @@ DATABASES = {
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["POSTGRES_HOST"],
-        "PORT": os.environ["POSTGRES_PORT"]
+        "PORT": os.environ["POSTGRES_PORT"],
+        # Persistent connections: seconds to keep a connection per worker
+        # thread, checked for health before it is reused
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+if os.environ.get("DB_POOL", "").lower() in ("1", "true", "yes"):
+    # Pooled connections: every request borrows a connection from a
+    # process-wide pool and returns it when the request finishes.
+    # DB_POOL_TIMEOUT=0 fails fast (HTTP 503) when the pool is exhausted.
+    DATABASES["default"].update(
+        {
+            "ENGINE": "theatre_api_service.postgresql_pool",
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+                    "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 20)),
+                    "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+                    "max_idle": float(
+                        os.environ.get("DB_POOL_MAX_IDLE", 300)
+                    ),
+                    "check_after": float(
+                        os.environ.get("DB_POOL_CHECK_AFTER", 30)
+                    ),
+                },
+            },
+        }
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -134,6 +170,16 @@ MEDIA_ROOT = "/files/media"
 
 MEDIA_URL = "/media/"
 
+# How MEDIA_URL is served: "django" streams files from the worker with
+# Range, ETag and immutable caching headers, "x-accel-redirect" (nginx)
+# and "x-sendfile" (Apache, lighttpd) hand sending them to the front server
+MEDIA_SERVING = os.environ.get("MEDIA_SERVING", "django")
+
+# Internal nginx location aliased to MEDIA_ROOT, for x-accel-redirect
+MEDIA_ACCEL_REDIRECT_LOCATION = os.environ.get(
+    "MEDIA_ACCEL_REDIRECT_LOCATION", "/protected-media/"
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -143,19 +189,23 @@ AUTH_USER_MODEL = "user.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "theatre.permissions.IsAdminOrIfAuthenticatedReadOnly",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "EXCEPTION_HANDLER": "theatre_api_service.exceptions.exception_handler",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle"
+        "theatre.throttling.AnonSlidingWindowThrottle",
+        "theatre.throttling.UserSlidingWindowThrottle",
+        "theatre.throttling.ScopedSlidingWindowThrottle"
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "10/minute",
-        "user": "50/minute"
+        "user": "50/minute",
+        "reservation-create": "10/minute",
+        "token": "5/minute"
     }
 }
 
@@ -172,6 +222,83 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+SEAT_HOLD_DURATION = timedelta(minutes=10)
+
+# Background tasks run by run_worker: attempts before a task is marked
+# failed, retry delay doubling from TASK_RETRY_DELAY up to
+# TASK_RETRY_MAX_DELAY, and how long a claimed task stays hidden from
+# other workers (a task still running after its lease may run twice)
+TASK_MAX_ATTEMPTS = 5
+
+TASK_RETRY_DELAY = timedelta(seconds=10)
+
+TASK_RETRY_MAX_DELAY = timedelta(hours=1)
+
+TASK_LEASE = timedelta(minutes=5)
+
+EMAIL_BACKEND = os.environ.get(
+    "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
+)
+
+# Poster variants generated in the background by run_worker,
+# each scaled down to fit its (width, height) box
+PLAY_IMAGE_VARIANTS = {
+    "thumbnail": (200, 300),
+    "card": (600, 900),
+    "full": (1600, 2400),
+}
+
+# Seats kept in the change log of each performance seat map. Clients
+# polling with an older ?since_version= get the full bitset instead.
+SEAT_MAP_CHANGES_KEPT = 256
+
+# Number of identical SQL statements within one request reported as a
+# likely N+1 by RepeatedQueriesMiddleware (only active with DEBUG)
+N_PLUS_ONE_THRESHOLD = 5
+
+# Every worker process must see the same cache for version bumps and auth
+# invalidation to reach them all: Redis when REDIS_URL is set (needs the
+# redis package), the database otherwise (python manage.py createcachetable)
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+            "OPTIONS": {
+                "MAX_ENTRIES": int(
+                    os.environ.get("CACHE_MAX_ENTRIES", 100000)
+                ),
+            },
+        }
+    }
+
+# Cache alias and entry timeout for catalog responses. Entries are
+# invalidated through model version tags, the timeout only bounds memory.
+# The alias must be shared by every worker process like the default one,
+# a per-process cache would keep serving stale responses.
+CATALOG_CACHE_ALIAS = "default"
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Serve the compact JSON list responses of plays, performances and
+# reservations from values() rows rendered with orjson instead of the
+# serializers. The output is the same, ?expand= still uses serializers.
+FAST_LIST_RESPONSES = os.environ.get(
+    "FAST_LIST_RESPONSES", ""
+).lower() in ("1", "true", "yes")
+
+# Cache alias of verified tokens and user snapshots, entries live until
+# the token expires. It must be shared by every worker process for the
+# invalidation on user changes to reach them all.
+AUTH_CACHE_ALIAS = "default"
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -0,0 +1,48 @@
+"""
+Version tags stored in a cache. Entries are cached under the current tag
+of what they depend on, bumping the tag invalidates them all at once.
+"""
+import uuid
+
+from django.db import transaction
+
+
+def _new_version() -> str:
+    # A fresh value rather than incr(), which the database cache runs as
+    # a read and a write: concurrent bumps could agree on the same version.
+    # Seeding a fresh value also keeps an evicted tag from matching the
+    # version that entries were cached under before.
+    return uuid.uuid4().hex
+
+
+def get_versions(cache, keys) -> list:
+    """Return the tags stored at keys, seeding the missing ones."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(cache, keys) -> list:
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _new_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def _set_version(cache, key) -> None:
+    cache.set(key, _new_version(), timeout=None)
+
+
+def bump_version(cache, key) -> None:
+    """
+    Invalidate the entries cached under the tag at key. The tag is bumped
+    again on commit so that an entry cached from a concurrent read of the
+    old rows cannot outlive the transaction.
+    """
+    _set_version(cache, key)
+    transaction.on_commit(lambda: _set_version(cache, key))
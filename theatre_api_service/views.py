@@ -0,0 +1,36 @@
+from django.conf import settings
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from theatre_api_service.postgresql_pool.pool import get_pool_stats
+
+
+class DatabaseMetricsView(APIView):
+    """
+    Connection settings and pool metrics (in use, idle, waiting, wait-time
+    histogram) of the worker process that serves the request.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        return Response(
+            {
+                "databases": {
+                    alias: {
+                        "engine": settings_dict["ENGINE"],
+                        "conn_max_age": settings_dict.get("CONN_MAX_AGE", 0),
+                        "conn_health_checks": settings_dict.get(
+                            "CONN_HEALTH_CHECKS", False
+                        ),
+                        "pool": settings_dict.get("OPTIONS", {}).get("pool"),
+                    }
+                    for alias, settings_dict in settings.DATABASES.items()
+                },
+                "pools": get_pool_stats(),
+            }
+        )
@@ -0,0 +1,196 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from theatre_api_service.version_tags import (
+    aget_versions,
+    bump_version,
+    get_versions,
+)
+
+# User fields of the cached snapshot, enough for the permission classes
+# and throttles. Other fields are loaded from the database when read.
+SNAPSHOT_FIELDS = ("id", "email", "is_active", "is_staff", "is_superuser")
+
+
+def get_auth_cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def _token_key(raw_token: bytes) -> str:
+    return f"auth:token:{hashlib.sha256(raw_token).hexdigest()}"
+
+
+def _user_version_key(user_id) -> str:
+    return f"auth:user-version:{user_id}"
+
+
+def get_user_version(user_id) -> str:
+    return get_versions(get_auth_cache(), [_user_version_key(user_id)])[0]
+
+
+async def aget_user_version(user_id) -> str:
+    versions = await aget_versions(
+        get_auth_cache(), [_user_version_key(user_id)]
+    )
+    return versions[0]
+
+
+def bump_user_version(user_id) -> None:
+    """Invalidate the cached authentication of every token of the user."""
+    bump_version(get_auth_cache(), _user_version_key(user_id))
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """simplejwt authentication that can also load the user asynchronously"""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        try:
+            user = await self.user_model.objects.aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."),
+                    code="password_changed"
+                )
+
+        return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication caching the validated token and a snapshot of the
+    user under the hash of the raw token until the token expires, so that
+    a known token costs neither the signature check nor the user query.
+    The user is rebuilt with only SNAPSHOT_FIELDS loaded, entries are
+    dropped by bumping the version tag of the user.
+    """
+
+    def get_request_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        return self.get_raw_token(header)
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+    def snapshot_user(self, snapshot):
+        """Return a user loaded from the snapshot, other fields deferred."""
+        names = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in snapshot
+        ]
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model),
+            names,
+            [snapshot[name] for name in names],
+        )
+
+    @staticmethod
+    def cache_entry(validated_token, user, version):
+        """Return the cache entry and its timeout, the token lifetime."""
+        entry = {
+            "user_id": validated_token[api_settings.USER_ID_CLAIM],
+            "version": version,
+            "token": validated_token,
+            "user": {name: getattr(user, name) for name in SNAPSHOT_FIELDS},
+        }
+        return entry, validated_token.get("exp", 0) - int(time.time())
+
+    def authenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+
+        cache = get_auth_cache()
+        key = _token_key(raw_token)
+        entry = cache.get(key)
+        if entry is not None and entry["version"] == get_user_version(
+                entry["user_id"]
+        ):
+            return self.snapshot_user(entry["user"]), entry["token"]
+
+        validated_token = self.get_validated_token(raw_token)
+        # The tag is read before the user so that a concurrent update is
+        # never cached under the version that follows it
+        version = get_user_version(self.get_user_id(validated_token))
+        user = self.get_user(validated_token)
+
+        entry, timeout = self.cache_entry(validated_token, user, version)
+        if timeout > 0:
+            cache.set(key, entry, timeout)
+        return self.snapshot_user(entry["user"]), validated_token
+
+    async def aauthenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+
+        cache = get_auth_cache()
+        key = _token_key(raw_token)
+        entry = await cache.aget(key)
+        if entry is not None and entry["version"] == await aget_user_version(
+                entry["user_id"]
+        ):
+            return self.snapshot_user(entry["user"]), entry["token"]
+
+        validated_token = self.get_validated_token(raw_token)
+        version = await aget_user_version(self.get_user_id(validated_token))
+        user = await self.aget_user(validated_token)
+
+        entry, timeout = self.cache_entry(validated_token, user, version)
+        if timeout > 0:
+            await cache.aset(key, entry, timeout)
+        return self.snapshot_user(entry["user"]), validated_token
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from user.authentication import bump_user_version
+from user.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_authentication(sender, instance, **kwargs):
+    bump_user_version(getattr(instance, api_settings.USER_ID_FIELD))
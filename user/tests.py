@@ -1,3 +1,127 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from theatre.tests.query_budget import LOCAL_CACHES, without_throttling
+from user.authentication import CachedJWTAuthentication
+
+MANAGE_URL = reverse("user:manage")
+GENRE_URL = reverse("theatre:genre-list")
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            first_name="Test"
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_known_token_skips_user_query(self):
+        self.enterContext(without_throttling())
+        with self.assertNumQueries(1):
+            self.client.get(MANAGE_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+
+    def test_snapshot_loads_other_fields_on_access(self):
+        self.client.get(MANAGE_URL)
+        request = self.client.get(MANAGE_URL).wsgi_request
+
+        user, _ = CachedJWTAuthentication().authenticate(request)
+
+        self.assertEqual(user.pk, self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.first_name, "Test")
+
+    def test_staff_change_invalidates(self):
+        self.client.get(GENRE_URL)
+        response = self.client.post(GENRE_URL, {"name": "Drama"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(GENRE_URL, {"name": "Drama"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_deactivation_invalidates(self):
+        self.client.get(MANAGE_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_invalidates(self):
+        self.client.get(MANAGE_URL)
+
+        self.user.delete()
+        response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_manage_user_update_invalidates(self):
+        self.client.get(MANAGE_URL)
+
+        response = self.client.patch(MANAGE_URL, {"email": "new@test.com"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.data["email"], "new@test.com")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Test")
+        self.assertTrue(self.user.check_password("test12345"))
+
+    def test_tampered_token_is_not_served_from_cache(self):
+        token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.client.get(MANAGE_URL)
+
+        signature = token.rsplit(".", 1)[1]
+        tampered = token[:-len(signature)] + signature[::-1]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tampered}")
+        response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsyncCachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345"
+        )
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+    async def test_deactivation_invalidates(self):
+        response = await self.async_client.get(
+            GENRE_URL, headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        await self.user.asave()
+        response = await self.async_client.get(
+            GENRE_URL, headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,18 +1,27 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView
-)
 
-from user.views import CreateUserView, ManageUserView
+from user.views import (
+    CreateUserView,
+    ManageUserView,
+    ScopedTokenObtainPairView,
+    ScopedTokenRefreshView,
+    ScopedTokenVerifyView,
+)
 
 
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("token/verify/", TokenVerifyView.as_view(), name="token_verify"),
+    path(
+        "token/", ScopedTokenObtainPairView.as_view(), name="token_obtain_pair"
+    ),
+    path(
+        "token/refresh/",
+        ScopedTokenRefreshView.as_view(),
+        name="token_refresh"
+    ),
+    path(
+        "token/verify/", ScopedTokenVerifyView.as_view(), name="token_verify"
+    ),
     path("me/", ManageUserView.as_view(), name="manage")
 ]
 
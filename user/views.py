@@ -1,6 +1,16 @@
+from django.contrib.auth import get_user_model
 from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    AllowAny,
+    IsAuthenticated,
+)
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView,
+    TokenRefreshView,
+    TokenVerifyView,
+)
 
 from user.serializers import UserSerializer
 
@@ -15,4 +25,19 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+        # request.user may be a cached snapshot, updates start from the row
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+
+class ScopedTokenObtainPairView(TokenObtainPairView):
+    throttle_scope = "token"
+
+
+class ScopedTokenRefreshView(TokenRefreshView):
+    throttle_scope = "token"
+
+
+class ScopedTokenVerifyView(TokenVerifyView):
+    throttle_scope = "token"